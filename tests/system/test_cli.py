@@ -0,0 +1,213 @@
+import gzip
+import hashlib
+import json
+import lzma
+import shlex
+import sqlite3
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+from woodblock.__main__ import main
+
+
+@pytest.fixture
+def config(config_path):
+    return str(config_path / 'three-scenarios.conf')
+
+
+@pytest.fixture
+def reference_image(config, tmp_path):
+    result = CliRunner().invoke(main, ['generate', config, str(tmp_path / 'reference.dd')])
+    assert result.exit_code == 0, result.output
+    return (tmp_path / 'reference.dd').read_bytes()
+
+
+class TestGenerateStreaming:
+    def test_that_the_image_can_be_written_to_stdout(self, config, reference_image, tmp_path):
+        metadata = tmp_path / 'stdout.json'
+        result = CliRunner().invoke(main, ['generate', config, '-', '--metadata', str(metadata)])
+        assert result.exit_code == 0, result.output
+        assert result.stdout_bytes == reference_image
+        assert len(json.loads(metadata.read_text())['scenarios']) == 3
+
+    def test_that_the_image_can_be_piped_to_a_command(self, config, reference_image, tmp_path):
+        output = tmp_path / 'piped.dd'
+        metadata = tmp_path / 'piped.json'
+        copy = f'import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open({str(output)!r}, "wb"))'
+        command = f'{shlex.quote(sys.executable)} -c {shlex.quote(copy)}'
+        result = CliRunner().invoke(main, ['generate', config, '--pipe-to', command, '--metadata', str(metadata)])
+        assert result.exit_code == 0, result.output
+        assert output.read_bytes() == reference_image
+        assert len(json.loads(metadata.read_text())['scenarios']) == 3
+
+    def test_that_a_failing_command_is_reported(self, config, tmp_path):
+        command = f'{shlex.quote(sys.executable)} -c "import sys; sys.exit(3)"'
+        result = CliRunner().invoke(
+            main, ['generate', config, '--pipe-to', command, '--metadata', str(tmp_path / 'meta.json')]
+        )
+        assert result.exit_code != 0
+
+    @pytest.mark.parametrize('args', (['-'], ['--pipe-to', 'cat']))
+    def test_that_streaming_requires_a_metadata_path(self, config, args):
+        result = CliRunner().invoke(main, ['generate', config, *args])
+        assert result.exit_code == 2
+
+    def test_that_an_image_and_a_command_are_mutually_exclusive(self, config, tmp_path):
+        result = CliRunner().invoke(main, ['generate', config, str(tmp_path / 'x.dd'), '--pipe-to', 'cat'])
+        assert result.exit_code == 2
+
+
+class TestGenerateBufferSize:
+    @pytest.mark.parametrize('size', ('0', '512', '64K', '1MiB', '16m'))
+    def test_that_the_buffer_size_does_not_change_the_image(self, config, reference_image, tmp_path, size):
+        output = tmp_path / 'buffered.dd'
+        result = CliRunner().invoke(main, ['generate', config, str(output), '--buffer-size', size])
+        assert result.exit_code == 0, result.output
+        assert output.read_bytes() == reference_image
+
+    @pytest.mark.parametrize('size', ('-1', 'four', '4X', 'M'))
+    def test_that_invalid_buffer_sizes_are_rejected(self, config, tmp_path, size):
+        result = CliRunner().invoke(main, ['generate', config, str(tmp_path / 'x.dd'), '--buffer-size', size])
+        assert result.exit_code == 2
+
+
+class TestGenerateMemoryMapped:
+    @pytest.mark.parametrize('workers', ('1', '4'))
+    def test_that_the_image_is_identical(self, config, reference_image, tmp_path, workers):
+        output = tmp_path / 'mapped.dd'
+        result = CliRunner().invoke(main, ['generate', config, str(output), '--mmap', '--workers', workers])
+        assert result.exit_code == 0, result.output
+        assert output.read_bytes() == reference_image
+
+    @pytest.mark.parametrize('name, args', (
+        ('x.dd.gz', []),
+        ('x.dd', ['--compression', 'xz']),
+        ('x.dd', ['--segment-size', '16K']),
+    ))
+    def test_that_unsupported_combinations_are_rejected(self, config, tmp_path, name, args):
+        result = CliRunner().invoke(main, ['generate', config, str(tmp_path / name), *args, '--mmap'])
+        assert result.exit_code == 2
+        assert not list(tmp_path.iterdir())
+
+
+class TestGenerateResumable:
+    def test_that_the_image_is_identical(self, config, reference_image, tmp_path):
+        output = tmp_path / 'resumable.dd'
+        result = CliRunner().invoke(main, ['generate', config, str(output), '--resume'])
+        assert result.exit_code == 0, result.output
+        assert output.read_bytes() == reference_image
+        assert not (tmp_path / 'resumable.dd.journal').exists()
+        assert (tmp_path / 'resumable.dd.json').exists()
+
+    @pytest.mark.parametrize('args', (['-', '--metadata', 'x.json'], ['x.dd', '--workers', '2'], ['x.dd', '--mmap']))
+    def test_that_unsupported_combinations_are_rejected(self, config, args):
+        result = CliRunner().invoke(main, ['generate', config, *args, '--resume'])
+        assert result.exit_code == 2
+
+
+class TestGenerateDigests:
+    def test_that_the_digests_are_recorded(self, config, reference_image, tmp_path):
+        output = tmp_path / 'digests.dd'
+        result = CliRunner().invoke(
+            main, ['generate', config, str(output), '--digest', 'sha256', '--digest', 'MD5', '--checksum-file']
+        )
+        assert result.exit_code == 0, result.output
+        assert output.read_bytes() == reference_image
+        digests = json.loads((tmp_path / 'digests.dd.json').read_text())['digests']
+        assert digests == {'sha256': hashlib.sha256(reference_image).hexdigest(),
+                           'md5': hashlib.md5(reference_image).hexdigest()}  # nosec
+        assert (tmp_path / 'digests.dd.sha256').read_text() == f'{digests["sha256"]}  digests.dd\n'
+
+    def test_that_compressed_images_cannot_have_a_checksum_file(self, config, tmp_path):
+        result = CliRunner().invoke(main, ['generate', config, str(tmp_path / 'x.dd.gz'), '--checksum-file'])
+        assert result.exit_code == 2
+        assert not list(tmp_path.iterdir())
+
+    def test_that_a_checksum_file_requires_an_image_path(self, config, tmp_path):
+        result = CliRunner().invoke(main, ['generate', config, '-', '--metadata', 'x.json', '--checksum-file'])
+        assert result.exit_code == 2
+
+
+class TestGenerateHashDatabase:
+    def test_that_a_hash_database_is_written(self, config, reference_image, tmp_path):
+        output = tmp_path / 'hashdb.dd'
+        result = CliRunner().invoke(main, ['generate', config, str(output), '--hashdb', str(tmp_path / 'x.hashdb')])
+        assert result.exit_code == 0, result.output
+        assert output.read_bytes() == reference_image
+        with sqlite3.connect(tmp_path / 'x.hashdb') as db:
+            blocks = db.execute('SELECT hash, image_offset FROM blocks').fetchall()
+        assert blocks
+        for digest, offset in blocks:
+            assert hashlib.md5(reference_image[offset:offset + 512]).hexdigest() == digest  # nosec
+
+
+class TestGenerateCompressed:
+    @pytest.mark.parametrize('args', ([], ['--workers', '3']))
+    def test_that_the_compression_is_inferred_from_the_suffix(self, config, reference_image, tmp_path, args):
+        output = tmp_path / 'compressed.dd.gz'
+        result = CliRunner().invoke(main, ['generate', config, str(output), *args])
+        assert result.exit_code == 0, result.output
+        assert gzip.decompress(output.read_bytes()) == reference_image
+
+    def test_that_a_streamed_image_can_be_compressed(self, config, reference_image, tmp_path):
+        result = CliRunner().invoke(
+            main, ['generate', config, '-', '--metadata', str(tmp_path / 'x.json'), '--compression', 'xz']
+        )
+        assert result.exit_code == 0, result.output
+        assert lzma.decompress(result.stdout_bytes) == reference_image
+
+    def test_that_digests_can_be_combined_with_compression_threads(self, config, reference_image, tmp_path):
+        output = tmp_path / 'compressed.dd.bz2'
+        result = CliRunner().invoke(main, ['generate', config, str(output), '--workers', '2', '--digest', 'sha256'])
+        assert result.exit_code == 0, result.output
+        digests = json.loads((tmp_path / 'compressed.dd.bz2.json').read_text())['digests']
+        assert digests == {'sha256': hashlib.sha256(reference_image).hexdigest()}
+
+
+class TestGenerateSegmented:
+    def test_that_the_segments_make_up_the_image(self, config, reference_image, tmp_path):
+        output = tmp_path / 'segmented'
+        result = CliRunner().invoke(main, ['generate', config, str(output), '--segment-size', '16K', '--visualize'])
+        assert result.exit_code == 0, result.output
+        metadata = json.loads((tmp_path / 'segmented.json').read_text())
+        assert metadata['segments']['size'] == 16384
+        segments = [(tmp_path / name).read_bytes() for name in metadata['segments']['files']]
+        assert len(segments) > 1
+        assert b''.join(segments) == reference_image
+        assert (tmp_path / 'segmented.html').exists()
+
+    def test_that_segments_cannot_be_written_by_several_workers(self, config, tmp_path):
+        result = CliRunner().invoke(
+            main, ['generate', config, str(tmp_path / 'segmented'), '--segment-size', '16K', '--workers', '2']
+        )
+        assert result.exit_code == 2
+        assert not list(tmp_path.iterdir())
+
+    def test_that_streams_cannot_be_segmented(self, config, tmp_path):
+        result = CliRunner().invoke(
+            main, ['generate', config, '-', '--metadata', str(tmp_path / 'x.json'), '--segment-size', '16K']
+        )
+        assert result.exit_code == 2
+
+
+class TestCorpusIndex:
+    def test_that_all_files_are_hashed_and_typed(self, test_corpus_path, tmp_path):
+        index, cache = tmp_path / 'corpus.idx', tmp_path / 'hashes.db'
+        args = ['corpus', 'index', str(test_corpus_path), str(index), '--hash-cache', str(cache), '-w', '2']
+        result = CliRunner().invoke(main, args)
+        assert result.exit_code == 0, result.output
+        assert 'hashed 10 files' in result.stdout
+        with sqlite3.connect(index) as db:
+            rows = dict(db.execute('SELECT path, sha256 FROM files WHERE type IS NOT NULL'))
+        assert rows['4096'] == hashlib.sha256((test_corpus_path / '4096').read_bytes()).hexdigest()
+        assert len(rows) == 10
+
+    def test_that_a_second_run_hashes_nothing(self, test_corpus_path, tmp_path):
+        args = ['corpus', 'index', str(test_corpus_path), str(tmp_path / 'corpus.idx')]
+        assert CliRunner().invoke(main, args).exit_code == 0
+        result = CliRunner().invoke(main, args)
+        assert result.exit_code == 0, result.output
+        assert 'hashed 0 files' in result.stdout
+        assert CliRunner().invoke(main, [*args, '--rebuild']).exit_code == 0
@@ -1,6 +1,9 @@
 import hashlib
 import pathlib
 
+import pytest
+
+import woodblock
 from woodblock.image import Image
 
 HERE = pathlib.Path(__file__).absolute().parent
@@ -17,3 +20,20 @@ def test_two_consecutive_image_creations(config_path):
     image.write(pathlib.Path('/tmp/reproduce-me.dd'))
 
     assert image_digest == hashlib.sha256(image_path.open('rb').read()).hexdigest()
+
+
+@pytest.mark.parametrize('backend', woodblock.random.BACKENDS)
+def test_that_each_rng_backend_reproduces_the_image(config_path, tmp_path, backend):
+    config = tmp_path / 'rng.conf'
+    config.write_text((config_path / 'three-scenarios.conf').read_text().replace(
+        '[general]\n', f'[general]\nrng = {backend}\n', 1).replace('../corpus', str(config_path.parent / 'corpus')))
+    digests = []
+    try:
+        for name in ('first.dd', 'second.dd'):
+            image = Image.from_config(config)
+            image.write(tmp_path / name)
+            digests.append(hashlib.sha256((tmp_path / name).read_bytes()).hexdigest())
+        assert image.metadata['rng']['backend'] == backend
+    finally:
+        woodblock.random.set_backend(woodblock.random.DEFAULT_BACKEND)
+    assert digests[0] == digests[1]
@@ -31,6 +31,7 @@ class TestSimpleImageCreation:
             'block_size': 512,
             'corpus': str(test_corpus_path),
             'seed': woodblock.random.get_seed(),
+            'rng': woodblock.random.get_info(),
             'scenarios': [
                 {'name': 'simple zeroes',
                  'files': [
@@ -65,6 +66,7 @@ class TestSimpleImageCreation:
             'block_size': 512,
             'corpus': str(test_corpus_path),
             'seed': woodblock.random.get_seed(),
+            'rng': woodblock.random.get_info(),
             'scenarios': [
                 {'name': 'simple zeroes with padding',
                  'files': [
@@ -100,6 +102,7 @@ class TestSimpleImageCreation:
             'block_size': 512,
             'corpus': str(test_corpus_path),
             'seed': woodblock.random.get_seed(),
+            'rng': woodblock.random.get_info(),
             'scenarios': [
                 {'name': 'two zeroes with padding',
                  'files': [
@@ -141,6 +144,7 @@ class TestSimpleImageCreation:
             'block_size': 512,
             'corpus': str(test_corpus_path),
             'seed': woodblock.random.get_seed(),
+            'rng': woodblock.random.get_info(),
             'scenarios': [
                 {'name': 'simple file fragment',
                  'files': [
@@ -3,6 +3,8 @@ import pathlib
 import pytest
 
 import woodblock.file
+import woodblock.random
+from woodblock.corpus import Corpus
 
 HERE = pathlib.Path(__file__).absolute().parent
 DATA_FILES = HERE.parent / 'data'
@@ -40,6 +42,13 @@ def corpus(test_corpus_path):
     woodblock.file.corpus(test_corpus_path)
 
 
+@pytest.fixture(autouse=True)
+def rng_backend():
+    # Configs may select another backend, which would otherwise leak into later tests.
+    yield
+    woodblock.random.set_backend(woodblock.random.DEFAULT_BACKEND)
+
+
 @pytest.fixture
 def path_test_file_512(test_corpus_path):
     return test_corpus_path / '512'
@@ -53,3 +62,24 @@ def path_test_file_2000(test_corpus_path):
 @pytest.fixture
 def path_test_file_4k(test_corpus_path):
     return test_corpus_path / '4096'
+
+
+@pytest.fixture
+def typed_corpus_path(tmp_path):
+    """A corpus containing PDF, PNG and text files."""
+    path = tmp_path / 'typed'
+    (path / 'docs').mkdir(parents=True)
+    (path / 'docs' / 'small.pdf').write_bytes(b'%PDF-1.4\n' + b'\x00' * 600)
+    (path / 'docs' / 'large.pdf').write_bytes(b'%PDF-1.4\n' + b'\x00' * 4096)
+    (path / 'docs' / 'notes').write_bytes(b'n' * 4096)
+    (path / 'image.png').write_bytes(b'\x89PNG\r\n\x1a\n' + b'\x00' * 4088)
+    return path
+
+
+@pytest.fixture
+def typed_corpus(typed_corpus_path, tmp_path):
+    """The typed corpus with an index recording the types of its files."""
+    corpus = Corpus(typed_corpus_path, index=tmp_path / 'typed.idx')
+    corpus.index.refresh()
+    corpus.index.hash_files()
+    return corpus
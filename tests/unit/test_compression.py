@@ -0,0 +1,57 @@
+import bz2
+import gzip
+import io
+import lzma
+
+import pytest
+
+from woodblock.compression import ParallelCompressor, compression_from_path
+from woodblock.errors import WoodblockError
+
+DECOMPRESS = {'gz': gzip.decompress, 'bz2': bz2.decompress, 'xz': lzma.decompress}
+
+
+class TestParallelCompressor:
+    @pytest.mark.parametrize('codec', ('gz', 'bz2', 'xz'))
+    @pytest.mark.parametrize('workers', (1, 4))
+    def test_that_the_data_can_be_decompressed(self, codec, workers):
+        data = bytes(range(256)) * 300 + b'\x00' * 70000
+        target = io.BytesIO()
+        compressor = ParallelCompressor(target, codec, workers=workers, block_size=10000)
+        for start in range(0, len(data), 777):
+            compressor.write(data[start:start + 777])
+        compressor.close()
+        assert DECOMPRESS[codec](target.getvalue()) == data
+
+    @pytest.mark.parametrize('codec', ('gz', 'bz2', 'xz'))
+    def test_that_an_empty_stream_is_a_valid_file(self, codec):
+        target = io.BytesIO()
+        ParallelCompressor(target, codec).close()
+        assert target.getvalue() != b''
+        assert DECOMPRESS[codec](target.getvalue()) == b''
+
+    def test_that_the_blocks_are_compressed_independently(self):
+        target = io.BytesIO()
+        compressor = ParallelCompressor(target, 'gz', workers=2, block_size=100)
+        compressor.write(b'a' * 350)
+        compressor.close()
+        assert target.getvalue().count(b'\x1f\x8b\x08') == 4
+
+    def test_that_gzip_uses_the_default_level_of_the_command_line_tool(self):
+        target = io.BytesIO()
+        compressor = ParallelCompressor(target, 'gz')
+        compressor.write(bytes(range(256)) * 100)
+        compressor.close()
+        # The XFL header byte is 2 for level 9, 4 for level 1 and 0 for all other levels.
+        assert target.getvalue()[8] == 0
+
+    def test_that_an_unknown_codec_raises_an_error(self):
+        with pytest.raises(WoodblockError):
+            ParallelCompressor(io.BytesIO(), 'zip')
+
+
+@pytest.mark.parametrize('path, expected', (
+    ('image.dd.gz', 'gz'), ('image.GZ', 'gz'), ('image.bz2', 'bz2'), ('a/b.xz', 'xz'), ('image.dd', None),
+))
+def test_compression_from_path(path, expected):
+    assert compression_from_path(path) == expected
@@ -0,0 +1,112 @@
+import hashlib
+import pathlib
+import shutil
+
+import pytest
+
+import woodblock.file
+import woodblock.filetypes
+import woodblock.utils
+from woodblock.corpus import Corpus
+from woodblock.errors import WoodblockError
+from woodblock.file import File, draw_files
+
+
+class TestCorpus:
+    def test_that_the_files_are_sorted_and_readmes_are_excluded(self, test_corpus_path):
+        corpus = Corpus(test_corpus_path)
+        assert corpus.files('letters') == tuple(
+            test_corpus_path / 'letters' / name for name in ('ascii_letters', 'ascii_lowercase', 'ascii_uppercase'))
+        assert corpus.files() == woodblock.utils.get_file_list(test_corpus_path)
+
+    @pytest.mark.parametrize('min_size', (0, 1024, 2000, 2001, 5000))
+    def test_that_the_files_are_filtered_by_size(self, test_corpus_path, min_size):
+        corpus = Corpus(str(test_corpus_path))
+        assert corpus.files(min_size=min_size) == woodblock.utils.get_file_list(test_corpus_path, min_size)
+
+    @pytest.mark.parametrize(('min_size', 'max_size'), ((0, 1024), (512, 2000), (1025, 1999), (4096, 4096)))
+    def test_that_the_files_are_filtered_by_a_size_band(self, test_corpus_path, min_size, max_size):
+        corpus = Corpus(test_corpus_path)
+        expected = tuple(f for f in corpus.files() if min_size <= f.stat().st_size <= max_size)
+        assert corpus.files(min_size=min_size, max_size=max_size) == expected
+        assert corpus.count(min_size=min_size, max_size=max_size) == len(expected)
+
+    def test_that_the_file_lists_are_kept_until_refreshed(self, test_corpus_path, tmp_path):
+        shutil.copytree(test_corpus_path / 'letters', tmp_path / 'letters')
+        corpus = Corpus(tmp_path)
+        assert len(corpus.files()) == 3
+        (tmp_path / 'new').write_bytes(b'new')
+        assert len(corpus.files()) == 3
+        corpus.refresh()
+        assert len(corpus.files()) == 4
+
+    def test_that_paths_are_resolved_and_made_relative(self, test_corpus_path):
+        corpus = Corpus(test_corpus_path)
+        assert corpus.resolve('letters/README') == test_corpus_path / 'letters' / 'README'
+        assert corpus.relative(test_corpus_path / 'letters' / 'README') == pathlib.Path('letters/README')
+
+    def test_that_the_hash_is_computed(self, path_test_file_4k, test_corpus_path):
+        corpus = Corpus(test_corpus_path)
+        assert corpus.hash_file(path_test_file_4k) == hashlib.sha256(path_test_file_4k.read_bytes()).hexdigest()
+
+
+class TestFileTypes:
+    def test_that_the_files_are_filtered_by_type(self, typed_corpus, typed_corpus_path):
+        pdfs = (typed_corpus_path / 'docs' / 'large.pdf', typed_corpus_path / 'docs' / 'small.pdf')
+        assert typed_corpus.files(file_type='pdf') == pdfs
+        assert typed_corpus.files(file_type='PDF') == pdfs
+        assert typed_corpus.files(file_type=('png', 'text')) == (
+            typed_corpus_path / 'docs' / 'notes', typed_corpus_path / 'image.png')
+        assert typed_corpus.files('docs', min_size=1000, file_type='pdf') == pdfs[:1]
+        assert typed_corpus.files(file_type='jpeg') == ()
+
+    def test_that_the_types_are_taken_from_the_index(self, typed_corpus, typed_corpus_path, monkeypatch):
+        monkeypatch.setattr(woodblock.filetypes, 'get_file_type', lambda path: pytest.fail('type detected'))
+        monkeypatch.setattr(woodblock.filetypes, 'detect_file_type', lambda header: pytest.fail('type detected'))
+        assert len(typed_corpus.files(file_type='png')) == 1
+        assert typed_corpus.file_type(typed_corpus_path / 'image.png') == 'png'
+
+    def test_that_a_type_filter_requires_an_index(self, typed_corpus_path):
+        with pytest.raises(WoodblockError, match='corpus index'):
+            Corpus(typed_corpus_path).files(file_type='pdf')
+
+    def test_that_a_type_filter_requires_the_types_to_be_recorded(self, typed_corpus_path, tmp_path):
+        corpus = Corpus(typed_corpus_path, index=tmp_path / 'corpus.idx')
+        assert len(corpus.files()) == 4
+        with pytest.raises(WoodblockError, match='does not record the type'):
+            corpus.files(file_type='pdf')
+
+    def test_that_the_selections_are_kept_until_refreshed(self, typed_corpus, typed_corpus_path):
+        assert len(typed_corpus.files(file_type='pdf')) == 2
+        (typed_corpus_path / 'new.pdf').write_bytes(b'%PDF-1.4\n')
+        typed_corpus.index.refresh()
+        typed_corpus.index.hash_files()
+        assert len(typed_corpus.files(file_type='pdf')) == 2
+        typed_corpus.refresh()
+        assert len(typed_corpus.files(file_type='pdf')) == 3
+
+
+class TestExplicitCorpus:
+    def test_that_files_are_taken_from_the_given_corpus(self, test_corpus_path):
+        letters = Corpus(test_corpus_path / 'letters')
+        file = File('ascii_letters', letters)
+        assert file.corpus is letters
+        assert file.as_fragment().metadata['file']['path'] == 'ascii_letters'
+        assert woodblock.file.get_corpus() == test_corpus_path
+
+    def test_that_files_are_drawn_from_the_given_corpus(self, test_corpus_path):
+        letters = Corpus(test_corpus_path / 'letters')
+        files = draw_files(number_of_files=10, corpus=letters)
+        assert all(f.corpus is letters and f.path.parent == letters.path for f in files)
+
+    def test_that_no_default_corpus_is_needed_with_an_explicit_corpus(self, test_corpus_path):
+        woodblock.file.corpus(None)
+        assert len(draw_files(number_of_files=2, corpus=Corpus(test_corpus_path))) == 2
+        with pytest.raises(WoodblockError):
+            draw_files()
+
+    def test_that_a_corpus_can_be_the_default_corpus(self, test_corpus_path):
+        corpus = Corpus(test_corpus_path)
+        woodblock.file.corpus(corpus)
+        assert woodblock.file.get_default_corpus() is corpus
+        assert woodblock.file.get_corpus() == test_corpus_path
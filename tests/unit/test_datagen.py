@@ -1,8 +1,13 @@
 """Tests for the data generators, focusing on RNG independence and reproducibility."""
 
 import hashlib
+import random as _stdlib_random
 
-from woodblock.datagen import Random, Zeroes
+import pytest
+
+import woodblock.random
+from woodblock.datagen import Random, SeekableRandom, Zeroes, chunk_sizes
+from woodblock.random import RandomBytes
 
 
 class RecordingRng:
@@ -23,7 +28,10 @@ class TestRandom:
     def test_that_each_instance_owns_its_own_rng(self):
         # Regression test: a shared (mutable default) RNG entangles the byte streams of all
         # generators. Every Random instance must get an independent RNG.
-        assert Random()._rng is not Random()._rng
+        first, second = Random(), Random()
+        first(1)
+        second(1)
+        assert first._rng is not second._rng
 
     def test_that_the_generated_seed_is_passed_to_the_rng(self):
         rng = RecordingRng()
@@ -65,6 +73,42 @@ class TestRandom:
         # negligible; this guards against accidentally sharing a single RNG again.
         assert Random()(1024) != Random()(1024)
 
+    @pytest.mark.parametrize('size', (1, 7, 4096, 10001))
+    def test_that_fill_produces_the_same_bytes_as_a_call(self, size):
+        generator = Random()
+        expected = generator(size)
+        generator.reset()
+        buffer = bytearray(size)
+        generator.fill(memoryview(buffer))
+        assert bytes(buffer) == expected
+
+    def test_that_the_random_state_is_created_lazily_and_released_by_reset(self):
+        generator = Random()
+        assert generator._rng is None
+        first = generator(64)
+        assert generator._rng is not None
+        generator.reset()
+        assert generator._rng is None
+        assert generator(64) == first
+
+    def test_that_the_seed_is_drawn_on_creation(self):
+        woodblock.random.seed(5)
+        generator = Random()
+        woodblock.random.seed(5)
+        assert generator._seed == _stdlib_random.randint(0, 2 ** 32 - 1)
+
+    def test_that_the_data_matches_an_eagerly_seeded_rng(self):
+        woodblock.random.seed(5)
+        generator = Random()
+        woodblock.random.seed(5)
+        assert generator(1000) == Random(rng=RandomBytes())(1000)
+
+    def test_that_the_backend_is_fixed_on_creation(self):
+        woodblock.random.set_backend('pcg64')
+        generator = Random()
+        woodblock.random.set_backend('mt19937')
+        assert generator(8) and generator._rng.backend == 'pcg64'
+
     def test_str(self):
         assert str(Random()) == 'random'
 
@@ -78,10 +122,101 @@ class TestZeroes:
         assert generator.reset() is None
         assert generator(16) == b'\x00' * 16
 
+    @pytest.mark.parametrize('size', (0, 5, 3 * 1024 * 1024 + 1))
+    def test_that_fill_zeroes_the_buffer(self, size):
+        buffer = bytearray(b'\xff' * size)
+        Zeroes().fill(memoryview(buffer))
+        assert buffer == bytes(size)
+
+    def test_that_bytes_at_returns_zero_bytes(self):
+        assert Zeroes().bytes_at(12345, 100) == b'\x00' * 100
+
     def test_str(self):
         assert str(Zeroes()) == 'zeroes'
 
 
+class TestSeekableRandom:
+    @staticmethod
+    def _generator():
+        woodblock.random.seed(21)
+        return SeekableRandom()
+
+    @pytest.mark.parametrize('sizes', ((1, 2, 3, 100), (8192, 8192), (5000, 11383, 1), (16384,)))
+    def test_that_the_data_does_not_depend_on_the_call_sizes(self, sizes):
+        generator = self._generator()
+        assert b''.join(generator(size) for size in sizes) == self._generator()(sum(sizes))
+
+    def test_that_bytes_at_matches_consecutive_calls(self):
+        generator = self._generator()
+        data = generator(10000)
+        assert generator.bytes_at(1234, 777) == data[1234:2011]
+        assert generator(10) == generator.bytes_at(10000, 10)
+
+    def test_that_fill_and_skip_advance_the_stream(self):
+        generator = self._generator()
+        data = generator.bytes_at(0, 300)
+        buffer = bytearray(100)
+        generator.fill(buffer)
+        generator.skip(100)
+        assert bytes(buffer) == data[:100]
+        assert generator(100) == data[200:]
+
+    def test_that_reset_restarts_the_stream(self):
+        generator = self._generator()
+        data = generator(100)
+        generator.reset()
+        assert generator(100) == data
+
+    def test_that_it_consumes_the_same_seed_as_random(self):
+        woodblock.random.seed(21)
+        Random()
+        after_random = Random()._seed
+        woodblock.random.seed(21)
+        SeekableRandom()
+        assert Random()._seed == after_random
+
+    def test_that_streams_differ(self):
+        woodblock.random.seed(3)
+        first = SeekableRandom(stream=0)
+        woodblock.random.seed(3)
+        second = SeekableRandom(stream=1)
+        assert first(64) != second(64)
+
+    def test_str(self):
+        assert str(SeekableRandom()) == 'random'
+
+
+class TestChunkSizes:
+    @pytest.mark.parametrize('size, chunk_size, expected', (
+            (0, 8192, []),
+            (100, 8192, [100]),
+            (20000, 8192, [8192, 8192, 3616]),
+            (20, 7, [8, 8, 4]),
+            (20, 1, [8, 8, 4]),
+            (4099, 4099, [4096, 3]),
+    ))
+    def test_that_the_chunks_are_word_aligned(self, size, chunk_size, expected):
+        assert list(chunk_sizes(size, chunk_size)) == expected
+
+    @pytest.mark.parametrize('backend', woodblock.random.BACKENDS)
+    @pytest.mark.parametrize('chunk_size', (1, 8, 100, 1000, 4099, 8192, 1 << 20))
+    @pytest.mark.parametrize('size', (1, 511, 4096, 20001))
+    def test_that_the_chunk_size_does_not_change_random_data(self, backend, chunk_size, size):
+        woodblock.random.set_backend(backend)
+        generator = Random()
+        expected = generator(size)
+        generator.reset()
+        assert b''.join(generator(part) for part in chunk_sizes(size, chunk_size)) == expected
+
+    @pytest.mark.parametrize('backend', ('pcg64', 'sfc64', 'philox'))
+    def test_that_the_modern_backends_do_not_depend_on_the_call_sizes_at_all(self, backend):
+        woodblock.random.set_backend(backend)
+        generator = Random()
+        expected = generator(1000)
+        generator.reset()
+        assert b''.join(generator(size) for size in (1, 3, 5, 7, 11, 13, 960)) == expected
+
+
 def test_random_data_is_actually_random_looking():
     # Sanity check that Random does not collapse to a constant.
     data = Random()(4096)
@@ -6,8 +6,9 @@ import pytest
 
 import woodblock
 import woodblock.random
+from woodblock.corpus import Corpus
 from woodblock.errors import WoodblockError, InvalidFragmentationPointError
-from woodblock.file import draw_files, File, intertwine_randomly, draw_fragmented_files
+from woodblock.file import draw_files, draw_stratified_files, File, intertwine_randomly, draw_fragmented_files
 from woodblock.fragments import FileFragment
 
 
@@ -251,6 +252,63 @@ class TestDrawFiles:
         with pytest.raises(WoodblockError):
             print(draw_files(test_corpus_path, num_files, unique=True))
 
+    def test_that_files_are_drawn_by_type(self, typed_corpus):
+        files = draw_files(number_of_files=20, corpus=typed_corpus, file_type='pdf')
+        assert {f.path.name for f in files} == {'small.pdf', 'large.pdf'}
+        files = draw_files(number_of_files=2, unique=True, min_size=1000, corpus=typed_corpus, file_type=('pdf', 'png'))
+        assert {f.path.name for f in files} == {'large.pdf', 'image.png'}
+
+    def test_that_a_missing_type_raises_an_error(self, typed_corpus):
+        with pytest.raises(WoodblockError, match='jpeg'):
+            draw_files(corpus=typed_corpus, file_type='jpeg')
+
+    def test_that_drawing_by_type_without_an_index_raises_an_error(self, typed_corpus_path):
+        with pytest.raises(WoodblockError, match='corpus index'):
+            draw_files(corpus=Corpus(typed_corpus_path), file_type='pdf')
+
+    def test_that_files_are_drawn_from_a_size_band(self, test_corpus_path):
+        files = draw_files(number_of_files=50, min_size=1000, max_size=2000)
+        assert {f.path.name for f in files} == {'1024', '2000'}
+        with pytest.raises(WoodblockError, match='maximal size of 100'):
+            draw_files(max_size=100)
+
+    def test_that_size_weighted_draws_prefer_large_files(self, typed_corpus):
+        woodblock.random.seed(3)
+        files = draw_files(number_of_files=2000, corpus=typed_corpus, file_type='pdf', size_weighted=True)
+        small = sum(f.path.name == 'small.pdf' for f in files)
+        assert small / 2000 == pytest.approx(609 / (609 + 4105), abs=0.03)
+
+    def test_that_unique_size_weighted_draws_contain_no_duplicates(self, test_corpus_path):
+        files = draw_files(number_of_files=7, unique=True, size_weighted=True)
+        assert len({f.path for f in files}) == 7
+        with pytest.raises(WoodblockError):
+            draw_files(number_of_files=8, unique=True, size_weighted=True)
+
+    def test_that_size_weighted_draws_are_reproducible(self, test_corpus_path):
+        woodblock.random.seed(11)
+        files = [f.path for f in draw_files(number_of_files=20, size_weighted=True)]
+        woodblock.random.seed(11)
+        assert [f.path for f in draw_files(number_of_files=20, size_weighted=True)] == files
+
+
+class TestDrawStratifiedFiles:
+    def test_that_each_stratum_gets_its_files(self, test_corpus_path):
+        strata = [{'number_of_files': 5, 'max_size': 600}, {'number_of_files': 3, 'min_size': 2000}]
+        small, large = draw_stratified_files(strata)
+        assert len(small) == 5 and all(f.size <= 600 for f in small)
+        assert len(large) == 3 and all(f.size >= 2000 for f in large)
+
+    def test_that_strata_can_select_types(self, typed_corpus):
+        strata = [{'number_of_files': 2, 'file_type': 'pdf'}, {'number_of_files': 1, 'file_type': 'png'}]
+        pdfs, pngs = draw_stratified_files(strata, unique=True, corpus=typed_corpus)
+        assert {f.path.name for f in pdfs} == {'small.pdf', 'large.pdf'}
+        assert [f.path.name for f in pngs] == ['image.png']
+
+    @pytest.mark.parametrize('stratum', ({'min_size': 10}, {'number_of_files': 1, 'unique': True}))
+    def test_that_invalid_strata_raise_an_error(self, stratum):
+        with pytest.raises(WoodblockError):
+            draw_stratified_files([stratum])
+
 
 class TestDrawFragmentedFiles:
     def test_that_an_error_is_raised_when_the_path_is_empty(self):
@@ -297,6 +355,10 @@ class TestDrawFragmentedFiles:
                                           max_fragments=max_frags)
             assert len(files) == i
 
+    def test_that_files_are_drawn_by_type(self, typed_corpus):
+        files = draw_fragmented_files(number_of_files=10, min_fragments=2, corpus=typed_corpus, file_type='pdf')
+        assert all(frags[0].file.path.name == 'large.pdf' for frags in files)
+
 
 class TestIntertwineRandomly:
     def test_that_an_error_is_raised_when_the_path_is_empty(self):
@@ -356,6 +418,18 @@ class TestIntertwineRandomly:
         with pytest.raises(WoodblockError):
             intertwine_randomly(test_corpus_path, 2, min_fragments=min_frags, max_fragments=max_frags)
 
+    def test_that_a_randomness_context_reproduces_the_fragments_without_touching_the_global_context(
+            self, test_corpus_path):
+        def fragments(seed):
+            frags = intertwine_randomly(test_corpus_path, 3, max_fragments=6,
+                                        randomness=woodblock.random.Randomness(seed))
+            return [(f.file.path, f.metadata['fragment']['file_offsets']) for f in frags]
+
+        woodblock.random.seed(1)
+        expected = fragments(2)
+        assert woodblock.random.get_randomness().draw_seed() == woodblock.random.Randomness(1).draw_seed()
+        assert fragments(2) == expected
+
 
 def _get_number_of_files_from_fragment_list(fragments):
     files = set(f.metadata['file']['id'] for f in fragments)
@@ -0,0 +1,48 @@
+import pytest
+
+from woodblock.filetypes import HEADER_SIZE, detect_file_type, get_file_type
+
+
+class TestDetectFileType:
+    @pytest.mark.parametrize(
+        ('header', 'expected'),
+        (
+            (b'\xff\xd8\xff\xe0\x00\x10JFIF', 'jpeg'),
+            (b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR', 'png'),
+            (b'GIF89a\x01\x00', 'gif'),
+            (b'%PDF-1.7\n', 'pdf'),
+            (b'PK\x03\x04\x14\x00', 'zip'),
+            (b'\x1f\x8b\x08\x00', 'gzip'),
+            (b'\x7fELF\x02\x01', 'elf'),
+            (b'SQLite format 3\x00', 'sqlite'),
+            (b'\x00\x00\x00\x18ftypmp42', 'mp4'),
+            (b'RIFF\x24\x08\x00\x00WAVEfmt ', 'wav'),
+            (b'RIFF\x24\x08\x00\x00WEBPVP8 ', 'webp'),
+            (b'RIFF\x24\x08\x00\x00ABCD', 'riff'),
+        ),
+    )
+    def test_that_signatures_are_detected(self, header, expected):
+        assert detect_file_type(header) == expected
+
+    def test_that_utf8_without_nul_bytes_is_text(self):
+        assert detect_file_type('Grüße\n'.encode()) == 'text'
+
+    def test_that_a_character_cut_off_by_the_header_is_text(self):
+        assert detect_file_type('Grüße'.encode()[:3]) == 'text'
+
+    @pytest.mark.parametrize('header', (b'abc\x00def', b'\xfe\xfe\xfe\xfe\x01'))
+    def test_that_other_data_is_unknown(self, header):
+        assert detect_file_type(header) == 'unknown'
+
+    def test_that_an_empty_header_is_empty(self):
+        assert detect_file_type(b'') == 'empty'
+
+
+class TestGetFileType:
+    def test_that_only_the_header_is_read(self, tmp_path):
+        path = tmp_path / 'file'
+        path.write_bytes(b'%PDF-' + b'x' * HEADER_SIZE + b'\x00')
+        assert get_file_type(path) == 'pdf'
+
+    def test_that_corpus_files_are_text(self, path_test_file_4k):
+        assert get_file_type(path_test_file_4k) == 'text'
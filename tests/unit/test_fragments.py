@@ -3,6 +3,7 @@ from math import ceil
 
 import pytest
 
+import woodblock.random
 from woodblock.errors import WoodblockError
 from woodblock.file import File, get_corpus
 from woodblock.fragments import FillerFragment, ZeroesFragment, RandomDataFragment, FileFragment
@@ -204,6 +205,52 @@ class TestFillerFragment:
         assert a_second == a_first
         assert frag_a.hash == a_hash
 
+    @pytest.mark.parametrize('size, chunk_size', ((512, 8192), (9000, 8192), (9000, 1000), (20000, 4099)))
+    def test_that_readinto_matches_the_iterated_data(self, size, chunk_size):
+        fragment = FillerFragment(size, chunk_size=chunk_size)
+        buffer = bytearray(size + 3)
+        assert fragment.readinto(buffer) == size
+        assert bytes(buffer[:size]) == b''.join(fragment)
+        assert buffer[size:] == bytes(3)
+        assert hashlib.sha256(buffer[:size]).hexdigest() == fragment.hash
+
+    def test_that_the_random_state_only_exists_while_generating(self):
+        fragment = FillerFragment(20000)
+        assert fragment.data_generator._rng is None
+        chunks = iter(fragment)
+        next(chunks)
+        assert fragment.data_generator._rng is not None
+        list(chunks)
+        assert fragment.data_generator._rng is None
+        fragment.readinto(bytearray(20000))
+        assert fragment.data_generator._rng is None
+
+    def test_that_an_abandoned_iteration_releases_the_random_state(self):
+        fragment = FillerFragment(20000)
+        chunks = iter(fragment)
+        next(chunks)
+        chunks.close()
+        assert fragment.data_generator._rng is None
+
+    @pytest.mark.parametrize('backend', woodblock.random.BACKENDS)
+    @pytest.mark.parametrize('chunk_size', (1, 7, 1000, 4099, 65536))
+    def test_that_the_chunk_size_does_not_change_the_data(self, backend, chunk_size):
+        woodblock.random.set_backend(backend)
+        woodblock.random.seed(77)
+        expected = FillerFragment(20000)
+        woodblock.random.seed(77)
+        fragment = FillerFragment(20000, chunk_size=chunk_size)
+        buffer = bytearray(20000)
+        fragment.readinto(buffer)
+        assert b''.join(fragment) == b''.join(expected) == bytes(buffer)
+        assert fragment.hash == expected.hash
+
+    def test_that_readinto_works_with_generators_without_fill(self):
+        fragment = FillerFragment(10, data_generator=lambda size: b'x' * size, chunk_size=4)
+        buffer = bytearray(10)
+        fragment.readinto(buffer)
+        assert buffer == b'x' * 10
+
 
 class TestFileFragment:
     def test_that_fragment_is_created_correctly(self, path_test_file_512):
@@ -271,3 +318,11 @@ class FakeRng:
 def _replace_uuids(metadata):
     metadata['file']['id'] = 'uuid'
     return metadata
+
+    @pytest.mark.parametrize('start, end', ((0, 4096), (1000, 3000), (4095, 4096)))
+    def test_that_readinto_reads_the_fragment(self, path_test_file_4k, start, end):
+        fragment = FileFragment(File(path_test_file_4k), 1, start, end)
+        buffer = bytearray(end - start)
+        assert fragment.readinto(memoryview(buffer)) == end - start
+        assert bytes(buffer) == path_test_file_4k.read_bytes()[start:end]
+        assert fragment.hash == hashlib.sha256(buffer).hexdigest()
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import shutil
+
+import pytest
+
+import woodblock.utils
+from woodblock.corpus import Corpus
+from woodblock.file import File
+from woodblock.fragments import FileFragment
+from woodblock.hashcache import HashCache
+
+
+def _key(path):
+    return woodblock.utils.file_key(os.stat(path))
+
+
+def _touch(path):
+    mtime_ns = os.stat(path).st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def corpus_copy(test_corpus_path, tmp_path):
+    path = tmp_path / 'corpus'
+    shutil.copytree(test_corpus_path, path)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HashCache(tmp_path / 'hashes.db')
+    yield cache
+    cache.close()
+
+
+class TestHashCache:
+    def test_that_unknown_entries_are_none(self, cache, corpus_copy):
+        key = _key(corpus_copy / '4096')
+        assert cache.get_file(key) is None
+        assert cache.get_fragment(key, 0, 10) is None
+
+    def test_that_file_hashes_are_recorded(self, cache, corpus_copy):
+        key = _key(corpus_copy / '4096')
+        cache.set_file(key, 'abc')
+        assert cache.get_file(key) == 'abc'
+
+    def test_that_fragment_hashes_are_recorded(self, cache, corpus_copy):
+        key = _key(corpus_copy / '4096')
+        cache.set_fragment(key, 0, 10, 'abc')
+        cache.set_fragment(key, 10, 20, 'def')
+        assert cache.get_fragment(key, 0, 10) == 'abc'
+        assert cache.get_fragment(key, 10, 20) == 'def'
+        assert cache.get_fragment(key, 0, 20) is None
+
+    def test_that_modified_files_are_not_found(self, cache, corpus_copy):
+        path = corpus_copy / '4096'
+        cache.set_file(_key(path), 'abc')
+        cache.set_fragment(_key(path), 0, 10, 'abc')
+        _touch(path)
+        assert cache.get_file(_key(path)) is None
+        assert cache.get_fragment(_key(path), 0, 10) is None
+
+    def test_that_entries_of_outdated_versions_are_removed(self, cache, corpus_copy):
+        path = corpus_copy / '4096'
+        old_key = _key(path)
+        cache.set_file(old_key, 'abc')
+        cache.set_fragment(old_key, 0, 10, 'abc')
+        _touch(path)
+        cache.set_file(_key(path), 'def')
+        cache.set_fragment(_key(path), 0, 10, 'def')
+        assert cache.get_file(old_key) is None
+        assert cache.get_fragment(old_key, 0, 10) is None
+
+    def test_that_the_cache_persists(self, tmp_path, corpus_copy):
+        key = _key(corpus_copy / '4096')
+        cache = HashCache(tmp_path / 'hashes.db')
+        cache.set_file(key, 'abc')
+        cache.set_fragment(key, 1, 2, 'def')
+        cache.close()
+        cache = HashCache(tmp_path / 'hashes.db')
+        assert cache.get_file(key) == 'abc'
+        assert cache.get_fragment(key, 1, 2) == 'def'
+        cache.close()
+
+
+class TestCorpusHashCache:
+    def test_that_file_hashes_are_taken_from_the_cache(self, tmp_path, corpus_copy, monkeypatch):
+        path = corpus_copy / '4096'
+        expected = hashlib.sha256(path.read_bytes()).hexdigest()
+        assert File(path, corpus=Corpus(corpus_copy, hash_cache=tmp_path / 'hashes.db')).hash == expected
+        monkeypatch.setattr(woodblock.utils, 'hash_file', lambda path: pytest.fail('file hashed again'))
+        assert File(path, corpus=Corpus(corpus_copy, hash_cache=tmp_path / 'hashes.db')).hash == expected
+
+    def test_that_a_cache_hit_does_not_write_to_the_cache(self, tmp_path, corpus_copy, monkeypatch):
+        path = corpus_copy / '4096'
+        corpus = Corpus(corpus_copy, hash_cache=tmp_path / 'hashes.db')
+        expected = corpus.hash_file(path)
+        writes = []
+        monkeypatch.setattr(HashCache, 'set_file', lambda self, key, sha256: writes.append(key))
+        assert corpus.hash_file(path) == expected
+        assert Corpus(corpus_copy, hash_cache=tmp_path / 'hashes.db').hash_file(path) == expected
+        assert writes == []
+
+    def test_that_fragment_hashes_are_taken_from_the_cache(self, tmp_path, corpus_copy, monkeypatch):
+        path = corpus_copy / '4096'
+        expected = hashlib.sha256(path.read_bytes()[100:1000]).hexdigest()
+        corpus = Corpus(corpus_copy, hash_cache=tmp_path / 'hashes.db')
+        assert FileFragment(File(path, corpus=corpus), 1, 100, 1000).hash == expected
+        monkeypatch.setattr(FileFragment, '__iter__', lambda self: pytest.fail('fragment read again'))
+        corpus = Corpus(corpus_copy, hash_cache=tmp_path / 'hashes.db')
+        assert FileFragment(File(path, corpus=corpus), 1, 100, 1000).hash == expected
+
+    def test_that_modified_files_are_hashed_again(self, tmp_path, corpus_copy):
+        path = corpus_copy / '4096'
+        File(path, corpus=Corpus(corpus_copy, hash_cache=tmp_path / 'hashes.db')).hash
+        path.write_bytes(b'modified')
+        _touch(path)
+        corpus = Corpus(corpus_copy, hash_cache=tmp_path / 'hashes.db')
+        assert File(path, corpus=corpus).hash == hashlib.sha256(b'modified').hexdigest()
+        assert FileFragment(File(path, corpus=corpus), 1, 0, 3).hash == hashlib.sha256(b'mod').hexdigest()
+
+    def test_that_a_corpus_without_cache_has_no_fragment_hashes(self, corpus_copy):
+        corpus = Corpus(corpus_copy)
+        assert corpus.hash_cache is None
+        assert corpus.cached_fragment_hash(corpus_copy / '4096', 0, 10) is None
+        corpus.record_fragment_hash(corpus_copy / '4096', 0, 10, 'abc')
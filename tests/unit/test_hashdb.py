@@ -0,0 +1,125 @@
+import hashlib
+import io
+import sqlite3
+
+import pytest
+
+import woodblock
+from woodblock.errors import WoodblockError
+from woodblock.file import File
+from woodblock.fragments import FileFragment, RandomDataFragment, ZeroesFragment
+from woodblock.hashdb import HashDatabase
+from woodblock.image import Image
+from woodblock.scenario import Scenario
+
+
+@pytest.fixture
+def image(path_test_file_4k):
+    woodblock.random.seed(5)
+    file = File(path_test_file_4k)
+    scenario = Scenario('hashdb')
+    scenario.add(FileFragment(file, 2, 1024, 3072))
+    scenario.add(RandomDataFragment(1000))
+    scenario.add(FileFragment(file, 1, 0, 1024))
+    scenario.add(ZeroesFragment(512))
+    scenario.add(FileFragment(file, 3, 3072, 4000))
+    image = Image(block_size=512, scenario_gap=1)
+    image.add(scenario)
+    return image
+
+
+def _blocks(path):
+    with sqlite3.connect(path) as db:
+        return db.execute('SELECT hash, image_offset, file_id, file_offset FROM blocks ORDER BY image_offset').fetchall()
+
+
+class TestHashDatabase:
+    def test_that_the_blocks_match_the_image_and_the_file(self, image, path_test_file_4k, tmp_path):
+        image.write(tmp_path / 'image.dd', hashdb_path=tmp_path / 'image.hashdb')
+        data = (tmp_path / 'image.dd').read_bytes()
+        file_data = path_test_file_4k.read_bytes()
+        blocks = _blocks(tmp_path / 'image.hashdb')
+        assert [(image_offset, file_offset) for _, image_offset, _, file_offset in blocks] == [
+            (0, 1024), (512, 1536), (1024, 2048), (1536, 2560), (3072, 0), (3584, 512), (4608, 3072),
+        ]
+        for digest, image_offset, _, file_offset in blocks:
+            assert hashlib.md5(data[image_offset:image_offset + 512]).hexdigest() == digest  # nosec
+            assert hashlib.md5(file_data[file_offset:file_offset + 512]).hexdigest() == digest  # nosec
+
+    def test_that_the_files_and_the_meta_data_are_recorded(self, image, path_test_file_4k, tmp_path):
+        image.write(io.BytesIO(), hashdb_path=tmp_path / 'image.hashdb')
+        with sqlite3.connect(tmp_path / 'image.hashdb') as db:
+            files = db.execute('SELECT id, path, size FROM files').fetchall()
+            meta = dict(db.execute('SELECT key, value FROM meta').fetchall())
+        assert len(files) == 1
+        assert files[0][1:] == (str(path_test_file_4k.relative_to(woodblock.file.get_corpus())), 4096)
+        assert {row[2] for row in _blocks(tmp_path / 'image.hashdb')} == {files[0][0]}
+        assert meta == {'block_size': '512', 'hash_algorithm': 'md5', 'seed': '5'}
+
+    def test_that_the_image_is_not_changed(self, image, tmp_path):
+        expected = io.BytesIO()
+        image.write(expected)
+        image.write(tmp_path / 'image.dd', hashdb_path=tmp_path / 'image.hashdb')
+        assert (tmp_path / 'image.dd').read_bytes() == expected.getvalue()
+
+    def test_that_small_chunks_are_combined_into_blocks(self, path_test_file_4k, tmp_path):
+        database = HashDatabase(tmp_path / 'chunks.hashdb', block_size=512, algorithm='sha1')
+        fragment = FileFragment(File(path_test_file_4k), 1, 0, 4096, chunk_size=100)
+        database.add_fragment(8192, fragment)
+        database.close()
+        blocks = _blocks(tmp_path / 'chunks.hashdb')
+        data = path_test_file_4k.read_bytes()
+        assert [(image_offset, file_offset) for _, image_offset, _, file_offset in blocks] == [
+            (8192 + offset, offset) for offset in range(0, 4096, 512)
+        ]
+        assert [digest for digest, *_ in blocks] == [
+            hashlib.sha1(data[offset:offset + 512]).hexdigest() for offset in range(0, 4096, 512)  # nosec
+        ]
+
+    def test_that_a_resumed_image_gets_a_complete_database(self, image, tmp_path, monkeypatch):
+        image.write(io.BytesIO(), hashdb_path=tmp_path / 'expected.hashdb')
+        monkeypatch.setattr(woodblock.journal, 'DEFAULT_CHECKPOINT_INTERVAL', 1)
+        write_fragment = woodblock.output.Output.write_fragment
+
+        def interrupted_write_fragment(self, fragment):
+            if getattr(fragment, 'number', None) == 3:
+                raise KeyboardInterrupt
+            write_fragment(self, fragment)
+
+        with monkeypatch.context() as patch:
+            patch.setattr(woodblock.output.Output, 'write_fragment', interrupted_write_fragment)
+            with pytest.raises(KeyboardInterrupt):
+                image.write(tmp_path / 'image.dd', resume=True, hashdb_path=tmp_path / 'image.hashdb')
+        image.write(tmp_path / 'image.dd', resume=True, hashdb_path=tmp_path / 'image.hashdb')
+        assert _blocks(tmp_path / 'image.hashdb') == _blocks(tmp_path / 'expected.hashdb')
+
+    def test_that_an_existing_database_is_replaced(self, image, tmp_path):
+        image.write(io.BytesIO(), hashdb_path=tmp_path / 'image.hashdb')
+        image.write(io.BytesIO(), hashdb_path=tmp_path / 'image.hashdb')
+        assert len(_blocks(tmp_path / 'image.hashdb')) == 7
+
+    @pytest.mark.parametrize('options', ({'workers': 2}, {'resume': True, 'compression': 'gz'}))
+    def test_that_a_failed_write_keeps_an_existing_database(self, image, tmp_path, options):
+        image.write(io.BytesIO(), hashdb_path=tmp_path / 'image.hashdb')
+        expected = _blocks(tmp_path / 'image.hashdb')
+        with pytest.raises(WoodblockError):
+            image.write(tmp_path / 'image.dd', hashdb_path=tmp_path / 'image.hashdb', **options)
+        assert _blocks(tmp_path / 'image.hashdb') == expected
+        assert not (tmp_path / 'image.hashdb.partial').exists()
+
+    def test_that_the_database_is_only_moved_into_place_when_closed(self, tmp_path):
+        (tmp_path / 'x.hashdb').write_bytes(b'old')
+        database = HashDatabase(tmp_path / 'x.hashdb', block_size=512)
+        assert (tmp_path / 'x.hashdb').read_bytes() == b'old'
+        database.close()
+        assert len(_blocks(tmp_path / 'x.hashdb')) == 0
+        assert not (tmp_path / 'x.hashdb.partial').exists()
+
+    def test_that_an_unknown_algorithm_raises_an_error(self, tmp_path):
+        with pytest.raises(WoodblockError):
+            HashDatabase(tmp_path / 'x.hashdb', block_size=512, algorithm='no-such-hash')
+
+    @pytest.mark.parametrize('options', ({'workers': 2}, {'memory_map': True}))
+    def test_that_a_database_requires_sequential_writing(self, image, tmp_path, options):
+        with pytest.raises(WoodblockError):
+            image.write(tmp_path / 'image.dd', hashdb_path=tmp_path / 'x.hashdb', **options)
@@ -1,4 +1,10 @@
+import bz2
+import gzip
+import hashlib
 import io
+import json
+import lzma
+import os
 from math import ceil
 
 import pytest
@@ -6,7 +12,8 @@ import pytest
 import woodblock
 from woodblock.errors import WoodblockError
 from woodblock.file import File
-from woodblock.fragments import ZeroesFragment
+from woodblock.datagen import SeekableRandom
+from woodblock.fragments import FileFragment, FillerFragment, RandomDataFragment, ZeroesFragment
 from woodblock.image import Image
 from woodblock.scenario import Scenario
 
@@ -68,14 +75,15 @@ class TestImage:
 class TestImageMetadata:
     def test_an_empty_image(self, test_corpus_path):
         woodblock.random.seed(13)
-        assert Image(block_size=513).metadata == {'block_size': 513, 'seed': 13, 'corpus': str(test_corpus_path),
-                                                  'scenarios': []}
+        assert Image(block_size=513).metadata == {'block_size': 513, 'seed': 13, 'rng': woodblock.random.get_info(),
+                                                  'corpus': str(test_corpus_path), 'scenarios': []}
 
     def test_an_image_with_a_single_scenario(self, test_corpus_path):
         woodblock.random.seed(13)
         image = Image(block_size=513)
         image.add(Scenario('some scenario'))
-        assert image.metadata == {'block_size': 513, 'seed': 13, 'corpus': str(test_corpus_path),
+        assert image.metadata == {'block_size': 513, 'seed': 13, 'rng': woodblock.random.get_info(),
+                                  'corpus': str(test_corpus_path),
                                   'scenarios': [{'name': 'some scenario', 'files': []}]}
 
     def test_an_image_with_multiple_scenarios(self, test_corpus_path):
@@ -84,7 +92,8 @@ class TestImageMetadata:
         image.add(Scenario('first scenario'))
         image.add(Scenario('second scenario'))
         image.add(Scenario('third scenario'))
-        assert image.metadata == {'block_size': 513, 'seed': 13, 'corpus': str(test_corpus_path),
+        assert image.metadata == {'block_size': 513, 'seed': 13, 'rng': woodblock.random.get_info(),
+                                  'corpus': str(test_corpus_path),
                                   'scenarios': [{'name': 'first scenario', 'files': []},
                                                 {'name': 'second scenario', 'files': []},
                                                 {'name': 'third scenario', 'files': []}]}
@@ -110,3 +119,700 @@ class TestImageMetadata:
         image.add(second)
         with pytest.raises(WoodblockError):
             _ = image.metadata
+
+
+class TestWritingToRegularFiles:
+    @pytest.fixture
+    def image(self, path_test_file_4k):
+        woodblock.random.seed(7)
+        file = File(path_test_file_4k)
+        scenario = Scenario('kernel copy')
+        scenario.add(FileFragment(file, 2, 1000, 3000))
+        scenario.add(ZeroesFragment(700))
+        scenario.add(FileFragment(file, 1, 0, 1000))
+        scenario.add(FileFragment(file, 3, 3000, 4096))
+        image = Image(block_size=512)
+        image.add(scenario)
+        return image
+
+    def test_that_the_file_output_matches_the_stream_output(self, image, tmp_path):
+        buf = io.BytesIO()
+        image.write(buf)
+        image.write(tmp_path / 'image.dd')
+        assert (tmp_path / 'image.dd').read_bytes() == buf.getvalue()
+
+    def test_that_file_fragments_are_copied_in_kernel_space(self, image, tmp_path, monkeypatch):
+        copies = []
+        copy_to = FileFragment.copy_to
+        monkeypatch.setattr(FileFragment, 'copy_to', lambda self, fd: copies.append(self) or copy_to(self, fd))
+        image.write(tmp_path / 'image.dd')
+        assert len(copies) == 3
+
+    def test_that_the_hashes_match_the_kernel_copied_data(self, image, tmp_path):
+        image.write(tmp_path / 'image.dd')
+        data = (tmp_path / 'image.dd').read_bytes()
+        for scenario in image.metadata['scenarios']:
+            for file in scenario['files']:
+                for frag in file['fragments']:
+                    offsets = frag['image_offsets']
+                    assert hashlib.sha256(data[offsets['start']:offsets['end']]).hexdigest() == frag['sha256']
+
+    def test_that_a_file_object_keeps_its_position_in_sync(self, image, tmp_path):
+        with open(tmp_path / 'image.dd', 'wb') as handle:
+            handle.write(b'HEAD')
+            image.write(handle)
+            handle.write(b'TAIL')
+        buf = io.BytesIO()
+        image.write(buf)
+        assert (tmp_path / 'image.dd').read_bytes() == b'HEAD' + buf.getvalue() + b'TAIL'
+
+
+class TestConcurrentWriting:
+    @pytest.fixture
+    def image(self, path_test_file_4k):
+        woodblock.random.seed(4711)
+        file = File(path_test_file_4k)
+        first = Scenario('first')
+        first.add(FileFragment(file, 2, 1000, 3000))
+        first.add(RandomDataFragment(700))
+        first.add(FileFragment(file, 1, 0, 1000))
+        second = Scenario('second')
+        second.add(RandomDataFragment(9000))
+        second.add(ZeroesFragment(100))
+        second.add(FileFragment(file, 3, 3000, 4096))
+        image = Image(block_size=512, scenario_gap=3, target_size=64)
+        image.add(first)
+        image.add(second)
+        return image
+
+    @pytest.mark.parametrize('workers', (2, 4, 16))
+    def test_that_the_output_is_identical_to_a_sequential_write(self, image, tmp_path, workers):
+        buf = io.BytesIO()
+        image.write(buf)
+        image.write(tmp_path / 'image.dd', workers=workers)
+        assert (tmp_path / 'image.dd').read_bytes() == buf.getvalue()
+
+    def test_that_the_hashes_match_the_written_data(self, image, tmp_path):
+        image.write(tmp_path / 'image.dd', workers=4)
+        data = (tmp_path / 'image.dd').read_bytes()
+        for scenario in image.metadata['scenarios']:
+            for file in scenario['files']:
+                for frag in file['fragments']:
+                    offsets = frag['image_offsets']
+                    assert hashlib.sha256(data[offsets['start']:offsets['end']]).hexdigest() == frag['sha256']
+
+    def test_that_writing_starts_at_the_position_of_a_file_object(self, image, tmp_path):
+        with open(tmp_path / 'image.dd', 'wb') as handle:
+            handle.write(b'HEAD')
+            image.write(handle, workers=4)
+            handle.write(b'TAIL')
+        buf = io.BytesIO()
+        image.write(buf)
+        assert (tmp_path / 'image.dd').read_bytes() == b'HEAD' + buf.getvalue() + b'TAIL'
+
+    def test_that_streams_without_a_file_descriptor_are_written_sequentially(self, image):
+        first = io.BytesIO()
+        second = io.BytesIO()
+        image.write(first)
+        image.write(second, workers=4)
+        assert first.getvalue() == second.getvalue()
+
+    def test_that_an_empty_image_can_be_written(self, tmp_path):
+        Image().write(tmp_path / 'image.dd', workers=4)
+        assert (tmp_path / 'image.dd').read_bytes() == b''
+
+
+def _fail_on_read(self):
+    raise AssertionError(f'{self!r} was read.')
+
+
+class TestHashFreeLayout:
+    @pytest.fixture
+    def scenario(self, path_test_file_4k):
+        file = File(path_test_file_4k)
+        scenario = Scenario('layout')
+        scenario.add(FileFragment(file, 1, 0, 1000))
+        scenario.add(RandomDataFragment(700))
+        scenario.add(FileFragment(file, 2, 1000, 4096))
+        return scenario
+
+    def test_that_the_layout_is_computed_without_reading_fragments(self, scenario, monkeypatch):
+        image = Image(block_size=512)
+        image.add(scenario)
+        monkeypatch.setattr(FileFragment, '__iter__', _fail_on_read)
+        monkeypatch.setattr(RandomDataFragment, '__iter__', _fail_on_read)
+        offsets, content_size = image._compute_image_offsets()
+        assert content_size == 2048 + 3584
+        assert sorted(o['start'] for f in offsets.values() for o in f.values()) == [0, 1024, 2048]
+
+    def test_that_a_too_small_target_size_is_detected_before_reading_fragments(self, scenario, monkeypatch):
+        image = Image(block_size=512, target_size=2)
+        image.add(scenario)
+        monkeypatch.setattr(FileFragment, '__iter__', _fail_on_read)
+        monkeypatch.setattr(RandomDataFragment, '__iter__', _fail_on_read)
+        with pytest.raises(WoodblockError):
+            image.write(io.BytesIO())
+
+    def test_that_the_hashes_are_computed_while_writing(self, scenario, monkeypatch):
+        image = Image(block_size=512, target_size=20)
+        image.add(scenario)
+        buf = io.BytesIO()
+        image.write(buf)
+        monkeypatch.setattr(FileFragment, '__iter__', _fail_on_read)
+        monkeypatch.setattr(RandomDataFragment, '__iter__', _fail_on_read)
+        data = buf.getvalue()
+        for scenario in image.metadata['scenarios']:
+            for file in scenario['files']:
+                for frag in file['fragments']:
+                    offsets = frag['image_offsets']
+                    assert hashlib.sha256(data[offsets['start']:offsets['end']]).hexdigest() == frag['sha256']
+
+
+def _supports_holes(directory):
+    probe = directory / 'probe'
+    with probe.open('wb') as handle:
+        handle.truncate(1 << 20)
+    supported = probe.stat().st_blocks == 0
+    probe.unlink()
+    return supported
+
+
+class TestSparseWriting:
+    @pytest.fixture
+    def image(self, path_test_file_4k):
+        woodblock.random.seed(23)
+        file = File(path_test_file_4k)
+        scenario = Scenario('sparse')
+        scenario.add(FileFragment(file, 1, 0, 1000))
+        scenario.add(ZeroesFragment(1 << 20))
+        scenario.add(RandomDataFragment(700))
+        scenario.add(FileFragment(file, 2, 1000, 4096))
+        scenario.add(ZeroesFragment(300))
+        image = Image(block_size=512, padding_generator=woodblock.datagen.Zeroes(), scenario_gap=8, target_size=8192)
+        image.add(scenario)
+        image.add(Scenario('empty'))
+        return image
+
+    @pytest.mark.parametrize('workers', (None, 4))
+    def test_that_the_output_is_identical_to_a_dense_write(self, image, tmp_path, workers):
+        buf = io.BytesIO()
+        image.write(buf)
+        image.write(tmp_path / 'image.dd', workers=workers, sparse=True)
+        assert (tmp_path / 'image.dd').read_bytes() == buf.getvalue()
+
+    @pytest.mark.parametrize('workers', (None, 4))
+    def test_that_zero_regions_become_holes(self, image, tmp_path, workers):
+        if not _supports_holes(tmp_path):
+            pytest.skip('The file system does not support sparse files.')
+        image.write(tmp_path / 'image.dd', workers=workers, sparse=True)
+        stat = (tmp_path / 'image.dd').stat()
+        assert stat.st_size == 8192 * 512
+        assert stat.st_blocks * 512 < 64 * 1024
+
+    def test_that_the_hashes_of_skipped_regions_are_correct(self, image, tmp_path):
+        image.write(tmp_path / 'image.dd', sparse=True)
+        data = (tmp_path / 'image.dd').read_bytes()
+        for scenario in image.metadata['scenarios']:
+            for file in scenario['files']:
+                for frag in file['fragments']:
+                    offsets = frag['image_offsets']
+                    assert hashlib.sha256(data[offsets['start']:offsets['end']]).hexdigest() == frag['sha256']
+
+    def test_that_streams_without_a_file_descriptor_get_the_zeroes_written(self, image):
+        dense = io.BytesIO()
+        sparse = io.BytesIO()
+        image.write(dense)
+        image.write(sparse, sparse=True)
+        assert sparse.getvalue() == dense.getvalue()
+
+
+class TestMemoryMappedWriting:
+    @pytest.fixture
+    def image(self, path_test_file_4k):
+        woodblock.random.seed(99)
+        file = File(path_test_file_4k)
+        first = Scenario('first')
+        first.add(FileFragment(file, 2, 1000, 3000))
+        first.add(RandomDataFragment(20000))
+        first.add(ZeroesFragment(1500))
+        second = Scenario('second')
+        second.add(FileFragment(file, 1, 0, 1000))
+        second.add(FileFragment(file, 3, 3000, 4096))
+        image = Image(block_size=512, scenario_gap=2, target_size=128)
+        image.add(first)
+        image.add(second)
+        return image
+
+    @pytest.mark.parametrize('workers', (None, 4))
+    @pytest.mark.parametrize('sparse', (False, True))
+    def test_that_the_output_is_identical_to_a_stream_write(self, image, tmp_path, workers, sparse):
+        buf = io.BytesIO()
+        image.write(buf)
+        image.write(tmp_path / 'image.dd', workers=workers, sparse=sparse, memory_map=True)
+        assert (tmp_path / 'image.dd').read_bytes() == buf.getvalue()
+
+    def test_that_the_hashes_match_the_written_data(self, image, tmp_path):
+        image.write(tmp_path / 'image.dd', memory_map=True)
+        data = (tmp_path / 'image.dd').read_bytes()
+        for scenario in image.metadata['scenarios']:
+            for file in scenario['files']:
+                for frag in file['fragments']:
+                    offsets = frag['image_offsets']
+                    assert hashlib.sha256(data[offsets['start']:offsets['end']]).hexdigest() == frag['sha256']
+
+    def test_that_a_file_object_keeps_its_position_in_sync(self, image, tmp_path):
+        head = b'H' * 5000
+        with open(tmp_path / 'image.dd', 'w+b') as handle:
+            handle.write(head)
+            image.write(handle, memory_map=True)
+            handle.write(b'TAIL')
+        buf = io.BytesIO()
+        image.write(buf)
+        assert (tmp_path / 'image.dd').read_bytes() == head + buf.getvalue() + b'TAIL'
+
+    def test_that_write_only_file_objects_are_written_positionally(self, image, tmp_path):
+        with open(tmp_path / 'image.dd', 'wb') as handle:
+            image.write(handle, memory_map=True)
+        buf = io.BytesIO()
+        image.write(buf)
+        assert (tmp_path / 'image.dd').read_bytes() == buf.getvalue()
+
+    def test_that_an_empty_image_can_be_written(self, tmp_path):
+        Image().write(tmp_path / 'image.dd', memory_map=True)
+        assert (tmp_path / 'image.dd').read_bytes() == b''
+
+    def test_that_streams_are_written_sequentially(self, image):
+        expected = io.BytesIO()
+        image.write(expected)
+        buf = io.BytesIO()
+        image.write(buf, memory_map=True)
+        assert buf.getvalue() == expected.getvalue()
+
+
+class TestSeekablePadding:
+    @pytest.fixture
+    def image(self, path_test_file_4k):
+        woodblock.random.seed(314)
+        file = File(path_test_file_4k)
+        scenario = Scenario('seekable')
+        scenario.add(FileFragment(file, 1, 0, 1000))
+        scenario.add(FillerFragment(20000, data_generator=SeekableRandom()))
+        scenario.add(FileFragment(file, 2, 1000, 3000))
+        scenario.add(ZeroesFragment(700))
+        scenario.add(FileFragment(file, 3, 3000, 4096))
+        image = Image(block_size=512, padding_generator=SeekableRandom(), target_size=96)
+        image.add(scenario)
+        return image
+
+    @pytest.mark.parametrize('workers', (2, 4))
+    @pytest.mark.parametrize('memory_map', (False, True))
+    @pytest.mark.parametrize('sparse', (False, True))
+    def test_that_concurrent_padding_is_identical_to_a_stream_write(self, image, tmp_path, workers, memory_map, sparse):
+        expected = io.BytesIO()
+        image.write(expected)
+        image.write(tmp_path / 'image.dd', workers=workers, memory_map=memory_map, sparse=sparse)
+        assert (tmp_path / 'image.dd').read_bytes() == expected.getvalue()
+
+    def test_that_the_padding_is_generated_by_the_workers(self, image, tmp_path, monkeypatch):
+        monkeypatch.setattr(SeekableRandom, '__call__', lambda self, size: pytest.fail('padding generated in order'))
+        image.write(tmp_path / 'image.dd', workers=2, memory_map=True)
+
+    def test_that_resuming_skips_the_padding(self, image, tmp_path, monkeypatch):
+        monkeypatch.setattr(woodblock.journal, 'DEFAULT_CHECKPOINT_INTERVAL', 1)
+        expected = io.BytesIO()
+        image.write(expected)
+        with monkeypatch.context() as patch:
+            TestResumableWriting._interrupt_after(patch, 2)
+            with pytest.raises(KeyboardInterrupt):
+                image.write(tmp_path / 'image.dd', resume=True)
+        image.write(tmp_path / 'image.dd', resume=True)
+        assert (tmp_path / 'image.dd').read_bytes() == expected.getvalue()
+
+
+class TestChunkSizeInvariance:
+    @pytest.fixture
+    def backend(self):
+        return woodblock.random.DEFAULT_BACKEND
+
+    @pytest.fixture
+    def scenario(self, path_test_file_4k, backend):
+        # The generators take the backend when they are created.
+        woodblock.random.set_backend(backend)
+        woodblock.random.seed(2718)
+        file = File(path_test_file_4k)
+        scenario = Scenario('chunks')
+        scenario.add(FileFragment(file, 1, 0, 1001))
+        scenario.add(RandomDataFragment(20000, chunk_size=999))
+        scenario.add(FileFragment(file, 2, 1001, 4095))
+        return scenario
+
+    @pytest.fixture
+    def image(self, scenario):
+        image = Image(block_size=512, target_size=300, scenario_gap=3)
+        image.add(scenario)
+        return image
+
+    @pytest.mark.parametrize('backend', woodblock.random.BACKENDS)
+    @pytest.mark.parametrize('padding_chunk_size', (8, 1000, 65536))
+    @pytest.mark.parametrize('options', ({}, {'buffer_size': 7}, {'workers': 3}, {'memory_map': True}))
+    def test_that_the_padding_chunk_size_does_not_change_the_image(self, image, tmp_path, monkeypatch, backend,
+                                                                    padding_chunk_size, options):
+        assert image._generate_padding._backend == backend
+        expected = io.BytesIO()
+        image.write(expected)
+        monkeypatch.setattr(woodblock.datagen, 'PADDING_CHUNK_SIZE', padding_chunk_size)
+        image.write(tmp_path / 'image.dd', **options)
+        assert (tmp_path / 'image.dd').read_bytes() == expected.getvalue()
+        with woodblock.virtual.VirtualImage(image) as virtual:
+            assert virtual.read() == expected.getvalue()
+
+    def test_that_the_legacy_padding_is_unchanged(self, image, monkeypatch):
+        # The padding of a region is the data of a single call to the padding generator, however it is chunked.
+        monkeypatch.setattr(woodblock.datagen, 'PADDING_CHUNK_SIZE', 16)
+        data = io.BytesIO()
+        image.write(data)
+        image._generate_padding.reset()
+        regions = list(image._regions())
+        padding = [image._generate_padding(size) for _, size, fragment in regions if fragment is None]
+        assert padding == [data.getvalue()[offset:offset + size] for offset, size, fragment in regions
+                           if fragment is None]
+
+    def test_that_seekable_padding_is_generated_in_chunks(self, scenario, tmp_path, monkeypatch):
+        image = Image(block_size=512, padding_generator=SeekableRandom(), target_size=300, scenario_gap=3)
+        image.add(scenario)
+        expected = io.BytesIO()
+        image.write(expected)
+        sizes = []
+        bytes_at = SeekableRandom.bytes_at
+        monkeypatch.setattr(SeekableRandom, 'bytes_at', lambda self, offset, size: sizes.append(size) or bytes_at(
+            self, offset, size))
+        monkeypatch.setattr(woodblock.datagen, 'PADDING_CHUNK_SIZE', 4096)
+        image.write(tmp_path / 'image.dd', workers=2)
+        assert max(sizes) == 4096
+        assert (tmp_path / 'image.dd').read_bytes() == expected.getvalue()
+
+
+class TestResumableWriting:
+    @pytest.fixture
+    def image(self, path_test_file_4k):
+        woodblock.random.seed(1234)
+        file = File(path_test_file_4k)
+        first = Scenario('first')
+        first.add(FileFragment(file, 2, 1000, 3000))
+        first.add(RandomDataFragment(5000))
+        first.add(ZeroesFragment(1500))
+        second = Scenario('second')
+        second.add(FileFragment(file, 1, 0, 1000))
+        second.add(RandomDataFragment(3000))
+        second.add(FileFragment(file, 3, 3000, 4096))
+        image = Image(block_size=512, scenario_gap=2, target_size=64)
+        image.add(first)
+        image.add(second)
+        return image
+
+    @staticmethod
+    def _interrupt_after(monkeypatch, fragments):
+        write_fragment = woodblock.output.Output.write_fragment
+        calls = []
+
+        def failing_write_fragment(self, fragment):
+            if len(calls) == fragments:
+                raise KeyboardInterrupt
+            calls.append(fragment)
+            write_fragment(self, fragment)
+
+        monkeypatch.setattr(woodblock.output.Output, 'write_fragment', failing_write_fragment)
+
+    @pytest.fixture(autouse=True)
+    def small_checkpoint_interval(self, monkeypatch):
+        monkeypatch.setattr(woodblock.journal, 'DEFAULT_CHECKPOINT_INTERVAL', 1)
+
+    @pytest.mark.parametrize('fragments', (0, 1, 3, 4))
+    @pytest.mark.parametrize('sparse', (False, True))
+    def test_that_a_resumed_image_is_identical(self, image, tmp_path, monkeypatch, fragments, sparse):
+        expected = io.BytesIO()
+        image.write(expected)
+        with monkeypatch.context() as patch:
+            self._interrupt_after(patch, fragments)
+            with pytest.raises(KeyboardInterrupt):
+                image.write(tmp_path / 'image.dd', sparse=sparse, resume=True)
+        assert (tmp_path / 'image.dd.journal').exists()
+        image.write(tmp_path / 'image.dd', sparse=sparse, resume=True)
+        assert (tmp_path / 'image.dd').read_bytes() == expected.getvalue()
+        assert not (tmp_path / 'image.dd.journal').exists()
+        assert json.loads((tmp_path / 'image.dd.json').read_text()) == image.metadata
+
+    def test_that_resuming_continues_at_the_last_checkpoint(self, image, tmp_path, monkeypatch):
+        with monkeypatch.context() as patch:
+            self._interrupt_after(patch, 3)
+            with pytest.raises(KeyboardInterrupt):
+                image.write(tmp_path / 'image.dd', resume=True)
+        written = []
+        copy_to = FileFragment.copy_to
+        monkeypatch.setattr(FileFragment, 'copy_to', lambda self, fd: written.append(self) or copy_to(self, fd))
+        image.write(tmp_path / 'image.dd', resume=True)
+        assert [fragment.number for fragment in written] == [3]
+
+    def test_that_a_modified_prefix_is_detected(self, image, tmp_path, monkeypatch):
+        with monkeypatch.context() as patch:
+            self._interrupt_after(patch, 2)
+            with pytest.raises(KeyboardInterrupt):
+                image.write(tmp_path / 'image.dd', resume=True)
+        with open(tmp_path / 'image.dd', 'r+b') as handle:
+            handle.seek(2048)
+            handle.write(b'corrupted')
+        with pytest.raises(WoodblockError):
+            image.write(tmp_path / 'image.dd', resume=True)
+
+    def test_that_a_journal_of_a_different_image_is_rejected(self, image, tmp_path, monkeypatch):
+        with monkeypatch.context() as patch:
+            self._interrupt_after(patch, 2)
+            with pytest.raises(KeyboardInterrupt):
+                image.write(tmp_path / 'image.dd', resume=True)
+        image.add(Scenario('third'))
+        image.add(Scenario('fourth'))
+        image._scenario_gap_bytes = 1024
+        with pytest.raises(WoodblockError):
+            image.write(tmp_path / 'image.dd', resume=True)
+
+    @pytest.mark.parametrize('keep_mtime', (False, True))
+    def test_that_a_changed_file_is_detected(self, path_test_file_4k, tmp_path, monkeypatch, keep_mtime):
+        path = tmp_path / 'file.bin'
+        path.write_bytes(path_test_file_4k.read_bytes())
+
+        def build_image():
+            # Every run builds its own image, like a new process resuming the image would.
+            woodblock.random.seed(1234)
+            file = File(path)
+            scenario = Scenario('changed')
+            scenario.add(FileFragment(file, 1, 0, 2048))
+            scenario.add(RandomDataFragment(3000))
+            scenario.add(FileFragment(file, 2, 2048, 4096))
+            image = Image(block_size=512)
+            image.add(scenario)
+            return image
+
+        with monkeypatch.context() as patch:
+            self._interrupt_after(patch, 1)
+            with pytest.raises(KeyboardInterrupt):
+                build_image().write(tmp_path / 'image.dd', resume=True)
+        stat = path.stat()
+        path.write_bytes(bytes(reversed(path.read_bytes())))
+        if keep_mtime:
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        with pytest.raises(WoodblockError):
+            build_image().write(tmp_path / 'image.dd', resume=True)
+
+    def test_that_resuming_requires_a_path(self, image):
+        with pytest.raises(WoodblockError):
+            image.write(io.BytesIO(), resume=True)
+
+    @pytest.mark.parametrize('options', ({'workers': 2}, {'memory_map': True}))
+    def test_that_resuming_is_sequential_only(self, image, tmp_path, options):
+        with pytest.raises(WoodblockError):
+            image.write(tmp_path / 'image.dd', resume=True, **options)
+
+
+class TestImageDigests:
+    @pytest.fixture
+    def image(self, path_test_file_4k):
+        woodblock.random.seed(77)
+        file = File(path_test_file_4k)
+        scenario = Scenario('digests')
+        scenario.add(FileFragment(file, 1, 0, 1000))
+        scenario.add(RandomDataFragment(3000))
+        scenario.add(ZeroesFragment(2000))
+        scenario.add(FileFragment(file, 2, 1000, 4096))
+        image = Image(block_size=512, scenario_gap=2, target_size=32)
+        image.add(scenario)
+        image.add(Scenario('empty'))
+        return image
+
+    @staticmethod
+    def _expected_digests(data):
+        return {name: hashlib.new(name, data).hexdigest() for name in ('sha256', 'md5', 'sha1')}
+
+    @pytest.mark.parametrize('options', ({}, {'sparse': True}, {'resume': True}, {'buffer_size': 0}))
+    def test_that_the_digests_match_the_image_file(self, image, tmp_path, options):
+        image.write(tmp_path / 'image.dd', digests=('sha256', 'md5', 'sha1'), **options)
+        expected = self._expected_digests((tmp_path / 'image.dd').read_bytes())
+        assert image.metadata['digests'] == expected
+        assert json.loads((tmp_path / 'image.dd.json').read_text())['digests'] == expected
+
+    def test_that_the_digests_match_a_streamed_image(self, image):
+        buf = io.BytesIO()
+        image.write(buf, digests=('SHA256', 'md5', 'sha1'))
+        assert image.metadata['digests'] == self._expected_digests(buf.getvalue())
+
+    def test_that_the_digests_are_correct_for_a_resumed_image(self, image, tmp_path, monkeypatch):
+        monkeypatch.setattr(woodblock.journal, 'DEFAULT_CHECKPOINT_INTERVAL', 1)
+        with monkeypatch.context() as patch:
+            patch.setattr(woodblock.output.Output, 'write_fragment', _raise_keyboard_interrupt_on_file_fragments)
+            with pytest.raises(KeyboardInterrupt):
+                image.write(tmp_path / 'image.dd', resume=True, digests=('sha256',))
+        image.write(tmp_path / 'image.dd', resume=True, digests=('sha256',))
+        expected = hashlib.sha256((tmp_path / 'image.dd').read_bytes()).hexdigest()
+        assert image.metadata['digests'] == {'sha256': expected}
+
+    def test_that_no_digests_are_recorded_by_default(self, image, tmp_path):
+        image.write(tmp_path / 'image.dd')
+        assert 'digests' not in image.metadata
+
+    def test_that_a_checksum_file_can_be_verified_with_sha256sum(self, image, tmp_path):
+        image.write(tmp_path / 'image.dd', checksum_path=tmp_path / 'image.dd.sha256')
+        digest = hashlib.sha256((tmp_path / 'image.dd').read_bytes()).hexdigest()
+        assert (tmp_path / 'image.dd.sha256').read_text() == f'{digest}  image.dd\n'
+        assert image.metadata['digests'] == {'sha256': digest}
+
+    def test_that_the_checksum_file_matches_the_file_it_names(self, image, tmp_path):
+        (tmp_path / 'images').mkdir()
+        (tmp_path / 'sums').mkdir()
+        image.write(tmp_path / 'images' / 'image.dd', checksum_path=tmp_path / 'sums' / 'image.sha256')
+        digest, name = (tmp_path / 'sums' / 'image.sha256').read_text().rstrip('\n').split('  ', 1)
+        assert hashlib.sha256((tmp_path / 'sums' / name).read_bytes()).hexdigest() == digest
+
+    def test_that_an_unknown_algorithm_raises_an_error(self, image):
+        with pytest.raises(WoodblockError):
+            image.write(io.BytesIO(), digests=('no-such-hash',))
+
+    @pytest.mark.parametrize('options', ({'workers': 2}, {'memory_map': True}))
+    def test_that_digests_require_sequential_writing(self, image, tmp_path, options):
+        with pytest.raises(WoodblockError):
+            image.write(tmp_path / 'image.dd', digests=('sha256',), **options)
+
+
+def _raise_keyboard_interrupt_on_file_fragments(self, fragment):
+    if isinstance(fragment, FileFragment) and fragment.number == 2:
+        raise KeyboardInterrupt
+    for chunk in fragment:
+        self.write(chunk)
+
+
+class TestCompressedWriting:
+    @pytest.fixture
+    def image(self, path_test_file_4k):
+        woodblock.random.seed(31)
+        file = File(path_test_file_4k)
+        scenario = Scenario('compressed')
+        scenario.add(FileFragment(file, 1, 0, 1000))
+        scenario.add(ZeroesFragment(100000))
+        scenario.add(RandomDataFragment(3000))
+        scenario.add(FileFragment(file, 2, 1000, 4096))
+        image = Image(block_size=512, target_size=512)
+        image.add(scenario)
+        return image
+
+    @pytest.mark.parametrize('suffix, decompress', (('gz', gzip.decompress), ('bz2', bz2.decompress),
+                                                    ('xz', lzma.decompress)))
+    @pytest.mark.parametrize('workers', (None, 1, 3))
+    def test_that_the_compressed_image_is_identical(self, image, tmp_path, suffix, decompress, workers):
+        expected = io.BytesIO()
+        image.write(expected)
+        image.write(tmp_path / f'image.dd.{suffix}', workers=workers)
+        assert decompress((tmp_path / f'image.dd.{suffix}').read_bytes()) == expected.getvalue()
+        assert (tmp_path / f'image.dd.{suffix}.json').exists()
+
+    def test_that_the_metadata_refers_to_the_uncompressed_image(self, image, tmp_path):
+        image.write(tmp_path / 'image.dd.gz', digests=('sha256',), hashdb_path=tmp_path / 'image.hashdb')
+        data = gzip.decompress((tmp_path / 'image.dd.gz').read_bytes())
+        assert image.metadata['digests'] == {'sha256': hashlib.sha256(data).hexdigest()}
+        for file in image.metadata['scenarios'][0]['files']:
+            for frag in file['fragments']:
+                offsets = frag['image_offsets']
+                assert hashlib.sha256(data[offsets['start']:offsets['end']]).hexdigest() == frag['sha256']
+
+    def test_that_streams_can_be_compressed(self, image):
+        expected = io.BytesIO()
+        image.write(expected)
+        buf = io.BytesIO()
+        image.write(buf, compression='xz')
+        assert lzma.decompress(buf.getvalue()) == expected.getvalue()
+
+    def test_that_the_compression_can_be_set_explicitly(self, image, tmp_path):
+        image.write(tmp_path / 'image.raw', compression='bz2')
+        assert bz2.decompress((tmp_path / 'image.raw').read_bytes())
+
+    def test_that_compressed_images_cannot_be_resumed(self, image, tmp_path):
+        with pytest.raises(WoodblockError):
+            image.write(tmp_path / 'image.dd.gz', resume=True)
+
+    @pytest.mark.parametrize('name, options', (('image.dd.gz', {}), ('image.raw', {'compression': 'xz'})))
+    def test_that_compressed_images_cannot_have_a_checksum_file(self, image, tmp_path, name, options):
+        with pytest.raises(WoodblockError):
+            image.write(tmp_path / name, checksum_path=tmp_path / 'image.sha256', **options)
+        assert not list(tmp_path.iterdir())
+
+
+class TestSegmentedWriting:
+    @pytest.fixture
+    def image(self, path_test_file_4k):
+        woodblock.random.seed(8)
+        file = File(path_test_file_4k)
+        scenario = Scenario('segments')
+        scenario.add(FileFragment(file, 1, 0, 1000))
+        scenario.add(RandomDataFragment(3000))
+        scenario.add(FileFragment(file, 2, 1000, 4096))
+        scenario.add(ZeroesFragment(1024))
+        image = Image(block_size=512, target_size=20)
+        image.add(scenario)
+        return image
+
+    @pytest.mark.parametrize('segment_size', (512, 1024, 3072, 10240, 1 << 20))
+    def test_that_the_segments_make_up_the_image(self, image, tmp_path, segment_size):
+        expected = io.BytesIO()
+        image.write(expected)
+        image.write(tmp_path / 'image', segment_size=segment_size)
+        files = image.metadata['segments']['files']
+        assert files == [f'image.{n:03d}' for n in range(1, ceil(10240 / segment_size) + 1)]
+        segments = [(tmp_path / name).read_bytes() for name in files]
+        assert all(len(segment) == segment_size for segment in segments[:-1])
+        assert b''.join(segments) == expected.getvalue()
+        assert json.loads((tmp_path / 'image.json').read_text()) == image.metadata
+
+    def test_that_the_segment_offsets_locate_the_fragments(self, image, tmp_path):
+        image.write(tmp_path / 'image', segment_size=1024)
+        segments = [(tmp_path / name).read_bytes() for name in image.metadata['segments']['files']]
+        for file in image.metadata['scenarios'][0]['files']:
+            for frag in file['fragments']:
+                start, end = frag['segment_offsets']['start'], frag['segment_offsets']['end']
+                data = b''.join(segments[start['segment'] - 1:end['segment']])
+                data = data[start['offset']:len(data) - len(segments[end['segment'] - 1]) + end['offset']]
+                assert hashlib.sha256(data).hexdigest() == frag['sha256']
+
+    def test_that_a_fragment_crossing_segments_is_recorded(self, image, tmp_path):
+        image.write(tmp_path / 'image', segment_size=1024)
+        fragments = {frag['number']: frag['segment_offsets']
+                     for file in image.metadata['scenarios'][0]['files'] if file['original']['type'] == 'file'
+                     for frag in file['fragments']}
+        assert fragments[1] == {'start': {'segment': 1, 'offset': 0}, 'end': {'segment': 1, 'offset': 1000}}
+        assert fragments[2] == {'start': {'segment': 5, 'offset': 0}, 'end': {'segment': 8, 'offset': 24}}
+
+    def test_that_a_fragment_ending_at_a_segment_boundary_ends_in_its_segment(self, path_test_file_4k, tmp_path):
+        scenario = Scenario('boundary')
+        scenario.add(FileFragment(File(path_test_file_4k), 1, 0, 2048))
+        image = Image(block_size=512)
+        image.add(scenario)
+        image.write(tmp_path / 'image', segment_size=1024)
+        offsets = image.metadata['scenarios'][0]['files'][0]['fragments'][0]['segment_offsets']
+        assert offsets == {'start': {'segment': 1, 'offset': 0}, 'end': {'segment': 2, 'offset': 1024}}
+
+    def test_that_unsegmented_images_have_no_segment_metadata(self, image, tmp_path):
+        image.write(tmp_path / 'image', segment_size=1024)
+        image.write(tmp_path / 'image.dd')
+        assert 'segments' not in image.metadata
+        assert 'segment_offsets' not in image.metadata['scenarios'][0]['files'][0]['fragments'][0]
+
+    @pytest.mark.parametrize('segment_size', (0, 100, 1000))
+    def test_that_the_segment_size_has_to_be_a_multiple_of_the_block_size(self, image, tmp_path,
+                                                                           segment_size):
+        with pytest.raises(WoodblockError):
+            image.write(tmp_path / 'image', segment_size=segment_size)
+
+    @pytest.mark.parametrize('options', ({'compression': 'gz'}, {'resume': True}, {'checksum_path': 'x.sha256'}))
+    def test_that_unsupported_combinations_raise_an_error(self, image, tmp_path, options):
+        with pytest.raises(WoodblockError):
+            image.write(tmp_path / 'image', segment_size=1024, **options)
+
+    def test_that_streams_cannot_be_segmented(self, image):
+        with pytest.raises(WoodblockError):
+            image.write(io.BytesIO(), segment_size=1024)
@@ -1,12 +1,15 @@
 import io
 import pathlib
 import string
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pytest
 from pytest_lazy_fixtures import lf
 
 import woodblock
-from woodblock.errors import ImageConfigError
+from woodblock.corpus import Corpus
+from woodblock.errors import ImageConfigError, WoodblockError
 from woodblock.image import Image
 
 
@@ -369,6 +372,19 @@ class TestImageConfig:
         assert len(buffer.getvalue()) == 10 * 512
         path.unlink()
 
+    def test_that_checking_the_image_size_reads_no_fragment_data(self, configs_dir, monkeypatch):
+        def fail_on_read(fragment):
+            raise AssertionError(f'{fragment!r} was read.')
+
+        monkeypatch.setattr(woodblock.fragments.FileFragment, '__iter__', fail_on_read)
+        monkeypatch.setattr(woodblock.fragments.FillerFragment, '__iter__', fail_on_read)
+        path = configs_dir / 'image-size.conf'
+        with path.open('w') as config:
+            config.write('[general]\nseed = 1\ncorpus = ../corpus/\nblock size = 512\nimage size = 20\n\n')
+            config.write('[s]\nfile1 = 4096\nsizes file1 = 3, 5\nlayout = 1-2, R, 1-1\n')
+        Image.from_config(pathlib.Path(path))
+        path.unlink()
+
     @pytest.mark.parametrize('scenario_body', (
             # number of sizes does not match frags
             'file1 = 4096\nfrags file1 = 2\nsizes file1 = 2, 3, 3\nlayout = 1-1, 1-2\n',
@@ -420,12 +436,182 @@ class TestImageConfig:
         assert len(image.metadata['scenarios'][0]['files'][0]['fragments']) == 2
         path.unlink()
 
+    @pytest.mark.parametrize('backend', woodblock.random.BACKENDS)
+    def test_that_the_rng_backend_is_set_and_recorded(self, backend, configs_dir):
+        path = configs_dir / 'rng.conf'
+        with path.open('w') as config:
+            config.write(f'[general]\nseed = 1\ncorpus = ../corpus/\nrng = {backend.upper()}\n\n')
+            config.write('[s]\nfile1 = 1024\nsizes file1 = 2\nlayout = 1-1, R\n')
+        image = Image.from_config(pathlib.Path(path))
+        assert woodblock.random.get_backend() == backend
+        assert image.metadata['rng']['backend'] == backend
+        path.unlink()
+
+    def test_that_the_legacy_rng_backend_is_the_default(self, configs_dir, minimal_config):
+        woodblock.random.set_backend('pcg64')
+        image = Image.from_config(minimal_config)
+        assert image.metadata['rng'] == {
+            'backend': 'mt19937',
+            'version': 1,
+            'numpy': np.__version__,
+            'seeding': 'sequential',
+        }
+
+    def test_that_an_unknown_rng_backend_raises_an_error(self, configs_dir):
+        path = configs_dir / 'invalid-rng.conf'
+        with path.open('w') as config:
+            config.write('[general]\nseed = 1\ncorpus = ../corpus/\nrng = lcg\n\n')
+            config.write('[s]\nfile1 = 1024\nsizes file1 = 2\nlayout = 1-1\n')
+        with pytest.raises(ImageConfigError):
+            Image.from_config(pathlib.Path(path))
+        path.unlink()
+
+    def test_that_an_unknown_seeding_raises_an_error(self, configs_dir):
+        path = configs_dir / 'invalid-seeding.conf'
+        with path.open('w') as config:
+            config.write('[general]\nseed = 1\ncorpus = ../corpus/\nseeding = random\n\n')
+            config.write('[s]\nfile1 = 1024\nsizes file1 = 2\nlayout = 1-1\n')
+        with pytest.raises(ImageConfigError):
+            Image.from_config(pathlib.Path(path))
+        path.unlink()
+
+    @pytest.mark.parametrize('seeding', woodblock.random.SEEDINGS)
+    def test_that_a_seed_reproduces_the_image(self, seeding, configs_dir):
+        path = _write_seeding_config(configs_dir, seeding, first_layout='R, 1-1, R')
+        assert _image_data(Image.from_config(path)) == _image_data(Image.from_config(path))
+        path.unlink()
+
+    def test_that_hierarchical_scenarios_do_not_depend_on_other_scenarios(self, configs_dir):
+        path = _write_seeding_config(configs_dir, 'hierarchical', first_layout='R')
+        image = Image.from_config(path)
+        path = _write_seeding_config(configs_dir, 'hierarchical', first_layout='R, 1-1, Z, R, R')
+        other_image = Image.from_config(path)
+        assert _scenario_data(image, 1) == _scenario_data(other_image, 1)
+        assert _corpus_paths(image, 1) == _corpus_paths(other_image, 1)
+        assert image.metadata['rng']['seeding'] == 'hierarchical'
+        path.unlink()
+
+    def test_that_hierarchical_seeding_does_not_touch_the_global_context(self, configs_dir):
+        woodblock.random.seed(7)
+        path = _write_seeding_config(configs_dir, 'hierarchical', first_layout='R')
+        image = Image.from_config(path)
+        assert woodblock.random.get_seed() == 7
+        assert woodblock.random.get_randomness().get_seeding() == 'sequential'
+        assert image.metadata['seed'] == 1
+        path.unlink()
+
+    def test_that_images_with_own_contexts_can_be_created_concurrently(self, configs_dir):
+        path = _write_seeding_config(configs_dir, 'sequential', first_layout='R, 1-1, R')
+        expected = _image_data(Image.from_config(path, woodblock.random.Randomness()))
+
+        def create_image(_):
+            return _image_data(Image.from_config(path, woodblock.random.Randomness()))
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assert list(executor.map(create_image, range(8))) == [expected] * 8
+        path.unlink()
+
+    def test_that_the_files_are_taken_from_the_given_corpus(self, configs_dir, test_corpus_path):
+        path = configs_dir / 'explicit-corpus.conf'
+        with path.open('w') as config:
+            config.write('[general]\nseed = 1\ncorpus = ../corpus/\n\n')
+            config.write('[s]\nfrags file1 = 2\nlayout = 1-1, R, 1-2\n')
+        woodblock.file.corpus(None)
+        letters = Corpus(test_corpus_path / 'letters')
+        image = Image.from_config(path, corpus=letters)
+        assert image.metadata['corpus'] == str(letters.path)
+        assert image.metadata['scenarios'][0]['files'][0]['original']['path'].startswith('ascii_')
+        with pytest.raises(WoodblockError):
+            woodblock.file.get_corpus()
+        path.unlink()
+
+    def test_that_the_corpus_index_is_used(self, configs_dir, tmp_path):
+        path = configs_dir / 'corpus-index.conf'
+        for index in ('', f'corpus index = {tmp_path / "corpus.idx"}\n'):
+            with path.open('w') as config:
+                config.write(f'[general]\nseed = 1\ncorpus = ../corpus/\n{index}\n')
+                config.write('[s]\nfrags file1 = 2\nfrags file2 = 1\nlayout = 1-1, R, 2-1, 1-2\n')
+            image = Image.from_config(path)
+            if not index:
+                expected = _image_data(image)
+        assert woodblock.file.get_default_corpus().index.path == tmp_path / 'corpus.idx'
+        assert len(woodblock.file.get_default_corpus().index.files()) > 0
+        assert _image_data(image) == expected
+        path.unlink()
+
+    def test_that_the_hash_cache_is_used(self, configs_dir, tmp_path):
+        path = configs_dir / 'hash-cache.conf'
+        for cache in ('', f'hash cache = {tmp_path / "hashes.db"}\n'):
+            with path.open('w') as config:
+                config.write(f'[general]\nseed = 1\ncorpus = ../corpus/\n{cache}\n')
+                config.write('[s]\nfrags file1 = 2\nfrags file2 = 1\nlayout = 1-1, R, 2-1, 1-2\n')
+            image = Image.from_config(path)
+            data = _image_data(image)
+            hashes = [
+                (file['original']['sha256'], [fragment['sha256'] for fragment in file['fragments']])
+                for file in image.metadata['scenarios'][0]['files']
+            ]
+            if not cache:
+                expected = data, hashes
+        assert woodblock.file.get_default_corpus().hash_cache.path == tmp_path / 'hashes.db'
+        assert (data, hashes) == expected
+        path.unlink()
+
+    def test_that_files_are_picked_by_type(self, typed_corpus, typed_corpus_path, tmp_path):
+        path = tmp_path / 'types.conf'
+        path.write_text(
+            f'[general]\ncorpus = {typed_corpus_path}\ncorpus index = {typed_corpus.index.path}\n\n'
+            '[s]\nfrags file1 = 2\ntype file1 = pdf\nfile2 = docs\nfrags file2 = 1\ntype file2 = text, png\n'
+            'sizes file3 = 1, 7\ntype file3 = png\nlayout = 1.1, 2.1, 3.1, 1.2, 3.2\n'
+        )
+        image = Image.from_config(path)
+        paths = [f['original']['path'] for f in image.metadata['scenarios'][0]['files']]
+        assert paths == ['docs/large.pdf', 'docs/notes', 'image.png']
+
+    def test_that_picking_files_by_type_requires_a_corpus_index(self, typed_corpus_path, tmp_path):
+        path = tmp_path / 'types.conf'
+        path.write_text(
+            f'[general]\ncorpus = {typed_corpus_path}\n\n[s]\nfrags file1 = 1\ntype file1 = pdf\nlayout = 1.1\n'
+        )
+        with pytest.raises(WoodblockError, match='corpus index'):
+            Image.from_config(path)
+
+    @pytest.mark.parametrize('options', ('file1 = image.png\ntype file1 = png\n', 'type file1 = ,\n'))
+    def test_that_invalid_types_raise_an_error(self, typed_corpus_path, tmp_path, options):
+        path = tmp_path / 'types.conf'
+        path.write_text(f'[general]\ncorpus = {typed_corpus_path}\n\n[s]\nfrags file1 = 1\n{options}layout = 1.1\n')
+        with pytest.raises(ImageConfigError):
+            Image.from_config(path)
+
     def test_that_an_invalid_sizes_config_file_raises_an_error(self, configs_dir):
         path = configs_dir / 'invalid' / 'sizes-exceed-file.conf'
         with pytest.raises(ImageConfigError):
             Image.from_config(path)
 
 
+def _write_seeding_config(configs_dir, seeding, first_layout):
+    path = configs_dir / 'seeding.conf'
+    with path.open('w') as config:
+        config.write(f'[general]\nseed = 1\ncorpus = ../corpus/\nseeding = {seeding}\n\n')
+        config.write(f'[first]\nfile1 = 1024\nfrags file1 = 1\nlayout = {first_layout}\n\n')
+        config.write('[second]\nfrags file1 = 2\nlayout = R, 1-2, R, 1-1, Z\n')
+    return path
+
+
+def _image_data(image):
+    data = io.BytesIO()
+    image.write(data)
+    return data.getvalue()
+
+
+def _corpus_paths(image, index):
+    return [f['original']['path'] for f in image.metadata['scenarios'][index]['files'] if 'path' in f['original']]
+
+
+def _scenario_data(image, index):
+    return b''.join(chunk for fragment in image._scenarios[index] for chunk in fragment)
+
+
 @pytest.fixture
 def configs_dir(test_data_path):
     return test_data_path / 'configs'
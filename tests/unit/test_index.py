@@ -0,0 +1,170 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+import woodblock.utils
+from woodblock.corpus import Corpus
+from woodblock.hashcache import HashCache
+from woodblock.index import CorpusIndex
+
+
+def _bump_mtime(path):
+    # The modification time of a directory may not change visibly within the timestamp granularity of the file system.
+    mtime_ns = os.stat(path).st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def corpus_copy(test_corpus_path, tmp_path):
+    path = tmp_path / 'corpus'
+    shutil.copytree(test_corpus_path, path)
+    return path
+
+
+@pytest.fixture
+def index(corpus_copy, tmp_path):
+    index = CorpusIndex(tmp_path / 'corpus.idx', corpus_copy)
+    index.refresh()
+    yield index
+    index.close()
+
+
+class TestCorpusIndex:
+    def test_that_all_files_are_listed_in_pathlib_order(self, index, corpus_copy):
+        expected = sorted(p for p in corpus_copy.glob('**/*') if p.is_file())
+        assert [corpus_copy / path for path, _ in index.files()] == expected
+        assert dict(index.files())['letters/ascii_letters'] == (corpus_copy / 'letters' / 'ascii_letters').stat().st_size
+
+    def test_that_only_modified_directories_are_listed_again(self, index, corpus_copy):
+        assert index.refresh() == 0
+        (corpus_copy / 'letters' / 'new').write_bytes(b'new')
+        _bump_mtime(corpus_copy / 'letters')
+        assert index.refresh() == 1
+        assert ('letters/new', 3) in index.files()
+
+    def test_that_removed_files_and_directories_are_dropped(self, index, corpus_copy):
+        (corpus_copy / '512').unlink()
+        shutil.rmtree(corpus_copy / 'letters' / 'empty')
+        _bump_mtime(corpus_copy)
+        _bump_mtime(corpus_copy / 'letters')
+        index.refresh()
+        paths = [path for path, _ in index.files()]
+        assert '512' not in paths
+        assert 'letters/empty/README.md' not in paths
+        assert 'letters/ascii_letters' in paths
+
+    def test_that_new_directories_are_listed(self, index, corpus_copy):
+        (corpus_copy / 'new' / 'sub').mkdir(parents=True)
+        (corpus_copy / 'new' / 'sub' / 'file').write_bytes(b'data')
+        _bump_mtime(corpus_copy)
+        index.refresh()
+        assert ('new/sub/file', 4) in index.files()
+
+    def test_that_an_index_is_reused(self, index, corpus_copy, tmp_path):
+        files = index.files()
+        index.close()
+        reopened = CorpusIndex(tmp_path / 'corpus.idx', corpus_copy)
+        assert reopened.files() == files
+        assert reopened.refresh() == 0
+        reopened.close()
+
+    def test_that_hashes_are_kept_while_the_file_is_unchanged(self, index, corpus_copy):
+        stat = os.stat(corpus_copy / '4096')
+        index.set_hash('4096', stat.st_size, stat.st_mtime_ns, 'abc')
+        assert index.get_hash('4096', stat.st_size, stat.st_mtime_ns) == 'abc'
+        _bump_mtime(corpus_copy)
+        index.refresh()
+        assert index.get_hash('4096', stat.st_size, stat.st_mtime_ns) == 'abc'
+        assert index.get_hash('4096', stat.st_size + 1, stat.st_mtime_ns) is None
+
+    def test_that_a_rebuild_lists_everything_again(self, index):
+        files = index.files()
+        index.rebuild()
+        assert index.files() == files
+
+    def test_that_an_index_of_another_version_is_recreated(self, index, corpus_copy, tmp_path):
+        index.close()
+        with sqlite3.connect(tmp_path / 'corpus.idx') as db:
+            db.execute("UPDATE meta SET value = '0' WHERE key = 'version'")
+        reopened = CorpusIndex(tmp_path / 'corpus.idx', corpus_copy)
+        assert reopened.files() == []
+        reopened.close()
+
+    def test_that_an_index_with_other_columns_is_recreated(self, index, corpus_copy, tmp_path):
+        index.close()
+        with sqlite3.connect(tmp_path / 'corpus.idx') as db:
+            db.execute('DROP TABLE files')
+            db.execute('CREATE TABLE files (path TEXT PRIMARY KEY, directory TEXT, size INTEGER, mtime_ns INTEGER)')
+            db.execute("UPDATE meta SET value = '1' WHERE key = 'version'")
+        reopened = CorpusIndex(tmp_path / 'corpus.idx', corpus_copy)
+        reopened.refresh()
+        reopened.hash_files()
+        assert reopened.get_type('4096') == 'text'
+        reopened.close()
+
+
+class TestHashFiles:
+    def test_that_hashes_and_types_are_recorded(self, index, corpus_copy):
+        assert index.hash_files(workers=4) == len(index.files())
+        stat = os.stat(corpus_copy / '4096')
+        expected = hashlib.sha256((corpus_copy / '4096').read_bytes()).hexdigest()
+        assert index.get_hash('4096', stat.st_size, stat.st_mtime_ns) == expected
+        assert index.get_type('4096') == 'text'
+        assert index.get_type('letters/empty/README.md') == 'empty'
+        assert index.unhashed() == []
+        assert index.hash_files() == 0
+
+    def test_that_progress_is_reported_for_every_file(self, index):
+        reported = []
+        index.hash_files(progress=lambda path, size: reported.append((path, size)))
+        assert sorted(reported) == sorted(index.files())
+
+    def test_that_modified_files_are_skipped(self, index, corpus_copy):
+        (corpus_copy / '4096').write_bytes(b'modified')
+        assert index.hash_files() == len(index.files()) - 1
+        assert index.unhashed() == [('4096', 4096)]
+
+    def test_that_hashes_and_types_survive_a_refresh(self, index, corpus_copy):
+        index.hash_files()
+        (corpus_copy / 'letters' / 'new').write_bytes(b'new')
+        _bump_mtime(corpus_copy / 'letters')
+        index.refresh()
+        assert index.unhashed() == [('letters/new', 3)]
+        assert index.get_type('letters/ascii_letters') == 'text'
+
+    def test_that_the_hash_cache_is_used(self, index, corpus_copy, tmp_path):
+        cache = HashCache(tmp_path / 'hashes.db')
+        key = woodblock.utils.file_key(os.stat(corpus_copy / '512'))
+        cache.set_file(key, 'cached')
+        index.hash_files(hash_cache=cache)
+        stat = os.stat(corpus_copy / '512')
+        assert index.get_hash('512', stat.st_size, stat.st_mtime_ns) == 'cached'
+        expected = hashlib.sha256((corpus_copy / '4096').read_bytes()).hexdigest()
+        assert cache.get_file(woodblock.utils.file_key(os.stat(corpus_copy / '4096'))) == expected
+        cache.close()
+
+
+
+class TestIndexedCorpus:
+    @pytest.mark.parametrize('path', (None, 'letters', 'letters/empty'))
+    @pytest.mark.parametrize('min_size', (0, 2000))
+    def test_that_the_files_are_listed_like_without_an_index(self, corpus_copy, tmp_path, path, min_size):
+        corpus = Corpus(corpus_copy, index=tmp_path / 'corpus.idx')
+        assert corpus.files(path, min_size) == Corpus(corpus_copy).files(path, min_size)
+
+    def test_that_the_corpus_is_not_walked(self, corpus_copy, tmp_path, monkeypatch):
+        Corpus(corpus_copy, index=tmp_path / 'corpus.idx').files()
+        monkeypatch.setattr(woodblock.utils, 'get_file_list', lambda *args: pytest.fail('corpus walked'))
+        assert len(Corpus(corpus_copy, index=tmp_path / 'corpus.idx').files('letters')) == 3
+
+    def test_that_hashes_are_recorded_in_the_index(self, corpus_copy, tmp_path, monkeypatch):
+        path = corpus_copy / '4096'
+        expected = hashlib.sha256(path.read_bytes()).hexdigest()
+        corpus = Corpus(corpus_copy, index=tmp_path / 'corpus.idx')
+        corpus.files()
+        assert corpus.hash_file(path) == expected
+        monkeypatch.setattr(woodblock.utils, 'hash_file', lambda *args: pytest.fail('file hashed'))
+        assert Corpus(corpus_copy, index=tmp_path / 'corpus.idx').hash_file(path) == expected
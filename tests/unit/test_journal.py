@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from woodblock.errors import WoodblockError
+from woodblock.journal import Journal, fingerprint
+
+
+class TestJournal:
+    def test_that_a_missing_journal_has_no_checkpoints(self, tmp_path):
+        assert Journal(tmp_path / 'image.journal', 'abc').checkpoints() == []
+
+    def test_that_checkpoints_are_read_back(self, tmp_path):
+        journal = Journal(tmp_path / 'image.journal', 'abc')
+        journal.open(append=False)
+        journal.checkpoint(512, [(0, 'aa')])
+        journal.checkpoint(1024, [])
+        journal.close()
+        assert Journal(tmp_path / 'image.journal', 'abc').checkpoints() == [
+            {'offset': 512, 'fragments': [[0, 'aa']]},
+            {'offset': 1024, 'fragments': []},
+        ]
+
+    def test_that_appending_keeps_the_previous_checkpoints(self, tmp_path):
+        journal = Journal(tmp_path / 'image.journal', 'abc')
+        journal.open(append=False)
+        journal.checkpoint(512, [])
+        journal.close()
+        journal.open(append=True)
+        journal.checkpoint(1024, [])
+        journal.close()
+        assert [c['offset'] for c in journal.checkpoints()] == [512, 1024]
+
+    def test_that_an_incomplete_last_line_is_ignored(self, tmp_path):
+        journal = Journal(tmp_path / 'image.journal', 'abc')
+        journal.open(append=False)
+        journal.checkpoint(512, [])
+        journal.close()
+        with journal.path.open('a') as handle:
+            handle.write('{"offset": 10')
+        assert journal.checkpoints() == [{'offset': 512, 'fragments': []}]
+
+    @pytest.mark.parametrize('torn_line', ('{"offset": 10', '{"offset": 768, "fragments": []}'))
+    def test_that_appending_after_a_torn_line_starts_a_new_line(self, tmp_path, torn_line):
+        journal = Journal(tmp_path / 'image.journal', 'abc')
+        journal.open(append=False)
+        journal.checkpoint(512, [])
+        journal.close()
+        with journal.path.open('a') as handle:
+            handle.write(torn_line)
+        expected = [c['offset'] for c in journal.checkpoints()] + [1024]
+        journal.open(append=True)
+        journal.checkpoint(1024, [])
+        journal.close()
+        assert [c['offset'] for c in journal.checkpoints()] == expected
+        assert journal.path.read_text().endswith('\n')
+
+    def test_that_a_journal_of_a_different_image_raises_an_error(self, tmp_path):
+        journal = Journal(tmp_path / 'image.journal', 'abc')
+        journal.open(append=False)
+        journal.close()
+        with pytest.raises(WoodblockError):
+            Journal(tmp_path / 'image.journal', 'def').checkpoints()
+
+    def test_that_remove_deletes_the_journal(self, tmp_path):
+        journal = Journal(tmp_path / 'image.journal', 'abc')
+        journal.open(append=False)
+        journal.remove()
+        assert not journal.path.exists()
+
+
+def test_that_the_fingerprint_does_not_depend_on_the_key_order():
+    assert fingerprint({'a': 1, 'b': [2]}) == fingerprint(json.loads('{"b": [2], "a": 1}'))
+    assert fingerprint({'a': 1}) != fingerprint({'a': 2})
@@ -0,0 +1,168 @@
+import io
+import os
+
+import pytest
+
+import woodblock
+from woodblock.file import File
+from woodblock.fragments import FileFragment, RandomDataFragment, ZeroesFragment
+from woodblock.image import Image
+from woodblock.output import MappedOutput, Output, SegmentedFile, write_vectored
+from woodblock.scenario import Scenario
+
+
+class TestWriteVectored:
+    def test_that_all_buffers_are_written(self, tmp_path):
+        with open(tmp_path / 'out', 'wb') as handle:
+            write_vectored(handle.fileno(), [b'abc', b'', bytearray(b'def'), memoryview(b'ghi')])
+        assert (tmp_path / 'out').read_bytes() == b'abcdefghi'
+
+    def test_that_the_buffers_are_written_to_the_given_offset(self, tmp_path):
+        with open(tmp_path / 'out', 'wb') as handle:
+            handle.write(b'0123456789')
+            handle.flush()
+            write_vectored(handle.fileno(), [b'ab', b'cd'], offset=3)
+        assert (tmp_path / 'out').read_bytes() == b'012abcd789'
+
+    def test_that_partial_writes_are_continued(self, tmp_path, monkeypatch):
+        writev = os.writev
+        calls = []
+
+        def short_writev(fd, buffers):
+            calls.append(len(buffers))
+            first = bytes(buffers[0])
+            return writev(fd, [first[:max(1, len(first) // 2)]])
+
+        monkeypatch.setattr(os, 'writev', short_writev)
+        with open(tmp_path / 'out', 'wb') as handle:
+            write_vectored(handle.fileno(), [b'abcdef', b'gh', b'i'])
+        assert (tmp_path / 'out').read_bytes() == b'abcdefghi'
+        assert len(calls) > 3
+
+    def test_that_the_number_of_buffers_per_call_is_limited(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(woodblock.output, '_IOV_MAX', 3)
+        writev = os.writev
+        calls = []
+        monkeypatch.setattr(os, 'writev', lambda fd, buffers: calls.append(len(buffers)) or writev(fd, buffers))
+        with open(tmp_path / 'out', 'wb') as handle:
+            write_vectored(handle.fileno(), [bytes([i]) for i in range(10)])
+        assert (tmp_path / 'out').read_bytes() == bytes(range(10))
+        assert calls == [3, 3, 3, 1]
+
+
+class TestOutput:
+    def test_that_small_writes_are_coalesced(self, tmp_path, monkeypatch):
+        writev = os.writev
+        calls = []
+        monkeypatch.setattr(os, 'writev', lambda fd, buffers: calls.append(len(buffers)) or writev(fd, buffers))
+        with open(tmp_path / 'out', 'wb') as handle:
+            output = Output(handle, buffer_size=8)
+            for char in b'abcdefghij':
+                output.write(bytes([char]))
+            output.close()
+        assert (tmp_path / 'out').read_bytes() == b'abcdefghij'
+        assert calls == [8, 2]
+
+    def test_that_streams_without_a_file_descriptor_get_joined_batches(self):
+        target = io.BytesIO()
+        output = Output(target, buffer_size=4)
+        for chunk in (b'ab', b'cd', b'ef'):
+            output.write(chunk)
+        assert target.getvalue() == b'abcd'
+        output.close()
+        assert target.getvalue() == b'abcdef'
+
+    def test_that_the_position_of_the_target_is_synchronized(self, tmp_path):
+        with open(tmp_path / 'out', 'wb') as handle:
+            handle.write(b'HEAD')
+            output = Output(handle)
+            output.write(b'body')
+            output.write_zeroes(3)
+            output.close()
+            handle.write(b'TAIL')
+        assert (tmp_path / 'out').read_bytes() == b'HEADbody\x00\x00\x00TAIL'
+
+
+class TestBufferSizes:
+    @pytest.fixture
+    def image(self, path_test_file_4k):
+        woodblock.random.seed(13)
+        file = File(path_test_file_4k)
+        scenario = Scenario('buffers')
+        scenario.add(FileFragment(file, 1, 0, 100))
+        scenario.add(RandomDataFragment(5000))
+        scenario.add(ZeroesFragment(3000))
+        scenario.add(FileFragment(file, 2, 100, 4096))
+        image = Image(block_size=512, target_size=32)
+        image.add(scenario)
+        return image
+
+    @pytest.mark.parametrize('workers', (1, 3))
+    @pytest.mark.parametrize('buffer_size', (0, 1, 4096, woodblock.output.DEFAULT_BUFFER_SIZE))
+    def test_that_the_buffer_size_does_not_change_the_image(self, image, tmp_path, buffer_size, workers):
+        buf = io.BytesIO()
+        image.write(buf)
+        image.write(tmp_path / 'image.dd', workers=workers, buffer_size=buffer_size)
+        assert (tmp_path / 'image.dd').read_bytes() == buf.getvalue()
+
+    @pytest.mark.parametrize('buffer_size', (0, 1, 4096))
+    def test_that_the_buffer_size_does_not_change_a_streamed_image(self, image, buffer_size):
+        expected = io.BytesIO()
+        image.write(expected)
+        buf = io.BytesIO()
+        image.write(buf, buffer_size=buffer_size)
+        assert buf.getvalue() == expected.getvalue()
+
+
+class TestMappedOutput:
+    def test_that_data_is_written_to_the_given_offsets(self, tmp_path):
+        with open(tmp_path / 'out', 'w+b') as handle:
+            output = MappedOutput(handle, 10)
+            output.write_at(6, b'6789')
+            output.write_at(0, b'012345')
+            output.close()
+            assert handle.tell() == 10
+        assert (tmp_path / 'out').read_bytes() == b'0123456789'
+
+    def test_that_generators_fill_the_map_in_place(self, tmp_path):
+        with open(tmp_path / 'out', 'w+b') as handle:
+            output = MappedOutput(handle, 4)
+            output.generate_at(0, 4, FillingGenerator())
+            output.close()
+        assert (tmp_path / 'out').read_bytes() == b'FFFF'
+
+    def test_that_generators_without_fill_are_called(self, tmp_path):
+        with open(tmp_path / 'out', 'w+b') as handle:
+            output = MappedOutput(handle, 4)
+            output.generate_at(0, 4, lambda size: b'C' * size)
+            output.close()
+        assert (tmp_path / 'out').read_bytes() == b'CCCC'
+
+
+class FillingGenerator:
+    def __call__(self, size):
+        raise AssertionError('fill() should have been used.')
+
+    def fill(self, view):
+        view[:] = b'F' * len(view)
+
+
+class TestSegmentedFile:
+    def test_that_the_data_is_split_into_segments(self, tmp_path):
+        segments = SegmentedFile(tmp_path / 'image', 4)
+        for chunk in (b'ab', b'cdefg', b'', b'hijklmn'):
+            segments.write(chunk)
+        segments.close()
+        assert [path.name for path in segments.paths] == ['image.001', 'image.002', 'image.003', 'image.004']
+        assert [path.read_bytes() for path in segments.paths] == [b'abcd', b'efgh', b'ijkl', b'mn']
+
+    def test_that_no_empty_segment_follows_a_full_one(self, tmp_path):
+        segments = SegmentedFile(tmp_path / 'image', 4)
+        segments.write(b'abcdefgh')
+        segments.close()
+        assert [path.name for path in segments.paths] == ['image.001', 'image.002']
+
+    def test_that_an_empty_image_has_one_segment(self, tmp_path):
+        segments = SegmentedFile(tmp_path / 'image', 4)
+        segments.close()
+        assert [path.read_bytes() for path in segments.paths] == [b'']
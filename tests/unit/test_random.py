@@ -57,3 +57,121 @@ class TestSeedValidation:
         woodblock.random.seed(42)
 
         assert np.array_equal(np.random.get_state()[1], np_state_before[1])
+
+
+class TestSeekableRandomBytes:
+    @staticmethod
+    def _rng(seed=7, stream=0):
+        rng = woodblock.random.SeekableRandomBytes()
+        rng.seed(seed, stream)
+        return rng
+
+    @pytest.mark.parametrize('offset, size', ((0, 1), (0, 32), (5, 100), (31, 2), (1000, 4096), (12345, 0)))
+    def test_that_bytes_at_returns_the_bytes_of_the_stream(self, offset, size):
+        stream = self._rng().bytes_at(0, 20000)
+        assert self._rng().bytes_at(offset, size) == stream[offset:offset + size]
+
+    def test_that_the_stream_depends_on_the_seed_and_the_stream_id(self):
+        data = self._rng(7, 0).bytes_at(0, 64)
+        assert self._rng(8, 0).bytes_at(0, 64) != data
+        assert self._rng(7, 1).bytes_at(0, 64) != data
+        assert self._rng(7, 0).bytes_at(0, 64) == data
+
+    def test_that_the_stream_is_stable(self):
+        # The stream must not change between versions, otherwise existing seeds would no longer reproduce images.
+        assert self._rng(1234, 0).bytes_at(100, 8).hex() == '8613d451c98a6882'
+
+
+class TestBackends:
+    @staticmethod
+    def _bytes(backend, sizes, seed=99):
+        rng = woodblock.random.RandomBytes(backend)
+        rng.seed(seed)
+        return b''.join(rng.bytes(size) for size in sizes)
+
+    def test_that_the_legacy_backend_is_the_default(self):
+        assert woodblock.random.get_backend() == 'mt19937'
+        assert woodblock.random.RandomBytes().backend == 'mt19937'
+        assert self._bytes(None, (1000,)) == np.random.RandomState(99).bytes(1000)
+
+    @pytest.mark.parametrize('backend', woodblock.random.BACKENDS)
+    def test_that_a_seed_reproduces_the_bytes(self, backend):
+        assert self._bytes(backend, (5000,)) == self._bytes(backend, (5000,))
+        assert self._bytes(backend, (5000,)) != self._bytes(backend, (5000,), seed=100)
+
+    @pytest.mark.parametrize('backend', ('pcg64', 'sfc64', 'philox'))
+    @pytest.mark.parametrize('sizes', ((1, 2, 3, 994), (8, 992), (7, 9, 984), (1000,)))
+    def test_that_the_bytes_do_not_depend_on_the_call_sizes(self, backend, sizes):
+        assert self._bytes(backend, sizes) == self._bytes(backend, (1000,))
+
+    def test_that_the_backends_produce_different_bytes(self):
+        assert len({self._bytes(backend, (64,)) for backend in woodblock.random.BACKENDS}) == 4
+
+    def test_that_the_philox_backend_produces_the_seekable_stream(self):
+        seekable = woodblock.random.SeekableRandomBytes()
+        seekable.seed(99)
+        assert self._bytes('philox', (10, 1000)) == seekable.bytes_at(0, 1010)
+
+    def test_that_the_backend_is_used_by_new_generators(self):
+        woodblock.random.set_backend('sfc64')
+        assert woodblock.random.RandomBytes().backend == 'sfc64'
+        assert woodblock.random.get_info() == {
+            'backend': 'sfc64',
+            'version': 1,
+            'numpy': np.__version__,
+            'seeding': 'sequential',
+        }
+
+    @pytest.mark.parametrize('backend', ('lcg', 'MT19937', ''))
+    def test_that_an_unknown_backend_raises_an_error(self, backend):
+        with pytest.raises(ValueError):
+            woodblock.random.set_backend(backend)
+        with pytest.raises(ValueError):
+            woodblock.random.RandomBytes(backend or 'x')
+
+
+class TestRandomness:
+    def test_that_contexts_with_the_same_seed_draw_the_same_values(self):
+        first, second = woodblock.random.Randomness(5), woodblock.random.Randomness(5)
+        assert [first.randint(0, 1000) for _ in range(10)] == [second.randint(0, 1000) for _ in range(10)]
+        assert first.sample(range(100), 5) == second.sample(range(100), 5)
+        assert first.choices(range(100), 5) == second.choices(range(100), 5)
+        assert 0 <= first.random() == second.random() < 1
+        assert first.draw_seed() == second.draw_seed()
+
+    def test_that_a_context_draws_like_the_seeded_global_context(self):
+        context = woodblock.random.Randomness(42)
+        woodblock.random.seed(42)
+        assert [context.draw_seed() for _ in range(5)] == [_stdlib_random.randint(0, 2**32 - 1) for _ in range(5)]
+
+    def test_that_contexts_do_not_interfere(self):
+        woodblock.random.seed(3)
+        expected = _stdlib_random.random()
+        woodblock.random.seed(3)
+        context = woodblock.random.Randomness(3)
+        context.sample(range(100), 50)
+        context.seed(4)
+        assert _stdlib_random.random() == expected
+        assert woodblock.random.get_seed() == 3
+
+    def test_that_sequential_contexts_spawn_themselves(self):
+        context = woodblock.random.Randomness(1)
+        assert context.spawn(3) is context
+
+    def test_that_hierarchical_contexts_are_derived_from_the_seed_and_the_key(self):
+        context = woodblock.random.Randomness(1, 'pcg64', 'hierarchical')
+        child = context.spawn(3)
+        context.draw_seed()
+        assert child.get_seed() == context.spawn(3).get_seed()
+        assert child.get_seed() != context.spawn(4).get_seed()
+        assert child.get_seed() != woodblock.random.Randomness(2, 'pcg64', 'hierarchical').spawn(3).get_seed()
+        assert child.get_backend() == 'pcg64'
+        assert child.get_seeding() == 'hierarchical'
+
+    def test_that_an_unknown_seeding_raises_an_error(self):
+        with pytest.raises(ValueError):
+            woodblock.random.Randomness(seeding='random')
+
+    def test_that_the_global_context_is_returned(self):
+        woodblock.random.seed(9)
+        assert woodblock.random.get_randomness().get_seed() == 9
@@ -0,0 +1,114 @@
+import collections
+import random
+
+import pytest
+
+from woodblock.random import Randomness
+from woodblock.sampling import AliasTable, SizeIndex
+
+
+@pytest.fixture
+def files():
+    rng = random.Random(3)
+    return [(f'file{i:03}', rng.randrange(0, 5000)) for i in range(300)]
+
+
+class TestSizeIndex:
+    @pytest.mark.parametrize(('min_size', 'max_size'), ((0, None), (1000, None), (1000, 2000), (2500, 2500), (6000, None)))
+    def test_that_the_selection_matches_a_scan(self, files, min_size, max_size):
+        index = SizeIndex(files)
+        expected = [(p, s) for p, s in files if s >= min_size and (max_size is None or s <= max_size)]
+        paths, sizes = index.select(min_size, max_size)
+        assert list(zip(paths, sizes.tolist())) == expected
+        assert index.count(min_size, max_size) == len(expected)
+
+    def test_that_an_inverted_range_is_empty(self, files):
+        index = SizeIndex(files)
+        assert index.count(3000, 1000) == 0
+        assert index.select(3000, 1000)[0] == ()
+
+    def test_that_an_empty_index_is_empty(self):
+        index = SizeIndex([])
+        assert len(index) == 0
+        assert index.select()[0] == ()
+
+    @pytest.mark.parametrize(('min_size', 'max_size'), ((0, None), (1000, 2000)))
+    @pytest.mark.parametrize('unique', (False, True))
+    def test_that_a_draw_matches_drawing_from_the_selection(self, files, min_size, max_size, unique):
+        index = SizeIndex(files)
+        paths = index.select(min_size, max_size)[0]
+        expected = Randomness(4).sample(paths, 20) if unique else Randomness(4).choices(paths, 20)
+        assert index.draw(Randomness(4), 20, min_size, max_size, unique) == expected
+
+    @pytest.mark.parametrize(('k', 'unique', 'max_size'), ((1, False, 10), (5, True, 50)))
+    def test_that_a_draw_from_too_few_files_raises_an_error(self, k, unique, max_size):
+        index = SizeIndex([('a', 20), ('b', 30), ('c', 40)])
+        with pytest.raises(ValueError):
+            index.draw(Randomness(1), k, max_size=max_size, unique=unique)
+
+    def test_that_weighted_draws_stay_within_the_range(self, files):
+        index = SizeIndex(files)
+        sizes = dict(files)
+        drawn = index.draw_weighted(Randomness(2), 1000, 1000, 2000)
+        assert all(1000 <= sizes[path] <= 2000 for path in drawn)
+
+    def test_that_weighted_draws_are_proportional_to_the_sizes(self):
+        index = SizeIndex([('a', 100), ('b', 0), ('c', 300), ('d', 5000)])
+        counts = collections.Counter(index.draw_weighted(Randomness(5), 100000, max_size=1000))
+        assert counts.keys() == {'a', 'c'}
+        assert counts['c'] / 100000 == pytest.approx(0.75, abs=0.01)
+
+    def test_that_unique_weighted_draws_skip_empty_files(self):
+        index = SizeIndex([('a', 0), ('b', 10), ('c', 20)])
+        assert sorted(index.draw_weighted(Randomness(3), 2, unique=True)) == ['b', 'c']
+        with pytest.raises(ValueError):
+            index.draw_weighted(Randomness(3), 3, unique=True)
+        with pytest.raises(ValueError):
+            index.draw_weighted(Randomness(3), max_size=0)
+
+    def test_that_the_drawing_data_of_the_least_recently_used_range_is_dropped(self, files):
+        index = SizeIndex(files, max_cached_ranges=2)
+        for min_size in (1000, 2000, 1000, 3000):
+            index.draw(Randomness(1), 1, min_size)
+        assert [key[1] for key in index._cache] == [index._bounds(1000, None)[0], index._bounds(3000, None)[0]]
+
+
+class TestAliasTable:
+    def test_that_indices_are_drawn_proportionally_to_their_weights(self):
+        weights = [1, 2, 3, 4, 0, 10]
+        counts = collections.Counter(AliasTable(weights).draw(Randomness(5), 100000))
+        for index, weight in enumerate(weights):
+            assert counts[index] / 100000 == pytest.approx(weight / sum(weights), abs=0.01)
+
+    def test_that_zero_weights_are_never_drawn(self):
+        table = AliasTable([0, 0, 1e-300, 0, 1])
+        assert table.positive == 2
+        assert not {0, 1, 3} & set(table.draw(Randomness(1), 10000))
+
+    def test_that_unique_draws_contain_no_duplicates(self):
+        table = AliasTable([1, 0, 5, 1, 1])
+        assert sorted(table.draw(Randomness(2), 4, unique=True)) == [0, 2, 3, 4]
+        with pytest.raises(ValueError):
+            table.draw(Randomness(2), 5, unique=True)
+
+    def test_that_unique_draws_handle_extreme_weights(self):
+        table = AliasTable([1, 10**9, 0, 1e-300])
+        assert sorted(table.draw(Randomness(1), 3, unique=True)) == [0, 1, 3]
+        index = SizeIndex([('a', 1), ('b', 10**9)])
+        assert sorted(index.draw_weighted(Randomness(1), k=2, unique=True)) == ['a', 'b']
+
+    def test_that_the_first_unique_draw_is_proportional_to_the_weights(self):
+        table = AliasTable([1, 0, 3])
+        randomness = Randomness(6)
+        counts = collections.Counter(table.draw(randomness, 1, unique=True)[0] for _ in range(10000))
+        assert counts.keys() == {0, 2}
+        assert counts[2] / 10000 == pytest.approx(0.75, abs=0.02)
+
+    def test_that_draws_are_reproducible(self):
+        table = AliasTable(range(1, 50))
+        assert table.draw(Randomness(7), 100) == table.draw(Randomness(7), 100)
+
+    @pytest.mark.parametrize('weights', ([], [0, 0], [1, -1]))
+    def test_that_invalid_weights_raise_an_error(self, weights):
+        with pytest.raises(ValueError):
+            AliasTable(weights)
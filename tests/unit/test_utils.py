@@ -1,6 +1,12 @@
+import errno
+import hashlib
+import os
 import pathlib
 import tempfile
 
+import pytest
+
+import woodblock.utils
 from woodblock.utils import get_file_list
 
 
@@ -16,3 +22,90 @@ class TestGetFileList:
         assert len(files) == 3
         file_names = tuple(f.name for f in files)
         assert file_names == ('ascii_letters', 'ascii_lowercase', 'ascii_uppercase')
+
+
+class TestHashFile:
+    def test_that_modified_files_are_hashed_again(self, tmp_path):
+        path = tmp_path / 'file'
+        path.write_bytes(b'old')
+        assert woodblock.utils.hash_file(path) == hashlib.sha256(b'old').hexdigest()
+        path.write_bytes(b'new data')
+        assert woodblock.utils.hash_file(path) == hashlib.sha256(b'new data').hexdigest()
+
+
+class TestScanFiles:
+
+    @staticmethod
+    def _glob(path):
+        return [(f.relative_to(path).as_posix(), f.stat().st_size) for f in sorted(path.glob('**/*')) if f.is_file()]
+
+    def test_that_the_files_are_listed_like_by_glob(self, test_corpus_path):
+        assert woodblock.utils.scan_files(test_corpus_path) == self._glob(test_corpus_path)
+
+    @pytest.mark.parametrize('workers', (1, 2, 8))
+    def test_that_the_order_only_depends_on_the_tree(self, tmp_path, workers):
+        for name in ('a/b', 'a-c', 'a/b-d/e', 'a.b', 'Z', 'a/b/c', '.hidden', 'b/a'):
+            path = tmp_path / name / 'file'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b'x' * len(name))
+        assert woodblock.utils.scan_files(tmp_path, workers) == self._glob(tmp_path)
+
+    def test_that_symbolic_links_to_directories_are_not_followed(self, tmp_path):
+        (tmp_path / 'dir').mkdir()
+        (tmp_path / 'dir' / 'file').write_bytes(b'data')
+        (tmp_path / 'dir_link').symlink_to(tmp_path / 'dir')
+        (tmp_path / 'file_link').symlink_to(tmp_path / 'dir' / 'file')
+        (tmp_path / 'dangling').symlink_to(tmp_path / 'missing')
+        assert woodblock.utils.scan_files(tmp_path) == [('dir/file', 4), ('file_link', 4)]
+        assert woodblock.utils.scan_files(tmp_path) == self._glob(tmp_path)
+
+    def test_that_a_missing_directory_contains_no_files(self, tmp_path):
+        assert woodblock.utils.scan_files(tmp_path / 'missing') == []
+
+
+class TestCopyFileData:
+
+    @staticmethod
+    def _copy(src_path, offset, count, tmp_path):
+        dst_path = tmp_path / 'copy'
+        with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            copied = woodblock.utils.copy_file_data(src.fileno(), dst.fileno(), offset, count)
+        return copied, dst_path.read_bytes()
+
+    @pytest.mark.parametrize('offset, count', ((0, 4096), (0, 1), (512, 1000), (4000, 96)))
+    def test_that_the_requested_range_is_copied(self, path_test_file_4k, tmp_path, offset, count):
+        copied, data = self._copy(path_test_file_4k, offset, count, tmp_path)
+        assert copied == count
+        assert data == path_test_file_4k.read_bytes()[offset:offset + count]
+
+    def test_that_copying_stops_at_the_end_of_the_file(self, path_test_file_4k, tmp_path):
+        copied, data = self._copy(path_test_file_4k, 4000, 1000, tmp_path)
+        assert copied == 96
+        assert data == path_test_file_4k.read_bytes()[4000:]
+
+    @pytest.mark.parametrize('error', (errno.ENOSYS, errno.EXDEV, errno.EINVAL))
+    def test_that_unsupported_kernel_copies_fall_back_to_read_write(self, path_test_file_4k, tmp_path, monkeypatch,
+                                                                     error):
+        def unsupported(*_):
+            raise OSError(error, os.strerror(error))
+
+        monkeypatch.setattr(woodblock.utils, '_copy_file_range', unsupported)
+        monkeypatch.setattr(woodblock.utils, '_sendfile', unsupported)
+        copied, data = self._copy(path_test_file_4k, 100, 3000, tmp_path)
+        assert copied == 3000
+        assert data == path_test_file_4k.read_bytes()[100:3100]
+
+    def test_that_a_kernel_copy_reporting_no_data_falls_back(self, path_test_file_4k, tmp_path, monkeypatch):
+        monkeypatch.setattr(woodblock.utils, '_copy_file_range', lambda *_: 0)
+        monkeypatch.setattr(woodblock.utils, '_sendfile', None)
+        copied, data = self._copy(path_test_file_4k, 0, 4096, tmp_path)
+        assert copied == 4096
+        assert data == path_test_file_4k.read_bytes()
+
+    def test_that_other_errors_are_raised(self, path_test_file_4k, tmp_path, monkeypatch):
+        def failing(*_):
+            raise OSError(errno.EIO, os.strerror(errno.EIO))
+
+        monkeypatch.setattr(woodblock.utils, '_copy_file_range', failing)
+        with pytest.raises(OSError):
+            self._copy(path_test_file_4k, 0, 4096, tmp_path)
@@ -0,0 +1,116 @@
+import io
+import os
+import random
+
+import pytest
+
+import woodblock
+from woodblock.datagen import SeekableRandom, Zeroes
+from woodblock.file import File
+from woodblock.fragments import FileFragment, RandomDataFragment, ZeroesFragment
+from woodblock.image import Image
+from woodblock.scenario import Scenario
+from woodblock.virtual import VirtualImage
+
+
+@pytest.fixture
+def scenarios(path_test_file_4k):
+    woodblock.random.seed(17)
+    file = File(path_test_file_4k)
+    scenario = Scenario('virtual')
+    scenario.add(FileFragment(file, 1, 0, 1000))
+    scenario.add(RandomDataFragment(3000))
+    scenario.add(ZeroesFragment(700))
+    scenario.add(FileFragment(file, 2, 1000, 4096))
+    other = Scenario('other')
+    other.add(RandomDataFragment(1500))
+    return [scenario, other]
+
+
+@pytest.fixture
+def image(scenarios):
+    image = Image(block_size=512, target_size=32)
+    for scenario in scenarios:
+        image.add(scenario)
+    return image
+
+
+def _written(image):
+    buf = io.BytesIO()
+    image.write(buf)
+    return buf.getvalue()
+
+
+class TestVirtualImage:
+    @pytest.mark.parametrize('padding_generator', (None, Zeroes(), SeekableRandom()))
+    def test_that_reading_everything_yields_the_written_image(self, scenarios, padding_generator):
+        image = Image(block_size=512, padding_generator=padding_generator, target_size=32)
+        for scenario in scenarios:
+            image.add(scenario)
+        expected = _written(image)
+        with VirtualImage(image) as virtual:
+            assert virtual.size == len(expected)
+            assert virtual.read() == expected
+
+    def test_that_random_reads_match_the_written_image(self, image):
+        expected = _written(image)
+        rng = random.Random(5)
+        with VirtualImage(image) as virtual:
+            for _ in range(300):
+                offset = rng.randrange(len(expected))
+                size = rng.randrange(1, 5000)
+                assert virtual.read_at(offset, size) == expected[offset:offset + size]
+
+    def test_that_seekable_generators_are_read_at_the_requested_position(self, scenarios, monkeypatch):
+        image = Image(block_size=512, padding_generator=SeekableRandom(), target_size=32)
+        for scenario in scenarios:
+            image.add(scenario)
+        expected = _written(image)
+        monkeypatch.setattr(SeekableRandom, '__call__', lambda self, size: pytest.fail('stream replayed'))
+        with VirtualImage(image) as virtual:
+            assert virtual.read_at(len(expected) - 3000, 3000) == expected[-3000:]
+
+    def test_that_seek_and_read_match_the_written_image(self, image):
+        expected = _written(image)
+        with VirtualImage(image) as virtual:
+            assert virtual.seek(-100, os.SEEK_END) == len(expected) - 100
+            assert virtual.read(50) == expected[-100:-50]
+            assert virtual.seek(-3000, os.SEEK_CUR) == len(expected) - 3050
+            assert virtual.read(4000) == expected[-3050:]
+            virtual.seek(1234)
+            assert virtual.tell() == 1234
+            assert virtual.read(10) == expected[1234:1244]
+            assert virtual.tell() == 1244
+
+    def test_that_reading_at_the_end_returns_no_data(self, image):
+        with VirtualImage(image) as virtual:
+            virtual.seek(virtual.size + 10)
+            assert virtual.read(10) == b''
+            assert virtual.read_at(virtual.size - 5, 10) == _written(image)[-5:]
+
+    def test_that_the_virtual_image_can_be_copied(self, image):
+        target = io.BytesIO()
+        with VirtualImage(image) as virtual:
+            while chunk := virtual.read(777):
+                target.write(chunk)
+        assert target.getvalue() == _written(image)
+
+    def test_that_an_empty_image_is_empty(self):
+        with VirtualImage(Image()) as virtual:
+            assert virtual.size == 0
+            assert virtual.read() == b''
+
+    def test_that_a_negative_position_raises_an_error(self, image):
+        with VirtualImage(image) as virtual, pytest.raises(ValueError):
+            virtual.seek(-1)
+
+    def test_that_a_negative_read_offset_raises_an_error(self, image):
+        with VirtualImage(image) as virtual, pytest.raises(ValueError):
+            virtual.read_at(-1, 10)
+
+    def test_that_a_closed_virtual_image_cannot_be_read(self, image):
+        virtual = VirtualImage(image)
+        virtual.read(10)
+        virtual.close()
+        with pytest.raises(ValueError):
+            virtual.read_at(0, 10)
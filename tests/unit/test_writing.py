@@ -0,0 +1,134 @@
+import io
+
+import pytest
+
+import woodblock
+from woodblock.file import File
+from woodblock.fragments import FileFragment, RandomDataFragment
+from woodblock.hashdb import HashDatabase
+from woodblock.image import Image
+from woodblock.scenario import Scenario
+from woodblock.errors import WoodblockError
+from woodblock.writing import (
+    CompressedWriter,
+    JournaledWriter,
+    MappedWriter,
+    PositionalWriter,
+    SegmentedWriter,
+    SequentialWriter,
+    WriteOptions,
+)
+
+
+@pytest.fixture
+def image(path_test_file_4k):
+    woodblock.random.seed(5)
+    file = File(path_test_file_4k)
+    scenario = Scenario('writing')
+    scenario.add(FileFragment(file, 1, 0, 1000))
+    scenario.add(RandomDataFragment(3000))
+    scenario.add(FileFragment(file, 2, 1000, 4096))
+    image = Image(block_size=512, target_size=32)
+    image.add(scenario)
+    return image
+
+
+class TestWriteOptions:
+    @pytest.mark.parametrize('options, writer', (
+        ({}, SequentialWriter),
+        ({'workers': 1}, SequentialWriter),
+        ({'workers': 2}, PositionalWriter),
+        ({'memory_map': True}, MappedWriter),
+        ({'memory_map': True, 'workers': 4}, MappedWriter),
+        ({'resume': True}, JournaledWriter),
+        ({'compression': 'gz', 'workers': 2}, CompressedWriter),
+        ({'segment_size': 1024, 'workers': 2}, SegmentedWriter),
+    ))
+    def test_that_the_writer_matches_the_options(self, options, writer):
+        assert type(WriteOptions(**options).writer()) is writer
+
+    def test_that_compressed_images_are_not_written_positionally(self):
+        assert not WriteOptions(workers=2, compression='gz').positional
+
+    @pytest.mark.parametrize('target', ('image.dd.xz', 'image.dd'))
+    def test_that_the_compression_is_inferred_from_the_path(self, tmp_path, target):
+        options = WriteOptions()
+        validated = options.validate(tmp_path / target, 512)
+        assert validated.compression == ('xz' if target.endswith('xz') else None)
+        assert options.compression is None
+
+    def test_that_the_compression_is_not_inferred_for_segmented_images(self, tmp_path):
+        assert WriteOptions(segment_size=1024).validate(tmp_path / 'image.gz', 512).compression is None
+
+    def test_that_the_compression_is_not_inferred_for_streams(self):
+        assert WriteOptions().validate(io.BytesIO(), 512).compression is None
+
+    @pytest.mark.parametrize('options', (
+        {'digests': ('no-such-hash',)},
+        {'resume': True},
+        {'segment_size': 1024},
+        {'digests': ('sha256',), 'workers': 2},
+        {'hashdb_path': 'x.hashdb', 'memory_map': True},
+    ))
+    def test_that_invalid_options_for_streams_are_rejected(self, options):
+        with pytest.raises(WoodblockError):
+            WriteOptions(**options).validate(io.BytesIO(), 512)
+
+    @pytest.mark.parametrize('options, target', (
+        ({'resume': True, 'workers': 2}, 'image.dd'),
+        ({'resume': True, 'memory_map': True}, 'image.dd'),
+        ({'resume': True, 'compression': 'bz2'}, 'image.dd'),
+        ({'resume': True}, 'image.dd.gz'),
+        ({'checksum_path': 'x.sha256', 'workers': 4}, 'image.dd'),
+        ({'digests': ('md5',), 'memory_map': True}, 'image.dd'),
+        ({'hashdb_path': 'x.hashdb', 'workers': 2}, 'image.dd'),
+        ({'segment_size': 1000}, 'image.dd'),
+        ({'segment_size': 1024, 'resume': True}, 'image.dd'),
+        ({'segment_size': 1024, 'compression': 'xz'}, 'image.dd'),
+        ({'segment_size': 1024, 'checksum_path': 'x.sha256'}, 'image.dd'),
+        ({'segment_size': 1024, 'workers': 2}, 'image.dd'),
+        ({'segment_size': 1024, 'memory_map': True}, 'image.dd'),
+        ({'compression': 'gz', 'memory_map': True}, 'image.dd'),
+        ({'memory_map': True}, 'image.dd.xz'),
+        ({'checksum_path': 'x.sha256'}, 'image.dd.bz2'),
+    ))
+    def test_that_conflicting_options_are_rejected(self, tmp_path, options, target):
+        with pytest.raises(WoodblockError):
+            WriteOptions(**options).validate(tmp_path / target, 512)
+
+    def test_that_digests_can_be_combined_with_compression_threads(self, tmp_path):
+        options = WriteOptions(digests=('sha256',), workers=2).validate(tmp_path / 'image.dd.gz', 512)
+        assert not options.positional
+
+    def test_that_a_hash_database_is_only_created_if_requested(self, tmp_path):
+        assert WriteOptions().create_observers(512, 1) == []
+        observers = WriteOptions(hashdb_path=tmp_path / 'x.hashdb').create_observers(512, 1)
+        assert [type(observer) for observer in observers] == [HashDatabase]
+        observers[0].discard()
+
+    def test_that_the_checksum_file_adds_a_sha256_digest(self):
+        hashers = WriteOptions(digests=('MD5', 'md5'), checksum_path='x.sha256').create_hashers()
+        assert [hasher.name for hasher in hashers] == ['md5', 'sha256']
+
+
+class TestImageWriteOptions:
+    def test_that_options_and_keyword_arguments_write_the_same_image(self, image):
+        expected, actual = io.BytesIO(), io.BytesIO()
+        image.write(expected, sparse=True, buffer_size=0)
+        image.write(actual, WriteOptions(sparse=True, buffer_size=0))
+        assert actual.getvalue() == expected.getvalue()
+
+    def test_that_options_and_keyword_arguments_cannot_be_combined(self, image):
+        with pytest.raises(TypeError):
+            image.write(io.BytesIO(), WriteOptions(), sparse=True)
+
+    def test_that_the_options_are_not_changed(self, image, tmp_path):
+        options = WriteOptions()
+        image.write(tmp_path / 'image.dd.gz', options)
+        assert options.compression is None
+
+    def test_that_invalid_options_do_not_touch_the_target(self, image, tmp_path):
+        (tmp_path / 'image.dd').write_bytes(b'old')
+        with pytest.raises(WoodblockError):
+            image.write(tmp_path / 'image.dd', digests=('sha256',), workers=2)
+        assert (tmp_path / 'image.dd').read_bytes() == b'old'
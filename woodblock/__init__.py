@@ -1,11 +1,22 @@
 """File carving test data generator."""
 
+import woodblock.compression
+import woodblock.corpus
 import woodblock.datagen
 import woodblock.errors
 import woodblock.file
+import woodblock.filetypes
 import woodblock.fragments
+import woodblock.hashcache
+import woodblock.hashdb
 import woodblock.image
+import woodblock.index
+import woodblock.journal
+import woodblock.output
 import woodblock.random
+import woodblock.sampling
 import woodblock.scenario
 import woodblock.utils
+import woodblock.virtual
 import woodblock.visualization
+import woodblock.writing
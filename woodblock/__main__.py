@@ -1,5 +1,8 @@
 import pathlib
+import shlex
+import subprocess  # nosec
 import sys
+import time
 
 import click
 
@@ -8,6 +11,22 @@ import woodblock
 CONTEXT_SETTINGS = {'help_option_names': ['-h', '--help']}
 
 
+class ByteSize(click.ParamType):
+    """A size in bytes with an optional binary unit suffix, e.g. ``512``, ``64K``, ``4M`` or ``1GiB``."""
+
+    name = 'size'
+    _UNITS = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, int):
+            return value
+        text = value.strip().lower().removesuffix('ib').removesuffix('b')
+        number, unit = text.rstrip('kmgt'), text[len(text.rstrip('kmgt')) :]
+        if not number.isdigit() or unit not in self._UNITS:
+            self.fail(f'"{value}" is not a valid size.', param, ctx)
+        return int(number) * self._UNITS[unit]
+
+
 @click.group(context_settings=CONTEXT_SETTINGS)
 def main():
     pass
@@ -15,22 +34,141 @@ def main():
 
 @main.command(name='generate')
 @click.argument('config', type=click.Path(exists=True))
-@click.argument('image', type=click.Path())
+@click.argument('image', type=click.Path(allow_dash=True), required=False)
 @click.option('--visualize', is_flag=True, help='Also write an interactive HTML visualization (IMAGE.html).')
-def generate_image(config, image, visualize):
+@click.option(
+    '-w',
+    '--workers',
+    type=click.IntRange(min=1),
+    help='Number of concurrent writers, or of compression threads for compressed images (default: 1 or #CPUs).',
+)
+@click.option(
+    '--sparse',
+    is_flag=True,
+    help='Write zero fillers (Z fragments) as holes. The padding is random and always written.',
+)
+@click.option(
+    '-m', '--metadata', type=click.Path(dir_okay=False), help='Ground-truth output path (default: IMAGE.json).'
+)
+@click.option('--pipe-to', metavar='COMMAND', help='Stream the image to the standard input of COMMAND.')
+@click.option(
+    '-b',
+    '--buffer-size',
+    type=ByteSize(),
+    default='4M',
+    show_default=True,
+    help='Size of the batches in which the image is written (e.g. 64K, 4M).',
+)
+@click.option('--mmap', 'memory_map', is_flag=True, help='Write the image through a memory map of IMAGE.')
+@click.option('--resume', is_flag=True, help='Journal the progress and resume an interrupted run (IMAGE.journal).')
+@click.option(
+    '--digest',
+    'digests',
+    type=click.Choice(('sha256', 'sha1', 'md5'), case_sensitive=False),
+    multiple=True,
+    help='Record this digest of the whole image in the ground truth. Can be given multiple times.',
+)
+@click.option('--checksum-file', is_flag=True, help='Write the SHA-256 digest of the image to IMAGE.sha256.')
+@click.option(
+    '--hashdb',
+    type=click.Path(dir_okay=False),
+    help='Write a sector hash database (SQLite) of the corpus file blocks placed in the image.',
+)
+@click.option(
+    '--compression',
+    type=click.Choice(tuple(woodblock.compression.CODECS)),
+    help='Compress the image (default: inferred from the suffix of IMAGE, e.g. ".gz").',
+)
+@click.option(
+    '--segment-size',
+    type=ByteSize(),
+    help='Split the image into segment files IMAGE.001, IMAGE.002, ... of at most this size (e.g. 2G).',
+)
+def generate_image(
+    config,
+    image,
+    visualize,
+    workers,
+    sparse,
+    metadata,
+    pipe_to,
+    buffer_size,
+    memory_map,
+    resume,
+    digests,
+    checksum_file,
+    hashdb,
+    compression,
+    segment_size,
+):
     """Generate an image based on the given configuration file.
 
     \b
     CONFIG is the path to the configuration file to use.
-    IMAGE  is the output path of the generated image."""
-    image_path = pathlib.Path(image)
+    IMAGE  is the output path of the generated image. Use "-" to write the image to stdout.
+
+    Instead of IMAGE, --pipe-to can be used to stream the image directly to the standard input of a
+    command (e.g. a carver). When streaming, the ground truth is written to the --metadata path once
+    the image has been written completely.
+
+    With --resume, the progress is recorded in a journal next to IMAGE. Running the same command
+    again after an interruption continues where the previous run stopped."""
+    if (image is None) == (pipe_to is None):
+        raise click.UsageError('Pass either IMAGE or --pipe-to.')
+    streaming = pipe_to is not None or image == '-'
+    if streaming and metadata is None:
+        raise click.UsageError('--metadata is required when streaming the image.')
+    if checksum_file and streaming:
+        raise click.UsageError('--checksum-file requires IMAGE. Use --digest to record digests of streamed images.')
     img = woodblock.image.Image.from_config(pathlib.Path(config))
-    img.write(image_path)
+    options = woodblock.writing.WriteOptions(
+        workers=workers,
+        sparse=sparse,
+        metadata_path=metadata,
+        buffer_size=buffer_size,
+        memory_map=memory_map,
+        resume=resume,
+        digests=digests,
+        checksum_path=f'{image}.sha256' if checksum_file else None,
+        hashdb_path=hashdb,
+        compression=compression,
+        segment_size=segment_size,
+    )
+    try:
+        # Streams are checked like any file-like object, i.e. only whether the target is a path matters.
+        options = options.validate(None if streaming else pathlib.Path(image), img.block_size)
+    except woodblock.errors.WoodblockError as err:
+        raise click.UsageError(str(err)) from err
+    if pipe_to is not None:
+        _pipe_image(img, pipe_to, options)
+    elif streaming:
+        img.write(sys.stdout.buffer, options)
+    else:
+        img.write(pathlib.Path(image), options)
     if visualize:
-        output = woodblock.visualization.create_visualization(
-            image_path.with_name(image_path.name + '.json'), image_path
-        )
-        click.echo(f'Visualization written to {output}')
+        image_path = None if streaming else pathlib.Path(image)
+        metadata_path = metadata or image_path.with_name(image_path.name + '.json')
+        html_path = None if streaming else image_path.with_name(image_path.name + '.html')
+        # The hex viewer shows the raw image, which does not exist for compressed or segmented images.
+        raw_image_path = None if options.compression or segment_size else image_path
+        output = woodblock.visualization.create_visualization(metadata_path, raw_image_path, output=html_path)
+        click.echo(f'Visualization written to {output}', err=streaming)
+
+
+def _pipe_image(image, command, options):
+    process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE)  # nosec
+    try:
+        image.write(process.stdin, options)
+    except BrokenPipeError as err:
+        raise click.ClickException(f'"{command}" stopped reading before the image was written completely.') from err
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        return_code = process.wait()
+    if return_code != 0:
+        raise click.ClickException(f'"{command}" exited with status {return_code}.')
 
 
 @main.command(name='visualize')
@@ -47,5 +185,45 @@ def visualize_image(metadata, image, output):
     click.echo(f'Visualization written to {out}')
 
 
+@main.group(name='corpus')
+def corpus_group():
+    """Manage test file corpora."""
+
+
+@corpus_group.command(name='index')
+@click.argument('corpus', type=click.Path(exists=True, file_okay=False))
+@click.argument('index', type=click.Path(dir_okay=False))
+@click.option('--hash-cache', type=click.Path(dir_okay=False), help='Also record the hashes in this hash cache.')
+@click.option(
+    '-w', '--workers', type=click.IntRange(min=1), help='Number of hashing threads (default: #CPUs + 4, at most 32).'
+)
+@click.option('--rebuild', is_flag=True, help='List the whole corpus again, e.g. after files were modified in place.')
+def index_corpus(corpus, index, hash_cache, workers, rebuild):
+    """Create or update the index of a corpus and hash all of its files.
+
+    \b
+    CORPUS is the path to the corpus directory.
+    INDEX  is the path to the index file. It is created if it does not exist.
+
+    The index records the size, modification time, SHA-256 hash and type of every file. Images
+    created with a "corpus index" (and "hash cache") do not have to hash the files again."""
+    corpus = woodblock.corpus.Corpus(corpus, index=index, hash_cache=hash_cache)
+    if rebuild:
+        corpus.index.rebuild()
+    else:
+        corpus.index.refresh(workers)
+    pending = corpus.index.unhashed()
+    total_size = sum(size for _, size in pending)
+    start = time.perf_counter()
+    with click.progressbar(length=total_size, label=f'Hashing {len(pending)} files', file=sys.stderr) as bar:
+        hashed = corpus.index.hash_files(workers, corpus.hash_cache, progress=lambda path, size: bar.update(size))
+    elapsed = time.perf_counter() - start
+    throughput = total_size / elapsed / (1 << 20) if elapsed > 0 else 0
+    click.echo(
+        f'Indexed {len(corpus.index.files())} files, hashed {hashed} files ({total_size / (1 << 20):.1f} MiB) '
+        f'in {elapsed:.1f} s ({throughput:.1f} MiB/s).'
+    )
+
+
 if __name__ == '__main__':
     sys.exit(main())
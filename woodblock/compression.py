@@ -0,0 +1,102 @@
+"""This module contains the parallel compression of images.
+
+Images are compressed pigz-style: the image data is split into independent blocks which are compressed concurrently and
+written in order. Each block becomes a complete gzip member, bzip2 stream or xz stream. Concatenated members and streams
+are valid files for the respective tools (``gunzip``, ``bunzip2`` and ``unxz``) as well as for Python's ``gzip``,
+``bz2`` and ``lzma`` modules.
+"""
+
+import bz2
+import collections
+import functools
+import gzip
+import lzma
+import os
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+
+from woodblock.errors import WoodblockError
+
+#: Default size (in bytes) of the independently compressed blocks.
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+#: The compression functions of the formats. They use the default levels of the command line tools, i.e. level 6 for
+#: gzip (Python's ``gzip.compress`` defaults to the much slower level 9), level 9 for bzip2 and preset 6 for xz.
+CODECS = {
+    'gz': functools.partial(gzip.compress, compresslevel=6),
+    'bz2': functools.partial(bz2.compress, compresslevel=9),
+    'xz': functools.partial(lzma.compress, preset=6),
+}
+
+_SUFFIXES = {'.gz': 'gz', '.gzip': 'gz', '.bz2': 'bz2', '.xz': 'xz'}
+
+
+class ParallelCompressor:
+    """A write-only file-like object compressing the written data in parallel.
+
+    The data is split into blocks of ``block_size`` bytes which are compressed independently by a pool of ``workers``
+    threads (the compressors of the standard library release the GIL). The compressed blocks are written to
+    ``target`` in order. Call :meth:`close` when all data has been written. This does not close ``target``.
+
+    Args:
+        target: A ``.write()``-supporting file-like object receiving the compressed data.
+        codec: The compression format, i.e. one of ``'gz'``, ``'bz2'`` or ``'xz'``.
+        workers: The number of compression threads. Defaults to the number of CPUs.
+        block_size: The size of the independently compressed blocks in bytes.
+    """
+
+    def __init__(self, target, codec: str, workers: int | None = None, block_size: int = DEFAULT_BLOCK_SIZE):
+        if codec not in CODECS:
+            raise WoodblockError(f'Unsupported compression: "{codec}". Use one of {", ".join(CODECS)}.')
+        self._target = target
+        self._compress = CODECS[codec]
+        self._workers = workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self._workers)
+        self._block_size = block_size
+        self._buffer = bytearray()
+        self._pending = collections.deque()
+        self._blocks = 0
+
+    def writable(self):
+        """Return ``True``."""
+        return True
+
+    def write(self, data):
+        """Compress and write ``data`` and return the number of bytes written."""
+        self._buffer += data
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[: self._block_size]))
+            del self._buffer[: self._block_size]
+        return len(data)
+
+    def flush(self):
+        """Write all blocks compressed so far to the target.
+
+        Data not filling a complete block yet is kept until more data is written or the compressor is closed.
+        """
+        while self._pending:
+            self._target.write(self._pending.popleft().result())
+        self._target.flush()
+
+    def close(self):
+        """Compress the remaining data, write all compressed blocks and stop the compression threads."""
+        try:
+            # An empty image still gets a (compressed) empty block so that the output is a valid compressed file.
+            if self._buffer or self._blocks == 0:
+                self._submit(bytes(self._buffer))
+                self._buffer = bytearray()
+            self.flush()
+        finally:
+            self._executor.shutdown()
+
+    def _submit(self, block: bytes):
+        self._pending.append(self._executor.submit(self._compress, block))
+        self._blocks += 1
+        # Bound the memory used by blocks waiting to be written, while keeping all threads busy.
+        while len(self._pending) > 2 * self._workers:
+            self._target.write(self._pending.popleft().result())
+
+
+def compression_from_path(path) -> str | None:
+    """Return the compression format indicated by the suffix of ``path`` or ``None`` if it indicates none."""
+    return _SUFFIXES.get(pathlib.Path(path).suffix.lower())
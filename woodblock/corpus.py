@@ -0,0 +1,263 @@
+"""This module contains the Corpus class."""
+
+import os
+import pathlib
+from collections.abc import Iterable
+
+import woodblock.utils
+from woodblock.errors import WoodblockError
+from woodblock.hashcache import HashCache
+from woodblock.index import CorpusIndex
+from woodblock.sampling import SizeIndex
+
+
+class Corpus:
+    """A test file corpus and the state derived from it.
+
+    A corpus owns its root directory, the lists of its files and the hashes of the files computed so far. Everything
+    taking files from a corpus accepts a ``corpus`` argument, so that one process can create images from several
+    corpora at the same time. The module-level functions :func:`woodblock.file.corpus` and
+    :func:`woodblock.file.get_corpus` manage the default corpus, which is used if no corpus is given explicitly.
+
+    The file lists are read from disk when they are needed for the first time and then kept. Call :meth:`refresh` after
+    adding files to or removing files from the corpus directory.
+
+    With an ``index`` (see :class:`woodblock.index.CorpusIndex`), the files are listed from the index instead of
+    walking the corpus directory, and the file hashes are kept in the index. The index is created if it does not exist
+    and refreshed incrementally when the files are needed for the first time.
+
+    Files can be selected by their types (see :mod:`woodblock.filetypes`). This requires an index recording the types of
+    the files, which :meth:`woodblock.index.CorpusIndex.hash_files` (i.e. ``woodblock corpus index``) detects once for
+    all files. The types are not detected from the file headers while drawing files, as the first type filter would
+    then read the first bytes of every file considered. The sizes of the files of each directory and type are
+    kept sorted (see :class:`woodblock.sampling.SizeIndex`), so that the files within a size range are found by binary
+    search and drawn without listing them.
+
+    With a ``hash_cache`` (see :class:`woodblock.hashcache.HashCache`), the hashes of files and fragments are recorded
+    persistently and shared by all processes using the same cache.
+
+    Args:
+        path: Path to the corpus directory.
+        index: Path to the index file of the corpus.
+        hash_cache: Path to the hash cache file.
+    """
+
+    def __init__(
+        self,
+        path: str | pathlib.Path,
+        index: str | pathlib.Path | None = None,
+        hash_cache: str | pathlib.Path | None = None,
+    ):
+        self._path = pathlib.Path(path)
+        self._index = None if index is None else CorpusIndex(index, self._path)
+        self._hash_cache = None if hash_cache is None else HashCache(hash_cache)
+        self._indexed_files = None
+        self._indexed_types = None
+        self._file_lists = {}
+        self._size_indices = {}
+
+    def __repr__(self):
+        return f'{type(self).__name__}({str(self._path)!r})'
+
+    @property
+    def path(self) -> pathlib.Path:
+        """Return the path to the corpus directory."""
+        return self._path
+
+    @property
+    def index(self) -> CorpusIndex | None:
+        """Return the index of the corpus or ``None`` if it has none."""
+        return self._index
+
+    @property
+    def hash_cache(self) -> HashCache | None:
+        """Return the hash cache of the corpus or ``None`` if it has none."""
+        return self._hash_cache
+
+    def resolve(self, path: str | pathlib.Path) -> pathlib.Path:
+        """Return the path of ``path`` (relative to the corpus) on disk."""
+        return self._path / path
+
+    def relative(self, path: pathlib.Path) -> pathlib.Path:
+        """Return the path of the file at ``path`` relative to the corpus."""
+        return pathlib.Path(path).relative_to(self._path)
+
+    def files(
+        self,
+        path: str | pathlib.Path | None = None,
+        min_size: int = 0,
+        file_type: str | Iterable[str] | None = None,
+        max_size: int | None = None,
+    ) -> tuple:
+        """Return the files in ``path`` (relative to the corpus) having ``min_size`` to ``max_size`` bytes.
+
+        The files are returned in the order of :func:`woodblock.utils.get_file_list`, i.e. sorted.
+
+        Args:
+            path: The directory relative to the corpus. Defaults to the whole corpus.
+            min_size: Minimal file size of the files.
+            file_type: A file type (e.g. ``'jpeg'``) or several file types of the files. Defaults to all types.
+            max_size: Maximal file size of the files. Defaults to no limit.
+        """
+        return self.size_index(path, file_type).select(min_size, max_size)[0]
+
+    def count(
+        self,
+        path: str | pathlib.Path | None = None,
+        min_size: int = 0,
+        file_type: str | Iterable[str] | None = None,
+        max_size: int | None = None,
+    ) -> int:
+        """Return the number of files :meth:`files` returns for the same arguments.
+
+        Once the sizes of the files in ``path`` having the given types are sorted, counting takes ``O(log n)``.
+        """
+        return self.size_index(path, file_type).count(min_size, max_size)
+
+    def size_index(
+        self, path: str | pathlib.Path | None = None, file_type: str | Iterable[str] | None = None
+    ) -> SizeIndex:
+        """Return the size index of the files in ``path`` (relative to the corpus) having the types ``file_type``.
+
+        The index is built once per directory and types and then kept. Use it to draw files (see
+        :meth:`woodblock.sampling.SizeIndex.draw`).
+
+        Args:
+            path: The directory relative to the corpus. Defaults to the whole corpus.
+            file_type: A file type (e.g. ``'jpeg'``) or several file types of the files. Defaults to all types.
+        """
+        directory = self._path if path is None else self.resolve(path)
+        file_types = _normalize_file_types(file_type)
+        if (directory, file_types) not in self._size_indices:
+            files = self._file_list(directory)
+            if file_types is not None:
+                self._require_index()
+                files = [(file, size) for file, size in files if self.file_type(file) in file_types]
+            self._size_indices[directory, file_types] = SizeIndex(files)
+        return self._size_indices[directory, file_types]
+
+    def file_type(self, path: pathlib.Path) -> str:
+        """Return the type of the file at ``path`` recorded in the index (see :mod:`woodblock.filetypes`).
+
+        Raises:
+            WoodblockError: If the corpus has no index or the index does not record the type of the file.
+        """
+        self._require_index()
+        file_type = self._indexed_type(path)
+        if file_type is None:
+            raise WoodblockError(
+                f'The corpus index does not record the type of "{path}". Update it using "woodblock corpus index".'
+            )
+        return file_type
+
+    def hash_file(self, path: pathlib.Path) -> str:
+        """Return the SHA-256 hash of the file at ``path`` as hexadecimal string.
+
+        The hash is taken from the hash cache or the index if they know the current version of the file. Otherwise, it
+        is computed (see :func:`woodblock.utils.hash_file`) and recorded in the hash cache and the index.
+        """
+        stat = os.stat(path)
+        key = woodblock.utils.file_key(stat)
+        if self._hash_cache is not None:
+            sha256 = self._hash_cache.get_file(key)
+            if sha256 is not None:
+                return sha256
+        sha256 = self._indexed_hash(path, stat)
+        if sha256 is None:
+            sha256 = woodblock.utils.hash_file(path)
+            if self._index is not None and path.is_relative_to(self._path):
+                self._index.set_hash(self.relative(path).as_posix(), stat.st_size, stat.st_mtime_ns, sha256)
+        if self._hash_cache is not None:
+            self._hash_cache.set_file(key, sha256)
+        return sha256
+
+    def cached_fragment_hash(self, path: pathlib.Path, start_offset: int, end_offset: int) -> str | None:
+        """Return the cached SHA-256 hash of a fragment of the file at ``path`` or ``None`` if it is unknown.
+
+        Args:
+            path: The path of the file.
+            start_offset: The offset of the fragment in the file.
+            end_offset: The offset of the end of the fragment in the file.
+        """
+        if self._hash_cache is None:
+            return None
+        return self._hash_cache.get_fragment(woodblock.utils.file_key(os.stat(path)), start_offset, end_offset)
+
+    def record_fragment_hash(self, path: pathlib.Path, start_offset: int, end_offset: int, sha256: str):
+        """Record the SHA-256 hash of a fragment of the file at ``path`` in the hash cache (if there is one)."""
+        if self._hash_cache is not None:
+            key = woodblock.utils.file_key(os.stat(path))
+            self._hash_cache.set_fragment(key, start_offset, end_offset, sha256)
+
+    def refresh(self):
+        """Forget the file lists and types, so that changes of the corpus directory become visible."""
+        self._file_lists.clear()
+        self._size_indices.clear()
+        self._indexed_files = None
+        self._indexed_types = None
+
+    def _file_list(self, directory: pathlib.Path) -> tuple:
+        """Return ``(path, size)`` of all files in ``directory``."""
+        if directory not in self._file_lists:
+            # Keeping the sizes allows to filter by size without touching the file system again.
+            files = self._indexed_file_list(directory)
+            if files is None:
+                files = tuple(
+                    (directory / file, size)
+                    for file, size in woodblock.utils.scan_files(directory)
+                    if not woodblock.utils.is_readme(file.rpartition('/')[2])
+                )
+            self._file_lists[directory] = files
+        return self._file_lists[directory]
+
+    def _indexed_file_list(self, directory: pathlib.Path):
+        """Return the files in ``directory`` listed by the index or ``None`` if they cannot be taken from it."""
+        if self._index is None or not directory.is_dir() or not directory.is_relative_to(self._path):
+            return None
+        if self._indexed_files is None:
+            self._index.refresh()
+            # README files are excluded like by woodblock.utils.get_file_list.
+            self._indexed_files = [
+                (path, size)
+                for path, size in self._index.files()
+                if not woodblock.utils.is_readme(path.rpartition('/')[2])
+            ]
+        prefix = directory.relative_to(self._path).as_posix()
+        prefix = '' if prefix == '.' else f'{prefix}/'
+        return tuple((self._path / path, size) for path, size in self._indexed_files if path.startswith(prefix))
+
+    def _require_index(self):
+        if self._index is None:
+            raise WoodblockError(
+                'Selecting files by type requires a corpus index recording the file types. '
+                'Create it using "woodblock corpus index".'
+            )
+
+    def _indexed_type(self, path: pathlib.Path):
+        """Return the type of the file at ``path`` recorded in the index or ``None`` if it is unknown."""
+        if self._index is None or not path.is_relative_to(self._path):
+            return None
+        if self._indexed_types is None:
+            self._indexed_types = self._index.types()
+        return self._indexed_types.get(self.relative(path).as_posix())
+
+    def _indexed_hash(self, path: pathlib.Path, stat: os.stat_result):
+        """Return the hash of the file at ``path`` recorded in the index or ``None`` if it is unknown."""
+        if self._index is None or not path.is_relative_to(self._path):
+            return None
+        return self._index.get_hash(self.relative(path).as_posix(), stat.st_size, stat.st_mtime_ns)
+
+
+def _normalize_file_types(file_type: str | Iterable[str] | None) -> frozenset | None:
+    """Return the file types given as a type name or several type names as lower-case ``frozenset``.
+
+    ``None`` (i.e. all types) is returned as is.
+
+    Args:
+        file_type: A file type (e.g. ``'jpeg'``) or several file types.
+    """
+    if file_type is None:
+        return None
+    if isinstance(file_type, str):
+        file_type = (file_type,)
+    return frozenset(name.strip().lower() for name in file_type)
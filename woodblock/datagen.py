@@ -1,8 +1,33 @@
 """This module contains data generators."""
 
-import random
+import woodblock.random
+from woodblock.random import RandomBytes, SeekableRandomBytes
 
-from woodblock.random import RandomBytes
+_ZEROES = memoryview(bytes(1024 * 1024))
+
+#: Data generators are called with multiples of this number of bytes, except for the last part of a region. NumPy's
+#: legacy ``RandomState.bytes`` discards the unused bytes of its last 32-bit word, so only such calls continue the
+#: stream seamlessly.
+WORD_SIZE = 8
+
+#: The maximum number of bytes requested from a data generator at once when generating the padding of a region.
+PADDING_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def chunk_sizes(size: int, chunk_size: int):
+    """Yield the sizes of the chunks in which a region of ``size`` bytes is generated.
+
+    All chunks but the last one have the same size, which is ``chunk_size`` rounded down to a multiple of
+    :data:`WORD_SIZE`. Generating a region in these chunks yields the same data as generating it at once, so the
+    chunk size does not affect the data of random fillers and padding.
+
+    Args:
+        size: The size of the region.
+        chunk_size: The maximum size of a chunk.
+    """
+    chunk_size = max(WORD_SIZE, chunk_size - chunk_size % WORD_SIZE)
+    for start in range(0, size, chunk_size):
+        yield min(chunk_size, size - start)
 
 
 class Zeroes:
@@ -11,6 +36,17 @@ class Zeroes:
     def __call__(self, size):
         return b'\x00' * size
 
+    def bytes_at(self, offset, size):
+        """Return the ``size`` bytes at position ``offset`` of the generated stream, i.e. ``size`` zero bytes."""
+        return bytes(size)
+
+    def fill(self, view):
+        """Fill the writable buffer ``view`` with zero bytes in place."""
+        view = memoryview(view)
+        for start in range(0, len(view), len(_ZEROES)):
+            chunk = view[start : start + len(_ZEROES)]
+            chunk[:] = _ZEROES[: len(chunk)]
+
     def __str__(self):
         return 'zeroes'
 
@@ -23,18 +59,40 @@ class Zeroes:
 
 
 class Random:
-    """Generates random bytes."""
+    """Generates random bytes.
 
-    def __init__(self, rng=None):
-        self._seed = random.randint(0, 2**32 - 1)  # nosec
+    Only the seed is drawn when the generator is created. The random state (about 5 KB for the default backend) is
+    created from the seed when data is generated and released by :meth:`reset`, so that images with a huge number of
+    random fillers do not keep a random state per filler in memory.
+
+    Args:
+        rng: The RNG to use (see :class:`woodblock.random.RandomBytes`). It is seeded right away and kept. By default,
+            a :class:`woodblock.random.RandomBytes` of the backend of ``randomness`` is created when it is needed.
+        randomness: The :class:`woodblock.random.Randomness` context to draw the seed from. Defaults to the global
+            context.
+    """
+
+    def __init__(self, rng=None, randomness=None):
+        randomness = randomness or woodblock.random.get_randomness()
+        self._seed = randomness.draw_seed()
         # Each Random instance must own its own RNG. Using a shared default instance would
         # entangle the byte streams of all fillers and the image padding, breaking
         # reproducibility and making a fragment's data depend on unrelated generators.
-        self._rng = rng if rng is not None else RandomBytes()
-        self._rng.seed(self._seed)
+        self._own_rng = rng is None
+        self._backend = randomness.get_backend()
+        self._rng = rng
+        if rng is not None:
+            self._rng.seed(self._seed)
 
     def __call__(self, size):
-        return self._rng.bytes(size)
+        return self._state().bytes(size)
+
+    def fill(self, view):
+        """Fill the writable buffer ``view`` with random bytes.
+
+        This consumes the same random state as calling the generator with ``len(view)``.
+        """
+        self._state().fill(view)
 
     def __str__(self):
         return 'random'
@@ -43,6 +101,66 @@ class Random:
         """Reset the random state.
 
         After calling this method, the RNG will be set to its initial seed, so that subsequent calls return the same
-        bytes as the calls before.
+        bytes as the calls before. A random state created by the generator is released until it is needed again.
         """
-        self._rng.seed(self._seed)
+        if self._own_rng:
+            self._rng = None
+        else:
+            self._rng.seed(self._seed)
+
+    def _state(self):
+        if self._rng is None:
+            self._rng = RandomBytes(self._backend)
+            self._rng.seed(self._seed)
+        return self._rng
+
+
+class SeekableRandom:
+    """Generates random bytes which can be generated starting at any position of the stream.
+
+    In contrast to :class:`Random`, the bytes at position ``n`` of the stream are computed directly from the seed,
+    the stream ID and ``n`` (see :class:`woodblock.random.SeekableRandomBytes`). Parallel writers, range reads and
+    resumed writes therefore only generate the bytes they need. The data of a ``SeekableRandom`` differs from the data
+    of a :class:`Random` drawing the same seed.
+
+    Args:
+        stream: The ID of the stream. Generators drawing the same seed but having different stream IDs produce
+            independent data.
+        randomness: The :class:`woodblock.random.Randomness` context to draw the seed from. Defaults to the global
+            context.
+    """
+
+    def __init__(self, stream: int = 0, randomness=None):
+        self._seed = (randomness or woodblock.random.get_randomness()).draw_seed()
+        self._rng = SeekableRandomBytes()
+        self._rng.seed(self._seed, stream)
+        self._position = 0
+
+    def __call__(self, size):
+        data = self._rng.bytes_at(self._position, size)
+        self._position += size
+        return data
+
+    def bytes_at(self, offset, size):
+        """Return the ``size`` bytes at position ``offset`` of the stream without changing the position."""
+        return self._rng.bytes_at(offset, size)
+
+    def fill(self, view):
+        """Fill the writable buffer ``view`` with random bytes.
+
+        This consumes the same part of the stream as calling the generator with ``len(view)``.
+        """
+        view = memoryview(view)
+        view[:] = self._rng.bytes_at(self._position, len(view))
+        self._position += len(view)
+
+    def skip(self, size):
+        """Skip the next ``size`` bytes of the stream without generating them."""
+        self._position += size
+
+    def __str__(self):
+        return 'random'
+
+    def reset(self):
+        """Reset the generator to the start of its stream."""
+        self._position = 0
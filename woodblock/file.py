@@ -3,37 +3,48 @@
 import itertools
 import math
 import pathlib
-import random
-from collections.abc import Sequence
+from collections.abc import Iterable, Sequence
 from operator import attrgetter
 from uuid import uuid4
 
 import numpy as np
 
+import woodblock.random
 import woodblock.utils
+from woodblock.corpus import Corpus
 from woodblock.errors import InvalidFragmentationPointError, WoodblockError
 from woodblock.fragments import FileFragment
 
 _CORPUS = None
 
+_STRATUM_KEYS = frozenset({'number_of_files', 'min_size', 'max_size', 'file_type'})
+
 
 def corpus(path):
-    """Set the file corpus.
+    """Set the default file corpus.
+
+    The default corpus is used by everything taking files from a corpus if no :class:`woodblock.corpus.Corpus` is
+    given explicitly.
 
     Args:
-        path: Path to the corpus directory.
+        path: Path to the corpus directory or a :class:`woodblock.corpus.Corpus`.
     """
     global _CORPUS
-    if path is None or isinstance(path, pathlib.Path):
+    if path is None or isinstance(path, Corpus):
         _CORPUS = path
-    elif isinstance(path, str):
-        _CORPUS = pathlib.Path(path)
+    elif isinstance(path, (str, pathlib.Path)):
+        _CORPUS = Corpus(path)
     else:
         raise WoodblockError('Unsupported object type for corpus.')
 
 
 def get_corpus() -> pathlib.Path:
-    """Return the path to the test file corpus."""
+    """Return the path to the default test file corpus."""
+    return get_default_corpus().path
+
+
+def get_default_corpus() -> Corpus:
+    """Return the default :class:`woodblock.corpus.Corpus`."""
     if _CORPUS is None:
         raise WoodblockError('No corpus specified.')
     return _CORPUS
@@ -43,12 +54,13 @@ class File:
     """This class represents an actual file of the test file corpus.
 
     Args:
-        path: Path to the file on disk.
+        path: Path to the file relative to the corpus (or an absolute path within the corpus).
+        corpus: The :class:`woodblock.corpus.Corpus` the file belongs to. Defaults to the default corpus.
     """
 
-    def __init__(self, path: str | pathlib.Path):
-        path = pathlib.Path(path)
-        self._path = get_corpus() / path
+    def __init__(self, path: str | pathlib.Path, corpus: Corpus | None = None):
+        self._corpus = corpus or get_default_corpus()
+        self._path = self._corpus.resolve(path)
         if not self.path.exists():
             raise FileNotFoundError(self._path)
         self._size = self._path.stat().st_size
@@ -64,9 +76,14 @@ class File:
     def hash(self) -> str:
         """Return the SHA-256 hash of the file as hexadecimal string."""
         if self._hash is None:
-            self._hash = woodblock.utils.hash_file(self._path)
+            self._hash = self._corpus.hash_file(self._path)
         return self._hash
 
+    @property
+    def corpus(self) -> Corpus:
+        """Return the corpus the file belongs to."""
+        return self._corpus
+
     @property
     def id(self) -> str:
         """Return the ID of the file."""
@@ -108,7 +125,7 @@ class File:
         offsets = [0, *(p * block_size for p in sorted(fragmentation_points)), self._size]
         return [FileFragment(self, i + 1, offsets[i], offsets[i + 1]) for i in range(len(offsets) - 1)]
 
-    def fragment_randomly(self, num_fragments: int | None = None, block_size: int = 512) -> list:
+    def fragment_randomly(self, num_fragments: int | None = None, block_size: int = 512, randomness=None) -> list:
         """Fragment the file at random fragmentation points.
 
         This method fragments the current file into ``num_fragments`` fragments. The fragmentation points are chosen
@@ -118,14 +135,16 @@ class File:
         Args:
             num_fragments: Number of fragments to create.
             block_size: Block size to use.
+            randomness: The :class:`woodblock.random.Randomness` context to draw from. Defaults to the global context.
         """
+        randomness = randomness or woodblock.random.get_randomness()
         self._ensure_fragmentable(block_size)
         if num_fragments is None:
-            num_fragments = random.randint(1, math.floor(self._size / block_size))  # nosec
+            num_fragments = randomness.randint(1, math.floor(self._size / block_size))
         self._validate_fragment_count(num_fragments, block_size)
         if num_fragments == 1:
             return [self.as_fragment()]
-        frag_points = random.sample(range(1, self.max_fragments(block_size)), num_fragments - 1)  # nosec
+        frag_points = randomness.sample(range(1, self.max_fragments(block_size)), num_fragments - 1)
         return self.fragment(frag_points, block_size)
 
     def fragment_evenly(self, num_fragments: int, block_size: int = 512) -> list:
@@ -181,34 +200,98 @@ class File:
 
 
 def draw_files(
-    path: pathlib.Path | None = None, number_of_files: int = 1, unique: bool = False, min_size: int = 0
+    path: pathlib.Path | None = None,
+    number_of_files: int = 1,
+    unique: bool = False,
+    min_size: int = 0,
+    randomness=None,
+    corpus: Corpus | None = None,
+    file_type: str | Iterable[str] | None = None,
+    max_size: int | None = None,
+    size_weighted: bool = False,
 ) -> list:
     """Choose random files from the file corpus.
 
     If `path` is None, the complete corpus will be considered. If it set to a path relative to the corpus, then only
     files in this directory (and its subdirectories) are considered.
 
+    By default, every file is chosen with the same probability. If ``size_weighted`` is set, the probability of a file
+    is proportional to its size. The files are drawn from the size index of the corpus (see
+    :meth:`woodblock.sampling.SizeIndex.draw`) without listing the candidates, so every draw takes constant time once
+    the index is built.
+
     Args:
         path: The directory relative to the file corpus from which the file should be chosen.
         number_of_files: The number of files to draw.
         unique: If set to True, the resulting list will contain no duplicates.
         min_size: Minimal file size of the selected files.
+        randomness: The :class:`woodblock.random.Randomness` context to draw from. Defaults to the global context.
+        corpus: The :class:`woodblock.corpus.Corpus` to draw the files from. Defaults to the default corpus.
+        file_type: A file type (e.g. ``'jpeg'``) or several file types to choose from (see :mod:`woodblock.filetypes`).
+            Defaults to all types.
+        max_size: Maximal file size of the selected files. Defaults to no limit.
+        size_weighted: If set to True, files are chosen with probabilities proportional to their sizes.
     """
+    randomness = randomness or woodblock.random.get_randomness()
+    corpus = corpus or get_default_corpus()
     if number_of_files < 1:
         raise WoodblockError('Number of files has to be at least 1.')
-    start_path = get_corpus()
-    if path is not None:
-        start_path = start_path / path
-    candidates = woodblock.utils.get_file_list(start_path, min_size)
-    if not candidates:
-        raise WoodblockError(f'Given path does not contain enough files with a minimal size of {min_size}.')
-    if unique:
-        try:
-            return [File(f) for f in random.sample(candidates, k=number_of_files)]  # nosec
-        except ValueError as err:
-            raise WoodblockError('Not enough unique files to choose from.') from err
-    else:
-        return [File(f) for f in random.choices(candidates, k=number_of_files)]  # nosec
+    index = corpus.size_index(path, file_type)
+    if not index.count(min_size, max_size):
+        limits = '' if max_size is None else f' and a maximal size of {max_size}'
+        limits += '' if file_type is None else f' and a type of {file_type!r}'
+        raise WoodblockError(f'Given path does not contain enough files with a minimal size of {min_size}{limits}.')
+    draw = index.draw_weighted if size_weighted else index.draw
+    try:
+        return [File(f, corpus) for f in draw(randomness, number_of_files, min_size, max_size, unique)]
+    except ValueError as err:
+        raise WoodblockError(f'Not enough {"unique " if unique else ""}files to choose from.') from err
+
+
+def draw_stratified_files(
+    strata: Sequence[dict],
+    path: pathlib.Path | None = None,
+    unique: bool = False,
+    size_weighted: bool = False,
+    randomness=None,
+    corpus: Corpus | None = None,
+) -> list:
+    """Choose random files from several strata, e.g. size bands or file types.
+
+    Each stratum is a dictionary describing the files to choose and how many of them. It has to contain the key
+    ``number_of_files`` and may contain the keys ``min_size``, ``max_size`` and ``file_type`` (see
+    :func:`draw_files`). For example, the following strata choose ten small and five large JPEG files::
+
+        [
+            {'number_of_files': 10, 'max_size': 64 * 1024, 'file_type': 'jpeg'},
+            {'number_of_files': 5, 'min_size': 64 * 1024 + 1, 'file_type': 'jpeg'},
+        ]
+
+    The result is a list containing the list of files of each stratum. The sizes of the corpus files are kept sorted
+    (see :class:`woodblock.corpus.Corpus`), so the files of a stratum are found by binary search.
+
+    Args:
+        strata: The strata to choose the files from.
+        path: The directory relative to the file corpus from which the files should be chosen.
+        unique: If set to True, the files of each stratum will contain no duplicates.
+        size_weighted: If set to True, files are chosen with probabilities proportional to their sizes.
+        randomness: The :class:`woodblock.random.Randomness` context to draw from. Defaults to the global context.
+        corpus: The :class:`woodblock.corpus.Corpus` to draw the files from. Defaults to the default corpus.
+    """
+    files = []
+    for stratum in strata:
+        unknown = stratum.keys() - _STRATUM_KEYS
+        if unknown or 'number_of_files' not in stratum:
+            raise WoodblockError(
+                f'Invalid stratum {stratum!r}: "number_of_files" is required, the only other keys allowed are '
+                '"min_size", "max_size" and "file_type".'
+            )
+        files.append(
+            draw_files(
+                path, unique=unique, size_weighted=size_weighted, randomness=randomness, corpus=corpus, **stratum
+            )
+        )
+    return files
 
 
 def draw_fragmented_files(
@@ -217,6 +300,11 @@ def draw_fragmented_files(
     block_size: int = 512,
     min_fragments: int = 1,
     max_fragments: int = 4,
+    randomness=None,
+    corpus: Corpus | None = None,
+    file_type: str | Iterable[str] | None = None,
+    max_size: int | None = None,
+    size_weighted: bool = False,
 ) -> list:
     """Choose random files from ``path`` and fragment them randomly.
 
@@ -237,14 +325,30 @@ def draw_fragmented_files(
         block_size: The block size to be used when fragmenting the files.
         min_fragments: Minimal number of fragments.
         max_fragments: Maximal number of fragments.
+        randomness: The :class:`woodblock.random.Randomness` context to draw from. Defaults to the global context.
+        corpus: The :class:`woodblock.corpus.Corpus` to draw the files from. Defaults to the default corpus.
+        file_type: A file type (e.g. ``'jpeg'``) or several file types to choose from (see :mod:`woodblock.filetypes`).
+            Defaults to all types.
+        max_size: Maximal file size of the selected files. Defaults to no limit.
+        size_weighted: If set to True, files are chosen with probabilities proportional to their sizes.
     """
+    randomness = randomness or woodblock.random.get_randomness()
     if min_fragments > max_fragments:
         raise WoodblockError('min_fragments has to be <= max_fragments.')
-    files = draw_files(path, number_of_files, min_size=block_size * min_fragments)
+    files = draw_files(
+        path,
+        number_of_files,
+        min_size=block_size * min_fragments,
+        randomness=randomness,
+        corpus=corpus,
+        file_type=file_type,
+        max_size=max_size,
+        size_weighted=size_weighted,
+    )
     frags = []
     for file in files:
-        num_frags = random.randint(min_fragments, min(max_fragments, file.max_fragments(block_size)))  # nosec
-        frags.append(file.fragment_randomly(num_frags, block_size))
+        num_frags = randomness.randint(min_fragments, min(max_fragments, file.max_fragments(block_size)))
+        frags.append(file.fragment_randomly(num_frags, block_size, randomness))
     return frags
 
 
@@ -254,6 +358,9 @@ def intertwine_randomly(
     block_size: int = 512,
     min_fragments: int = 1,
     max_fragments: int = 4,
+    randomness=None,
+    corpus: Corpus | None = None,
+    file_type: str | Iterable[str] | None = None,
 ) -> list:
     """Choose random files from ``path`` and intertwine them randomly.
 
@@ -274,70 +381,85 @@ def intertwine_randomly(
         block_size: The block size to be used when fragmenting the files.
         min_fragments: Minimal number of fragments.
         max_fragments: Maximal number of fragments.
+        randomness: The :class:`woodblock.random.Randomness` context to draw from. Defaults to the global context.
+        corpus: The :class:`woodblock.corpus.Corpus` to draw the files from. Defaults to the default corpus.
+        file_type: A file type (e.g. ``'jpeg'``) or several file types to choose from (see :mod:`woodblock.filetypes`).
+            Defaults to all types.
     """
+    randomness = randomness or woodblock.random.get_randomness()
     if min_fragments > max_fragments:
         raise WoodblockError('min_fragments has to be <= max_fragments.')
     if number_of_files < 2:
         raise WoodblockError('Number of files has to be at least 2.')
 
-    files = draw_files(path, number_of_files, unique=True, min_size=block_size * min_fragments)
+    files = draw_files(
+        path,
+        number_of_files,
+        unique=True,
+        min_size=block_size * min_fragments,
+        randomness=randomness,
+        corpus=corpus,
+        file_type=file_type,
+    )
 
     if min_fragments == max_fragments:
         frags = list(
             itertools.chain.from_iterable(
                 zip(
-                    files[0].fragment_randomly(min_fragments, block_size),
-                    files[1].fragment_randomly(min_fragments, block_size),
+                    files[0].fragment_randomly(min_fragments, block_size, randomness),
+                    files[1].fragment_randomly(min_fragments, block_size, randomness),
                     strict=True,
                 )
             )
         )
         for file in files[2:]:
-            current_file_frags = file.fragment_randomly(min_fragments, block_size)
-            _insert_at_slots(frags, current_file_frags, _select_free_slots(len(frags) + 1, min_fragments))
+            current_file_frags = file.fragment_randomly(min_fragments, block_size, randomness)
+            _insert_at_slots(frags, current_file_frags, _select_free_slots(len(frags) + 1, min_fragments, randomness))
         return frags
     files = sorted(files, key=attrgetter('size'))
-    frags_file_1 = _fragment_first_file(files[0], block_size, min_fragments, max_fragments)
-    frags_file_2 = _fragment_second_file(files[1], block_size, min_fragments, max_fragments, len(frags_file_1))
-    frags = _merge_fragments_of_first_two_files(frags_file_1, frags_file_2)
+    frags_file_1 = _fragment_first_file(files[0], block_size, min_fragments, max_fragments, randomness)
+    frags_file_2 = _fragment_second_file(
+        files[1], block_size, min_fragments, max_fragments, len(frags_file_1), randomness
+    )
+    frags = _merge_fragments_of_first_two_files(frags_file_1, frags_file_2, randomness)
     min_frags = max(min_fragments, 1)
     for file in files[2:]:
         free_slots = len(frags) + 1
         max_frags = min(max_fragments, file.max_fragments(block_size), free_slots)
-        num_frags = random.randint(min_frags, max_frags)  # nosec
-        current_file_frags = list(reversed(file.fragment_randomly(num_frags, block_size)))
-        _insert_at_slots(frags, current_file_frags, _select_free_slots(free_slots, num_frags))
+        num_frags = randomness.randint(min_frags, max_frags)
+        current_file_frags = list(reversed(file.fragment_randomly(num_frags, block_size, randomness)))
+        _insert_at_slots(frags, current_file_frags, _select_free_slots(free_slots, num_frags, randomness))
     return frags
 
 
-def _merge_fragments_of_first_two_files(frags_file_1, frags_file_2):
+def _merge_fragments_of_first_two_files(frags_file_1, frags_file_2, randomness):
     frags = frags_file_1[:]
     frags_2 = list(reversed(frags_file_2))
-    start = _get_start_index_for_fragments_of_second_file(len(frags_file_1), len(frags_file_2))
+    start = _get_start_index_for_fragments_of_second_file(len(frags_file_1), len(frags_file_2), randomness)
     for i in range(len(frags_2)):
         frags.insert(start + 2 * i, frags_2.pop())
     return frags
 
 
-def _get_start_index_for_fragments_of_second_file(num_frags_file_1, num_frags_file_2):
+def _get_start_index_for_fragments_of_second_file(num_frags_file_1, num_frags_file_2, randomness):
     if num_frags_file_2 == num_frags_file_1 - 1:
         return 1
     if num_frags_file_2 == num_frags_file_1 + 1:
         return 0
-    return random.randint(0, 1)  # nosec
+    return randomness.randint(0, 1)
 
 
-def _fragment_first_file(file_1, block_size, min_fragments, max_fragments):
-    num_frags = random.randint(max(min_fragments, 1), min(max_fragments, file_1.max_fragments(block_size)))  # nosec
-    return file_1.fragment_randomly(num_frags, block_size)
+def _fragment_first_file(file_1, block_size, min_fragments, max_fragments, randomness):
+    num_frags = randomness.randint(max(min_fragments, 1), min(max_fragments, file_1.max_fragments(block_size)))
+    return file_1.fragment_randomly(num_frags, block_size, randomness)
 
 
-def _fragment_second_file(file_2, block_size, min_fragments, max_fragments, num_fragments_file_1):
-    num_frags = random.randint(
-        max(min_fragments, num_fragments_file_1 - 1),  # nosec
+def _fragment_second_file(file_2, block_size, min_fragments, max_fragments, num_fragments_file_1, randomness):
+    num_frags = randomness.randint(
+        max(min_fragments, num_fragments_file_1 - 1),
         min(max_fragments, num_fragments_file_1 + 1, file_2.max_fragments(block_size)),
     )
-    return file_2.fragment_randomly(num_frags, block_size)
+    return file_2.fragment_randomly(num_frags, block_size, randomness)
 
 
 def _insert_at_slots(frag_list, new_fragments, slots):
@@ -346,5 +468,5 @@ def _insert_at_slots(frag_list, new_fragments, slots):
         frag_list.insert(slot + i, new_frags.pop())
 
 
-def _select_free_slots(num_slots_available, num_slots):
-    return sorted(random.sample(range(num_slots_available), k=num_slots))  # nosec
+def _select_free_slots(num_slots_available, num_slots, randomness):
+    return sorted(randomness.sample(range(num_slots_available), k=num_slots))
@@ -0,0 +1,79 @@
+"""This module detects the types of corpus files by their magic bytes.
+
+The type of a file is derived from its first :data:`HEADER_SIZE` bytes. Known file formats are detected by their
+signatures. Files without a known signature are reported as ``'text'`` if their header is valid UTF-8 without NUL
+bytes and as ``'unknown'`` otherwise. Empty files are reported as ``'empty'``.
+"""
+
+import pathlib
+
+HEADER_SIZE = 4096
+
+# (offset, signature, type) in the order they are checked, i.e. more specific signatures come first.
+_SIGNATURES = (
+    (0, b'\xff\xd8\xff', 'jpeg'),
+    (0, b'\x89PNG\r\n\x1a\n', 'png'),
+    (0, b'GIF87a', 'gif'),
+    (0, b'GIF89a', 'gif'),
+    (0, b'BM', 'bmp'),
+    (0, b'II*\x00', 'tiff'),
+    (0, b'MM\x00*', 'tiff'),
+    (0, b'%PDF-', 'pdf'),
+    (0, b'PK\x03\x04', 'zip'),
+    (0, b'PK\x05\x06', 'zip'),
+    (0, b'\x1f\x8b', 'gzip'),
+    (0, b'BZh', 'bzip2'),
+    (0, b'\xfd7zXZ\x00', 'xz'),
+    (0, b"7z\xbc\xaf'\x1c", '7z'),
+    (0, b'Rar!\x1a\x07', 'rar'),
+    (0, b'\x7fELF', 'elf'),
+    (0, b'MZ', 'pe'),
+    (0, b'SQLite format 3\x00', 'sqlite'),
+    (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'ole'),
+    (0, b'ID3', 'mp3'),
+    (0, b'OggS', 'ogg'),
+    (0, b'fLaC', 'flac'),
+    (4, b'ftyp', 'mp4'),
+    (0, b'\x1aE\xdf\xa3', 'matroska'),
+    (0, b'{\\rtf', 'rtf'),
+    (0, b'%!PS', 'postscript'),
+)
+
+_RIFF_TYPES = {b'WAVE': 'wav', b'AVI ': 'avi', b'WEBP': 'webp'}
+
+
+def detect_file_type(header: bytes) -> str:
+    """Return the type of a file starting with ``header``.
+
+    Args:
+        header: The first bytes (up to :data:`HEADER_SIZE`) of the file.
+    """
+    if not header:
+        return 'empty'
+    for offset, signature, file_type in _SIGNATURES:
+        if header.startswith(signature, offset):
+            return file_type
+    if header.startswith(b'RIFF'):
+        return _RIFF_TYPES.get(header[8:12], 'riff')
+    if b'\x00' not in header and _is_utf8(header):
+        return 'text'
+    return 'unknown'
+
+
+def get_file_type(path: str | pathlib.Path) -> str:
+    """Return the type of the file at ``path`` (see :func:`detect_file_type`).
+
+    Args:
+        path: The path of the file.
+    """
+    with open(path, 'rb') as file_handle:
+        return detect_file_type(file_handle.read(HEADER_SIZE))
+
+
+def _is_utf8(header: bytes) -> bool:
+    try:
+        header.decode('utf-8')
+    except UnicodeDecodeError as err:
+        # The header may end within a multi-byte character.
+        return err.start >= len(header) - 3 and err.reason == 'unexpected end of data'
+    return True
@@ -4,7 +4,7 @@ import hashlib
 from uuid import uuid4
 
 import woodblock.datagen
-import woodblock.file
+import woodblock.utils
 from woodblock.errors import WoodblockError
 
 
@@ -12,16 +12,19 @@ class FillerFragment:
     """A filler fragment.
 
     A filler fragment is a fragment containing synthetic data (e.g. random data). It can be used to simulate wiped
-    areas or areas with random data.
+    areas or areas with random data. The data is generated in chunks of about ``chunk_size`` bytes (see
+    :func:`woodblock.datagen.chunk_sizes`), which does not affect the data of the included data generators. Without a
+    ``data_generator``, the data is generated by a :class:`woodblock.datagen.Random` generator drawing its seed from
+    the ``randomness`` context (the global context by default).
     """
 
-    def __init__(self, size, data_generator=None, chunk_size=8192):
+    def __init__(self, size, data_generator=None, chunk_size=8192, randomness=None):
         if size < 1:
             raise WoodblockError('Fragments must not be empty!')
         self._size = size
         self._chunk_size = chunk_size
         if data_generator is None:
-            data_generator = woodblock.datagen.Random()
+            data_generator = woodblock.datagen.Random(randomness=randomness)
         self._generate_data = data_generator
         self._hash = None
         self._id = uuid4().hex
@@ -31,6 +34,21 @@ class FillerFragment:
         """Return the size of the fragment."""
         return self._size
 
+    @property
+    def data_generator(self):
+        """Return the data generator producing the fragment data."""
+        return self._generate_data
+
+    @property
+    def file_id(self):
+        """Return the ID of the (synthetic) file the fragment belongs to."""
+        return self._id
+
+    @property
+    def number(self):
+        """Return the fragment number. A filler fragment is the only fragment of its file."""
+        return 1
+
     @property
     def hash(self):
         """Return the SHA-256 digest as hexadecimal string."""
@@ -53,7 +71,7 @@ class FillerFragment:
             'fragment': {
                 'sha256': self.hash,
                 'size': self.size,
-                'number': 1,
+                'number': self.number,
                 'file_offsets': {'start': 0, 'end': self.size},
             },
         }
@@ -66,16 +84,51 @@ class FillerFragment:
         if hasattr(self._generate_data, 'reset'):
             self._generate_data.reset()
         hasher = hashlib.sha256() if self._hash is None else None
-        remaining = self._size
-        while remaining > 0:
-            chunk = self._generate_data(min(self._chunk_size, remaining))
-            remaining -= len(chunk)
-            if hasher is not None:
-                hasher.update(chunk)
-            yield chunk
+        try:
+            for size in woodblock.datagen.chunk_sizes(self._size, self._chunk_size):
+                chunk = self._generate_data(size)
+                if hasher is not None:
+                    hasher.update(chunk)
+                yield chunk
+        finally:
+            self._release_generator()
         if hasher is not None:
             self._hash = hasher.hexdigest()
 
+    def readinto(self, buffer) -> int:
+        """Write the fragment data into the first :attr:`size` bytes of ``buffer`` and return the number of bytes.
+
+        The data is generated in the same chunks as when iterating over the fragment. If the data generator has a
+        ``fill`` method, it fills the chunks of ``buffer`` in place instead of returning new ``bytes`` objects.
+
+        Args:
+            buffer: A writable bytes-like object of at least :attr:`size` bytes, e.g. a ``memoryview`` of a
+                memory-mapped image.
+        """
+        if hasattr(self._generate_data, 'reset'):
+            self._generate_data.reset()
+        view = memoryview(buffer)[: self._size]
+        try:
+            start = 0
+            for size in woodblock.datagen.chunk_sizes(self._size, self._chunk_size):
+                chunk = view[start : start + size]
+                start += size
+                if hasattr(self._generate_data, 'fill'):
+                    self._generate_data.fill(chunk)
+                else:
+                    chunk[:] = self._generate_data(len(chunk))
+        finally:
+            self._release_generator()
+        if self._hash is None:
+            self._hash = hashlib.sha256(view).hexdigest()
+        return self._size
+
+    def _release_generator(self):
+        # Resetting a data generator releases its random state (see woodblock.datagen.Random), which is only needed
+        # while the fragment is generated. Every iteration resets the generator before generating data anyway.
+        if hasattr(self._generate_data, 'reset'):
+            self._generate_data.reset()
+
 
 class ZeroesFragment(FillerFragment):
     """A fragment filled completely with zero bytes (0x00)."""
@@ -87,8 +140,8 @@ class ZeroesFragment(FillerFragment):
 class RandomDataFragment(FillerFragment):
     """A fragment filled with random bytes."""
 
-    def __init__(self, size, chunk_size=8192):
-        self._rng = woodblock.datagen.Random()
+    def __init__(self, size, chunk_size=8192, randomness=None):
+        self._rng = woodblock.datagen.Random(randomness=randomness)
         # The base FillerFragment.__iter__ resets the data generator on every iteration, so the
         # RNG is re-seeded to its initial seed each pass and the random data is reproduced
         # byte-for-byte regardless of iteration order or of any other generator.
@@ -112,9 +165,35 @@ class FileFragment:
         """Return the size of the fragment."""
         return self._size
 
+    @property
+    def file(self):
+        """Return the file the fragment belongs to."""
+        return self._file
+
+    @property
+    def file_id(self):
+        """Return the ID of the file the fragment belongs to."""
+        return self._file.id
+
+    @property
+    def start_offset(self):
+        """Return the offset of the fragment within its file."""
+        return self._start_offset
+
+    @property
+    def number(self):
+        """Return the fragment number."""
+        return self._number
+
     @property
     def hash(self):
-        """Return the SHA-256 digest as hexadecimal string."""
+        """Return the SHA-256 digest as hexadecimal string.
+
+        The digest is taken from the hash cache of the corpus (see :class:`woodblock.hashcache.HashCache`) if it is
+        known there. Otherwise, the fragment is read and its digest is recorded in the hash cache.
+        """
+        if self._hash is None:
+            self._hash = self._file.corpus.cached_fragment_hash(self._file.path, self._start_offset, self._end_offset)
         if self._hash is None:
             for _ in self:
                 pass
@@ -137,7 +216,46 @@ class FileFragment:
                     hasher.update(chunk)
                 yield chunk
         if hasher is not None:
-            self._hash = hasher.hexdigest()
+            self._set_hash(hasher.hexdigest())
+
+    def copy_to(self, fd: int):
+        """Copy the fragment to the current position of the file descriptor ``fd``.
+
+        The data is copied in kernel space if possible (see :func:`woodblock.utils.copy_file_data`), i.e. it never
+        passes through Python. Hence, the fragment hash is not computed by this method. It is computed on demand when
+        accessing :attr:`hash`.
+
+        Args:
+            fd: The file descriptor to copy the fragment to.
+        """
+        with open(self._file.path, 'rb') as handle:
+            woodblock.utils.copy_file_data(handle.fileno(), fd, self._start_offset, self._size)
+
+    def readinto(self, buffer) -> int:
+        """Read the fragment into the first :attr:`size` bytes of ``buffer`` and return the number of bytes read.
+
+        The data is read from the file directly into ``buffer``, i.e. without creating intermediate ``bytes`` objects.
+
+        Args:
+            buffer: A writable bytes-like object of at least :attr:`size` bytes, e.g. a ``memoryview`` of a
+                memory-mapped image.
+        """
+        view = memoryview(buffer)[: self._size]
+        read = 0
+        with open(self._file.path, 'rb', buffering=0) as handle:
+            handle.seek(self._start_offset)
+            while read < self._size:
+                count = handle.readinto(view[read:])
+                if not count:
+                    break
+                read += count
+        if self._hash is None:
+            self._set_hash(hashlib.sha256(view[:read]).hexdigest())
+        return read
+
+    def _set_hash(self, sha256):
+        self._hash = sha256
+        self._file.corpus.record_fragment_hash(self._file.path, self._start_offset, self._end_offset, sha256)
 
     @property
     def metadata(self):
@@ -147,7 +265,7 @@ class FileFragment:
                 'type': 'file',
                 'sha256': self._file.hash,
                 'size': self._file.size,
-                'path': str(self._file.path.relative_to(woodblock.file.get_corpus())),
+                'path': str(self._file.corpus.relative(self._file.path)),
                 'id': self._file.id,
             },
             'fragment': {
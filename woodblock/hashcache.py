@@ -0,0 +1,115 @@
+"""This module contains the persistent hash cache.
+
+The hash cache stores the SHA-256 hashes of corpus files and of fragments of corpus files, so that every file and every
+fragment is hashed once instead of once per process. The entries are keyed by the device, inode, size and modification
+time of the file (see :func:`woodblock.utils.file_key`), so that a modified file never gets the hash of its previous
+content. The cache is an SQLite file with the following tables:
+
+``files``
+    The hash (``sha256``) of each file identified by ``device``, ``inode``, ``size`` and ``mtime_ns``.
+``fragments``
+    The hash (``sha256``) of the bytes ``start_offset`` to ``end_offset`` of a file identified like above.
+
+The cache can be shared by several processes. Entries of outdated versions of a file are removed when a hash of its
+current version is recorded.
+"""
+
+import pathlib
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (device, inode, size, mtime_ns)
+);
+CREATE TABLE IF NOT EXISTS fragments (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    start_offset INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (device, inode, size, mtime_ns, start_offset, end_offset)
+);
+"""
+
+
+class HashCache:
+    """A persistent cache of file and fragment hashes.
+
+    An existing cache at ``path`` is reused. A cache can be used by several threads.
+
+    Args:
+        path: The path of the cache file.
+    """
+
+    def __init__(self, path):
+        self._path = pathlib.Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._path, check_same_thread=False, timeout=60)
+        # Losing the most recent entries in a crash only means hashing them again, so durability is traded for speed.
+        self._db.execute('PRAGMA journal_mode = WAL')
+        self._db.execute('PRAGMA synchronous = OFF')
+        self._db.executescript(_SCHEMA)
+
+    @property
+    def path(self) -> pathlib.Path:
+        """Return the path of the cache file."""
+        return self._path
+
+    def get_file(self, key: tuple) -> str | None:
+        """Return the SHA-256 hash of the file identified by ``key`` or ``None`` if it is not cached.
+
+        Args:
+            key: The key of the file (see :func:`woodblock.utils.file_key`).
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT sha256 FROM files WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ?', key
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def set_file(self, key: tuple, sha256: str):
+        """Record the SHA-256 hash of the file identified by ``key``."""
+        with self._lock:
+            self._db.execute('DELETE FROM files WHERE device = ? AND inode = ?', key[:2])
+            self._db.execute('INSERT INTO files VALUES (?, ?, ?, ?, ?)', (*key, sha256))
+            self._db.commit()
+
+    def get_fragment(self, key: tuple, start_offset: int, end_offset: int) -> str | None:
+        """Return the SHA-256 hash of a fragment or ``None`` if it is not cached.
+
+        Args:
+            key: The key of the file of the fragment (see :func:`woodblock.utils.file_key`).
+            start_offset: The offset of the fragment in the file.
+            end_offset: The offset of the end of the fragment in the file.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT sha256 FROM fragments WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ? '
+                'AND start_offset = ? AND end_offset = ?',
+                (*key, start_offset, end_offset),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def set_fragment(self, key: tuple, start_offset: int, end_offset: int, sha256: str):
+        """Record the SHA-256 hash of the fragment from ``start_offset`` to ``end_offset`` of the file ``key``."""
+        with self._lock:
+            self._db.execute(
+                'DELETE FROM fragments WHERE device = ? AND inode = ? AND (size != ? OR mtime_ns != ?)', key
+            )
+            self._db.execute(
+                'INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (*key, start_offset, end_offset, sha256),
+            )
+            self._db.commit()
+
+    def close(self):
+        """Close the cache."""
+        self._db.close()
@@ -0,0 +1,147 @@
+"""This module contains the export of sector hash databases.
+
+A sector hash database maps the hashes of all (full) blocks of the corpus files placed in an image to their image
+offsets and file offsets. Block-hash-based carvers can use it as their reference set. The database is an SQLite file
+with the following tables:
+
+``meta``
+    Key/value pairs describing the database (``block_size``, ``hash_algorithm`` and ``seed``).
+``files``
+    The corpus files placed in the image (``id``, ``path`` relative to the corpus and ``size``).
+``blocks``
+    One row per block with its ``hash`` (hexadecimal), ``image_offset``, ``file_id`` and ``file_offset``.
+"""
+
+import hashlib
+import os
+import pathlib
+import sqlite3
+
+import woodblock.fragments
+import woodblock.random
+from woodblock.errors import WoodblockError
+
+#: Default hash algorithm of the block hashes. MD5 is what hashdb and most block-hash-based tools use.
+DEFAULT_ALGORITHM = 'md5'
+
+_BATCH_SIZE = 10000
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE files (id TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL);
+CREATE TABLE blocks (
+    hash TEXT NOT NULL,
+    image_offset INTEGER NOT NULL,
+    file_id TEXT NOT NULL REFERENCES files (id),
+    file_offset INTEGER NOT NULL
+);
+"""
+
+
+class HashDatabase:
+    """A sector hash database which is filled while an image is written.
+
+    The database is filled by passing the fragment data to :meth:`update` in image order, which
+    :class:`woodblock.output.Output` does for all its observers. Only fragments of corpus files (i.e.
+    :class:`woodblock.fragments.FileFragment` instances) are hashed. Since fragments start at block boundaries, the
+    fragment data is split into blocks of ``block_size`` bytes. A trailing partial block at the end of a file is not
+    hashed, as it is not a full sector of the image.
+
+    The database is written to a temporary file next to ``path`` (``path`` with the ".partial" extension appended).
+    Call :meth:`close` when the image has been written in order to commit the database and to move it to ``path``,
+    replacing an existing database. If writing the image fails, call :meth:`discard` instead, which removes the
+    temporary file and keeps an existing database.
+
+    Args:
+        path: The output path of the database.
+        block_size: The block size of the image.
+        algorithm: The name of the ``hashlib`` algorithm used to hash the blocks.
+        seed: The seed of the image recorded in the database. Defaults to the seed of the global context.
+    """
+
+    def __init__(self, path, block_size: int, algorithm: str = DEFAULT_ALGORITHM, seed: int | None = None):
+        if algorithm not in hashlib.algorithms_available:
+            raise WoodblockError(f'Unsupported hash algorithm: "{algorithm}".')
+        self._path = pathlib.Path(path)
+        self._block_size = block_size
+        self._algorithm = algorithm
+        self._partial_path = self._path.with_name(self._path.name + '.partial')
+        # A partial database of an interrupted run is useless, as it is rebuilt from scratch.
+        self._partial_path.unlink(missing_ok=True)
+        self._db = sqlite3.connect(self._partial_path)
+        self._db.executescript(_SCHEMA)
+        self._db.executemany(
+            'INSERT INTO meta VALUES (?, ?)',
+            (
+                ('block_size', str(block_size)),
+                ('hash_algorithm', algorithm),
+                ('seed', str(woodblock.random.get_seed() if seed is None else seed)),
+            ),
+        )
+        self._files = set()
+        self._rows = []
+        self._fragment = None
+        self._image_offset = 0
+        self._file_offset = 0
+        self._pending = bytearray()
+
+    def update(self, offset: int, data, fragment):
+        """Hash the blocks of ``data``.
+
+        Args:
+            offset: The image offset of ``data``.
+            data: A chunk of the data of ``fragment``.
+            fragment: The fragment ``data`` belongs to.
+        """
+        if not isinstance(fragment, woodblock.fragments.FileFragment):
+            return
+        if fragment is not self._fragment:
+            self._start_fragment(offset, fragment)
+        self._pending += data
+        full = len(self._pending) - len(self._pending) % self._block_size
+        view = memoryview(self._pending)
+        file_id = fragment.file_id
+        for start in range(0, full, self._block_size):
+            digest = hashlib.new(self._algorithm, view[start : start + self._block_size]).hexdigest()
+            self._rows.append((digest, self._image_offset + start, file_id, self._file_offset + start))
+        view.release()
+        del self._pending[:full]
+        self._image_offset += full
+        self._file_offset += full
+        if len(self._rows) >= _BATCH_SIZE:
+            self._insert_rows()
+
+    def add_fragment(self, offset: int, fragment):
+        """Hash the blocks of ``fragment`` placed at the image offset ``offset`` by reading the fragment."""
+        for chunk in fragment:
+            self.update(offset, chunk, fragment)
+            offset += len(chunk)
+
+    def close(self):
+        """Commit and close the database and move it to its output path."""
+        self._insert_rows()
+        self._db.execute('CREATE INDEX blocks_hash ON blocks (hash)')
+        self._db.commit()
+        self._db.close()
+        os.replace(self._partial_path, self._path)
+
+    def discard(self):
+        """Close the database without committing it and remove its temporary file."""
+        self._db.close()
+        self._partial_path.unlink(missing_ok=True)
+
+    def _start_fragment(self, offset, fragment):
+        self._fragment = fragment
+        self._image_offset = offset
+        self._file_offset = fragment.start_offset
+        # A partial block can only remain at the end of a file, where it is dropped.
+        self._pending = bytearray()
+        file = fragment.file
+        if file.id not in self._files:
+            self._files.add(file.id)
+            path = str(file.corpus.relative(file.path))
+            self._db.execute('INSERT INTO files VALUES (?, ?, ?)', (file.id, path, file.size))
+
+    def _insert_rows(self):
+        self._db.executemany('INSERT INTO blocks VALUES (?, ?, ?, ?)', self._rows)
+        self._rows = []
@@ -3,15 +3,18 @@
 import configparser
 import itertools
 import json
+import os
 import pathlib
-import random
 from collections import defaultdict
 from operator import itemgetter
 
+import woodblock.corpus
 import woodblock.datagen
 import woodblock.file
 import woodblock.fragments
+import woodblock.journal
 import woodblock.random
+import woodblock.writing
 from woodblock.errors import ImageConfigError, InvalidFragmentationPointError, WoodblockError
 from woodblock.scenario import Scenario
 
@@ -27,29 +30,52 @@ class Image:
         padding_generator: A data generator used to generate padding.
         scenario_gap: Number of blocks of padding to insert between consecutive scenarios.
         target_size: If set, pad the whole image up to this number of blocks.
+        randomness: The :class:`woodblock.random.Randomness` context the image is generated with. Its seed and backend
+            are recorded in the metadata and it seeds the default padding generator. Defaults to the global context.
+        corpus: The :class:`woodblock.corpus.Corpus` recorded in the metadata. Defaults to the default corpus.
     """
 
     def __init__(
-        self, block_size: int = 512, padding_generator=None, scenario_gap: int = 0, target_size: int | None = None
+        self,
+        block_size: int = 512,
+        padding_generator=None,
+        scenario_gap: int = 0,
+        target_size: int | None = None,
+        randomness=None,
+        corpus=None,
     ):
         self._block_size = block_size
         self._scenarios = []
+        self._randomness = randomness or woodblock.random.get_randomness()
+        self._corpus = corpus
         if padding_generator is None:
-            padding_generator = woodblock.datagen.Random()
+            padding_generator = woodblock.datagen.Random(randomness=self._randomness)
         self._generate_padding = padding_generator
         self._scenario_gap_bytes = scenario_gap * block_size
         self._target_bytes = target_size * block_size if target_size is not None else None
+        self._digests = None
+        self._segments = None
 
     def add(self, scenario):
         """Add a ``Scenario`` to the image."""
         self._scenarios.append(scenario)
 
     @staticmethod
-    def from_config(path: pathlib.Path):
+    def from_config(path: pathlib.Path, randomness=None, corpus=None):
         """Create an Image instance based on a configuration file.
 
+        The seed, backend and seeding of the configuration are applied to ``randomness``. Without it, images using
+        ``sequential`` seeding are created with the global context (see :mod:`woodblock.random`) and images using
+        ``hierarchical`` seeding with a new context. Pass a new :class:`woodblock.random.Randomness` in order to
+        create images in several threads concurrently.
+
+        The files are taken from ``corpus``, which replaces the ``corpus`` key of the configuration. Without it, the
+        corpus of the configuration becomes the default corpus (see :func:`woodblock.file.corpus`).
+
         Args:
             path: The path to the configuration file.
+            randomness: The :class:`woodblock.random.Randomness` context to create the image with.
+            corpus: The :class:`woodblock.corpus.Corpus` to take the files from.
         """
         config = configparser.RawConfigParser()
         with path.open('r') as config_handle:
@@ -58,14 +84,33 @@ class Image:
             except configparser.Error as err:
                 raise ImageConfigError(str(err)) from err
         general = _parse_general_section(config)
-        woodblock.file.corpus(path.absolute().parent / general['corpus'])
+        if corpus is None:
+            config_dir = path.absolute().parent
+            index = general.get('corpus index')
+            hash_cache = general.get('hash cache')
+            corpus = woodblock.corpus.Corpus(
+                config_dir / general['corpus'],
+                index=None if index is None else config_dir / index,
+                hash_cache=None if hash_cache is None else config_dir / hash_cache,
+            )
+            woodblock.file.corpus(corpus)
+        if randomness is None:
+            if general['seeding'] == 'sequential':
+                randomness = woodblock.random.get_randomness()
+            else:
+                randomness = woodblock.random.Randomness()
         if 'seed' in general:
-            woodblock.random.seed(general['seed'])
+            randomness.seed(general['seed'])
+        randomness.set_backend(general['rng'])
+        randomness.set_seeding(general['seeding'])
         num_filler_blocks = (general['min filler blocks'], general['max filler blocks'])
         image = Image(
             block_size=general['block size'],
+            padding_generator=woodblock.datagen.Random(randomness=randomness.spawn(0)),
             scenario_gap=general['scenario gap'],
             target_size=general.get('image size'),
+            randomness=randomness,
+            corpus=corpus,
         )
         for section in config.sections():
             if section != 'general':
@@ -74,6 +119,8 @@ class Image:
                     section=config[section],
                     num_filler_blocks=num_filler_blocks,
                     block_size=general['block size'],
+                    randomness=randomness.spawn(_scenario_key(section)),
+                    corpus=corpus,
                 )
                 image.add(scenario)
         if image._target_bytes is not None and image._target_bytes < image._content_size():
@@ -83,7 +130,12 @@ class Image:
             )
         return image
 
-    def write(self, target):
+    @property
+    def block_size(self) -> int:
+        """Return the block size of the image."""
+        return self._block_size
+
+    def write(self, target, options=None, **kwargs):
         """Write the image to disk.
 
         ``target`` may be a path (``str`` or ``pathlib.Path``) or a ``.write()``-supporting file-like
@@ -92,49 +144,132 @@ class Image:
         "test-image.dd" and the metadata to "test-image.dd.json". When given a file-like object, only the
         image is written -- call :attr:`metadata` yourself if you need the ground truth.
 
+        The options of writing the image are given as a :class:`woodblock.writing.WriteOptions` object or as its
+        keyword arguments, e.g. ``image.write(path, sparse=True)``.
+
+        If ``metadata_path`` is set, the metadata is written to this path once the image has been written completely.
+        This also works for file-like objects such as ``sys.stdout.buffer`` or the standard input of a carver process,
+        so that the image never has to be stored on disk.
+
+        By default, the image is written in image order in batches of ``buffer_size`` bytes (see
+        :class:`woodblock.writing.SequentialWriter`).
+
+        If ``workers`` is larger than 1 and the image is written to a regular file, the fragments are written
+        concurrently (see :class:`woodblock.writing.PositionalWriter`). If ``memory_map`` is ``True``, they are written
+        through a memory map of the output file (see :class:`woodblock.writing.MappedWriter`).
+
+        If ``resume`` is ``True``, ``target`` has to be a path. The progress is recorded in a journal, so that an
+        interrupted run can be resumed (see :class:`woodblock.writing.JournaledWriter`).
+
+        The ``digests`` of the whole image, i.e. including all padding and gaps, are computed while the image is
+        written sequentially and recorded in the ``digests`` entry of the metadata. File fragments are passed through
+        Python for this instead of being copied in kernel space. If ``checksum_path`` is set, the SHA-256 digest is
+        computed in any case and written to this path in the format of ``sha256sum``. Compressed images cannot have a
+        checksum file, as their digests refer to the uncompressed image.
+
+        If ``hashdb_path`` is set, a sector hash database containing the hashes of all blocks of the corpus files placed
+        in the image is written to this path (see :class:`woodblock.hashdb.HashDatabase`). The blocks are hashed while
+        the image is written sequentially, i.e. neither the corpus files nor the image are read again. An existing
+        database at ``hashdb_path`` is only replaced once the image has been written successfully.
+
+        If ``compression`` is set or ``target`` is a path ending with ".gz", ".bz2" or ".xz", the image is compressed
+        while it is written (see :class:`woodblock.writing.CompressedWriter`).
+
+        If ``segment_size`` is set, ``target`` has to be a path and the image is split into segment files of (at most)
+        ``segment_size`` bytes while it is written (see :class:`woodblock.writing.SegmentedWriter`).
+
         Args:
             target: The output path or a ``.write()``-supporting file-like object.
+            options: The :class:`woodblock.writing.WriteOptions` of writing the image.
+            **kwargs: The arguments of :class:`woodblock.writing.WriteOptions` if ``options`` is not given.
+
+        Raises:
+            WoodblockError: If the options cannot be combined (see :meth:`woodblock.writing.WriteOptions.validate`).
         """
-        if isinstance(target, (str, pathlib.Path)):
-            path = pathlib.Path(target)
-            with path.open('wb') as file_handle:
-                self.write(file_handle)
-            self._write_metadata(path)
-            return
+        if options is None:
+            options = woodblock.writing.WriteOptions(**kwargs)
+        elif kwargs:
+            raise TypeError('Pass either a WriteOptions object or its keyword arguments, not both.')
+        self._segments = None
+        options = options.validate(target, self._block_size)
+        hashers = options.create_hashers()
+        observers = options.create_observers(self._block_size, self._randomness.get_seed())
+        metadata_path = options.metadata_path
+        completed = False
+        try:
+            writer = options.writer()
+            path = writer.write(self, target, hashers, observers)
+            self._segments = writer.segments
+            if metadata_path is None and path is not None:
+                metadata_path = path.absolute().with_name(path.name + '.json')
+            self._finish_writing(hashers, path, metadata_path, options.checksum_path)
+            writer.finish()
+            completed = True
+        finally:
+            # A database of a failed write is discarded, so that an existing database is kept.
+            for observer in observers:
+                if completed:
+                    observer.close()
+                else:
+                    observer.discard()
+            # Resetting releases the random state of the padding generator (see woodblock.datagen.Random).
+            if hasattr(self._generate_padding, 'reset'):
+                self._generate_padding.reset()
+
+    def _finish_writing(self, hashers, path, metadata_path, checksum_path):
+        """Record the image digests and write the checksum file and the metadata (if requested)."""
+        self._digests = {hasher.name: hasher.hexdigest() for hasher in hashers} or None
+        if checksum_path is not None:
+            checksum_path = pathlib.Path(checksum_path)
+            # The format of sha256sum, so that the image can be checked using "sha256sum -c".
+            name = '-' if path is None else os.path.relpath(path.absolute(), checksum_path.absolute().parent)
+            checksum_path.write_text(f'{self._digests["sha256"]}  {name}\n')
+        if metadata_path is not None:
+            self._write_metadata(pathlib.Path(metadata_path))
+
+    def _prepare_writing(self):
+        self._check_target_size()
         # Reset the padding generator so writing the same image twice yields byte-identical
         # output. User-supplied padding generators may be plain callables without a reset.
         if hasattr(self._generate_padding, 'reset'):
             self._generate_padding.reset()
-        for scenario, gap in self._scenarios_with_trailing_gaps():
-            self._write_scenario(target, scenario)
-            if gap:
-                target.write(self._generate_padding(gap))
-        if self._target_bytes is not None:
-            content_size = self._content_size()
-            if self._target_bytes < content_size:
-                raise WoodblockError(
-                    f'Target image size ({self._target_bytes} bytes) is smaller than the image '
-                    f'content ({content_size} bytes).'
-                )
-            if self._target_bytes > content_size:
-                target.write(self._generate_padding(self._target_bytes - content_size))
+
+    def _fingerprint(self, regions):
+        """Return a digest of everything determining the image data, i.e. the seed, the image layout and the files.
+
+        File fragments are identified by the path and modification time of their file and their offsets in it.
+        """
+        return woodblock.journal.fingerprint(
+            {
+                'block_size': self._block_size,
+                'seed': self._randomness.get_seed(),
+                'rng': self._randomness.get_info(),
+                'padding': str(self._generate_padding),
+                'regions': [[offset, size, _fragment_fingerprint(fragment)] for offset, size, fragment in regions],
+            }
+        )
 
     @property
     def metadata(self):
         """Return the image metadata."""
         meta = {
             'block_size': self._block_size,
-            'seed': woodblock.random.get_seed(),
-            'corpus': str(woodblock.file.get_corpus()),
+            'seed': self._randomness.get_seed(),
+            'rng': self._randomness.get_info(),
+            'corpus': str(self._corpus.path if self._corpus is not None else woodblock.file.get_corpus()),
             'scenarios': [s.metadata for s in self._scenarios],
         }
+        if self._digests is not None:
+            meta['digests'] = dict(self._digests)
+        if self._segments is not None:
+            meta['segments'] = {'size': self._segments['size'], 'files': list(self._segments['files'])}
         image_offsets, _ = self._compute_image_offsets()
         self._update_metadata_with_image_offsets(meta, image_offsets)
+        if self._segments is not None:
+            self._update_metadata_with_segment_offsets(meta, self._segments['size'])
         return meta
 
-    def _write_metadata(self, image_path: pathlib.Path):
-        image_path = image_path.absolute()
-        metadata_path = image_path.with_name(image_path.name + '.json')
+    def _write_metadata(self, metadata_path: pathlib.Path):
         with metadata_path.open('w') as file_handle:
             json.dump(self.metadata, file_handle)
 
@@ -153,39 +288,67 @@ class Image:
         """Return the size (in bytes) of the image content, i.e. all fragments plus inter-scenario gaps."""
         return self._compute_image_offsets()[1]
 
-    def _write_scenario(self, image, scenario):
-        for fragment in scenario:
-            for chunk in fragment:
-                image.write(chunk)
-            self._pad_fragment(image, fragment.size)
+    def _check_target_size(self):
+        if self._target_bytes is not None:
+            content_size = self._content_size()
+            if self._target_bytes < content_size:
+                raise WoodblockError(
+                    f'Target image size ({self._target_bytes} bytes) is smaller than the image '
+                    f'content ({content_size} bytes).'
+                )
 
-    def _pad_fragment(self, image, fragment_size):
-        remainder = fragment_size % self._block_size
-        if remainder != 0:
-            padding_size = self._block_size - remainder
-            image.write(self._generate_padding(padding_size))
+    def _regions(self, trailing_padding=True):
+        """Yield an ``(offset, size, fragment)`` tuple for every region of the image in image order.
+
+        Padding regions, i.e. the block padding after a fragment, the gaps between scenarios and the trailing padding
+        up to the target size, have ``fragment`` set to ``None``. If ``trailing_padding`` is ``False``, the trailing
+        padding is omitted.
+        """
+        offset = 0
+        for scenario, gap in self._scenarios_with_trailing_gaps():
+            for fragment in scenario:
+                yield offset, fragment.size, fragment
+                offset += fragment.size
+                if offset % self._block_size != 0:
+                    padding_size = self._block_size - (offset % self._block_size)
+                    yield offset, padding_size, None
+                    offset += padding_size
+            if gap:
+                yield offset, gap, None
+                offset += gap
+        if trailing_padding and self._target_bytes is not None and self._target_bytes > offset:
+            yield offset, self._target_bytes - offset, None
+
+    def _padding_chunks(self, size):
+        """Yield the padding of a region of ``size`` bytes in chunks (see :func:`woodblock.datagen.chunk_sizes`)."""
+        for chunk_size in woodblock.datagen.chunk_sizes(size, woodblock.datagen.PADDING_CHUNK_SIZE):
+            yield self._generate_padding(chunk_size)
+
+    def _is_zero_region(self, fragment):
+        """Return ``True`` if ``fragment`` (or the padding if ``fragment`` is ``None``) consists of zero bytes only."""
+        if fragment is None:
+            return isinstance(self._generate_padding, woodblock.datagen.Zeroes)
+        return isinstance(getattr(fragment, 'data_generator', None), woodblock.datagen.Zeroes)
 
     def _compute_image_offsets(self):
+        """Return the image offsets of all fragments and the size of the image content.
+
+        The layout is computed from the sizes and IDs of the fragments only, i.e. no fragment data is read. The fragment
+        hashes are computed while the image is written.
+        """
         image_offsets = defaultdict(dict)
-        current_offset = 0
-        for scenario, gap in self._scenarios_with_trailing_gaps():
-            for frag in scenario:
-                frag_meta = frag.metadata
-                file_id = frag_meta['file']['id']
-                number = frag_meta['fragment']['number']
-                frag_size = frag_meta['fragment']['size']
-                end_offset = current_offset + frag_size
-                if number in image_offsets[file_id]:
-                    raise WoodblockError(
-                        f'Fragment {number} of file {file_id} is placed more than once in the image. '
-                        'The ground truth cannot represent a fragment at more than one location.'
-                    )
-                image_offsets[file_id][number] = {'start': current_offset, 'end': end_offset}
-                current_offset += frag_size
-                if current_offset % self._block_size != 0:
-                    current_offset += self._block_size - (current_offset % self._block_size)
-            current_offset += gap
-        return image_offsets, current_offset
+        content_size = 0
+        for offset, size, frag in self._regions(trailing_padding=False):
+            content_size = offset + size
+            if frag is None:
+                continue
+            if frag.number in image_offsets[frag.file_id]:
+                raise WoodblockError(
+                    f'Fragment {frag.number} of file {frag.file_id} is placed more than once in the image. '
+                    'The ground truth cannot represent a fragment at more than one location.'
+                )
+            image_offsets[frag.file_id][frag.number] = {'start': offset, 'end': offset + size}
+        return image_offsets, content_size
 
     @staticmethod
     def _update_metadata_with_image_offsets(meta, image_offsets):
@@ -195,6 +358,40 @@ class Image:
                 for frag_meta in file_meta['fragments']:
                     frag_meta['image_offsets'] = image_offsets[file_id][frag_meta['number']]
 
+    @staticmethod
+    def _update_metadata_with_segment_offsets(meta, segment_size):
+        """Add the segments and segment offsets of the start and the (exclusive) end of every fragment.
+
+        Segments are numbered from 1 like the segment files. A fragment ending exactly at the end of a segment has the
+        end offset ``segment_size`` in this segment.
+        """
+        for scenario_meta in meta['scenarios']:
+            for file_meta in scenario_meta['files']:
+                for frag_meta in file_meta['fragments']:
+                    start = frag_meta['image_offsets']['start']
+                    end = frag_meta['image_offsets']['end']
+                    end_segment = (end - 1) // segment_size
+                    frag_meta['segment_offsets'] = {
+                        'start': {'segment': start // segment_size + 1, 'offset': start % segment_size},
+                        'end': {'segment': end_segment + 1, 'offset': end - end_segment * segment_size},
+                    }
+
+
+def _fragment_fingerprint(fragment):
+    if fragment is None:
+        return None
+    if isinstance(fragment, woodblock.fragments.FileFragment):
+        path = fragment.file.path
+        return [
+            type(fragment).__name__,
+            fragment.number,
+            str(path),
+            os.stat(path).st_mtime_ns,
+            fragment.start_offset,
+            fragment.start_offset + fragment.size,
+        ]
+    return [type(fragment).__name__, fragment.number]
+
 
 def _parse_general_section(config: dict) -> dict:
     if 'general' not in config:
@@ -204,9 +401,15 @@ def _parse_general_section(config: dict) -> dict:
         raise ImageConfigError('Mandatory "corpus" key in "general" section is not present.')
     general = {}
     general['corpus'] = section['corpus']
+    if 'corpus index' in section:
+        general['corpus index'] = section['corpus index']
+    if 'hash cache' in section:
+        general['hash cache'] = section['hash cache']
     general['block size'] = int(section.get('block size', 512))
     if 'seed' in section:
         general['seed'] = int(section['seed'])
+    general['rng'] = _parse_rng(section)
+    general['seeding'] = _parse_seeding(section)
     general['min filler blocks'] = _get_number_of_blocks(section, 'min') or 1
     general['max filler blocks'] = _get_number_of_blocks(section, 'max') or 10
     general['scenario gap'] = _parse_scenario_gap(section)
@@ -217,6 +420,25 @@ def _parse_general_section(config: dict) -> dict:
     return general
 
 
+def _parse_rng(section: dict) -> str:
+    backend = section.get('rng', woodblock.random.DEFAULT_BACKEND).strip().lower()
+    if backend not in woodblock.random.BACKENDS:
+        raise ImageConfigError(
+            f'Unsupported value for "rng": "{section["rng"]}". Use one of {", ".join(woodblock.random.BACKENDS)}.'
+        )
+    return backend
+
+
+def _parse_seeding(section: dict) -> str:
+    seeding = section.get('seeding', 'sequential').strip().lower()
+    if seeding not in woodblock.random.SEEDINGS:
+        raise ImageConfigError(
+            f'Unsupported value for "seeding": "{section["seeding"]}". '
+            f'Use one of {", ".join(woodblock.random.SEEDINGS)}.'
+        )
+    return seeding
+
+
 def _parse_scenario_gap(section: dict) -> int:
     try:
         gap = int(section.get('scenario gap', 0))
@@ -248,30 +470,51 @@ def _get_number_of_blocks(section: dict, min_or_max: str):
     return None
 
 
-def _parse_scenario_section(section_name: str, section: dict, num_filler_blocks: tuple, block_size: int):
+def _scenario_key(section_name: str) -> int:
+    """Return the key of the context of a scenario, which only depends on its name (the padding uses key 0)."""
+    return int.from_bytes(section_name.encode(), 'big')
+
+
+def _parse_scenario_section(
+    section_name: str, section: dict, num_filler_blocks: tuple, block_size: int, randomness=None, corpus=None
+):
+    randomness = randomness or woodblock.random.get_randomness()
+    corpus = corpus or woodblock.file.get_default_corpus()
     try:
         layout = _get_layout_type(section)
     except KeyError as err:
         raise ImageConfigError(f'Section [{section_name}] contains no "layout" key.') from err
 
     if layout == 'fragment-sequence':
-        return _parse_fragment_sequence_layout(section_name, section, num_filler_blocks, block_size)
+        return _parse_fragment_sequence_layout(section_name, section, num_filler_blocks, block_size, randomness, corpus)
     if layout == 'intertwine':
-        return _parse_intertwine_layout(section_name, section, block_size)
+        return _parse_intertwine_layout(section_name, section, block_size, randomness, corpus)
     raise ImageConfigError(f'Unsupported layout type in section [{section_name}]: "{layout}".')
 
 
 _KEYWORD_LAYOUTS = ('intertwine',)
 
 _GENERAL_ALLOWED_KEYS = frozenset(
-    {'corpus', 'block size', 'seed', 'min filler blocks', 'max filler blocks', 'scenario gap', 'image size'}
+    {
+        'corpus',
+        'corpus index',
+        'hash cache',
+        'block size',
+        'seed',
+        'rng',
+        'seeding',
+        'min filler blocks',
+        'max filler blocks',
+        'scenario gap',
+        'image size',
+    }
 )
 _INTERTWINE_ALLOWED_KEYS = frozenset({'layout', 'num files', 'min frags', 'max frags'})
 _FRAGMENT_SEQUENCE_ALLOWED_KEYS = frozenset({'layout', 'min filler blocks', 'max filler blocks'})
 
 
 def _is_file_definition_key(key: str) -> bool:
-    """Return ``True`` for the dynamic ``fileN`` / ``frags fileN`` / ``sizes fileN`` keys.
+    """Return ``True`` for the dynamic ``fileN`` / ``frags fileN`` / ``sizes fileN`` / ``type fileN`` keys.
 
     Both the space- and underscore-separated spellings (e.g. ``frags file1`` and ``frags_file1``)
     are accepted.
@@ -280,6 +523,8 @@ def _is_file_definition_key(key: str) -> bool:
         return key[len('frags file') :].isdigit()
     if key.startswith('sizes file') or key.startswith('sizes_file'):
         return key[len('sizes file') :].isdigit()
+    if key.startswith('type file') or key.startswith('type_file'):
+        return key[len('type file') :].isdigit()
     if key.startswith('file'):
         return key[len('file') :].isdigit()
     return False
@@ -320,7 +565,7 @@ def _looks_like_fragment_sequence(layout: str) -> bool:
     return kind in ('r', 'z') or '.' in layout or '-' in layout  # nosec
 
 
-def _parse_intertwine_layout(section_name: str, section: dict, block_size: int):
+def _parse_intertwine_layout(section_name: str, section: dict, block_size: int, randomness, corpus):
     _reject_unknown_keys(section_name, section, _INTERTWINE_ALLOWED_KEYS)
     scenario = Scenario(section_name)
     try:
@@ -333,31 +578,42 @@ def _parse_intertwine_layout(section_name: str, section: dict, block_size: int):
     min_frags, max_frags = _parse_frags_nums(section_name, section)
     scenario.add(
         woodblock.file.intertwine_randomly(
-            number_of_files=num_files, block_size=block_size, min_fragments=min_frags, max_fragments=max_frags
+            number_of_files=num_files,
+            block_size=block_size,
+            min_fragments=min_frags,
+            max_fragments=max_frags,
+            randomness=randomness,
+            corpus=corpus,
         )
     )
     return scenario
 
 
-def _parse_fragment_sequence_layout(section_name: str, section: dict, num_filler_blocks: tuple, block_size: int):
+def _parse_fragment_sequence_layout(
+    section_name: str, section: dict, num_filler_blocks: tuple, block_size: int, randomness, corpus
+):
     _reject_unknown_keys(section_name, section, _FRAGMENT_SEQUENCE_ALLOWED_KEYS, dynamic_ok=_is_file_definition_key)
     scenario = Scenario(section_name)
     files = dict()
     for key, value in section.items():
         if key.startswith('sizes file') or key.startswith('sizes_file'):
             file_number = int(key[10:])
-            files.setdefault(file_number, {'frags': None, 'path': None, 'sizes': None})
+            files.setdefault(file_number, {'frags': None, 'path': None, 'sizes': None, 'type': None})
             files[file_number]['sizes'] = _parse_sizes_value(key, value)
         elif key.startswith('frags_file') or key.startswith('frags file'):
             file_number = int(key[10:])
-            files.setdefault(file_number, {'frags': None, 'path': None, 'sizes': None})
+            files.setdefault(file_number, {'frags': None, 'path': None, 'sizes': None, 'type': None})
             files[file_number]['frags'] = int(value)
+        elif key.startswith('type file') or key.startswith('type_file'):
+            file_number = int(key[9:])
+            files.setdefault(file_number, {'frags': None, 'path': None, 'sizes': None, 'type': None})
+            files[file_number]['type'] = _parse_type_value(key, value)
         elif key.startswith('file'):
             file_number = int(key[4:])
-            files.setdefault(file_number, {'frags': None, 'path': None, 'sizes': None})
+            files.setdefault(file_number, {'frags': None, 'path': None, 'sizes': None, 'type': None})
             files[file_number]['path'] = value
     _assert_each_file_has_a_defined_num_of_frags(files, section_name)
-    file_fragments = _create_file_fragments(files, block_size)
+    file_fragments = _create_file_fragments(files, block_size, randomness, corpus)
     layout = _parse_layout_line(section['layout'])
 
     min_filler_blocks = _get_number_of_blocks(section, 'min') or num_filler_blocks[0]
@@ -373,13 +629,11 @@ def _parse_fragment_sequence_layout(section_name: str, section: dict, num_filler
             if fragment['size_blocks'] is not None:
                 size = fragment['size_blocks'] * block_size
             else:
-                size = _get_filler_fragment_size(min_filler_blocks, max_filler_blocks, block_size)
-            filler_cls = (
-                woodblock.fragments.RandomDataFragment
-                if fragment['type'] == 'random'
-                else woodblock.fragments.ZeroesFragment
-            )
-            scenario.add(filler_cls(size))
+                size = _get_filler_fragment_size(min_filler_blocks, max_filler_blocks, block_size, randomness)
+            if fragment['type'] == 'random':
+                scenario.add(woodblock.fragments.RandomDataFragment(size, randomness=randomness))
+            else:
+                scenario.add(woodblock.fragments.ZeroesFragment(size))
     return scenario
 
 
@@ -390,6 +644,13 @@ def _parse_sizes_value(key: str, value: str) -> list:
         raise ImageConfigError(f'"{key}" has to be a comma-separated list of integers.') from err
 
 
+def _parse_type_value(key: str, value: str) -> list:
+    file_types = [name.strip() for name in value.split(',') if name.strip()]
+    if not file_types:
+        raise ImageConfigError(f'"{key}" has to be a comma-separated list of file types.')
+    return file_types
+
+
 def _parse_frags_nums(section_name: str, section: dict) -> tuple:
     min_frags = _parse_positive_int(section, 'min frags', section_name, default=1)
     max_frags = _parse_positive_int(section, 'max frags', section_name, default=4)
@@ -410,45 +671,61 @@ def _parse_positive_int(section: dict, key: str, section_name: str, default: int
     return value
 
 
-def _get_filler_fragment_size(min_blocks: int, max_blocks: int, block_size: int) -> int:
-    return random.randint(min_blocks, max_blocks) * block_size  # nosec
+def _get_filler_fragment_size(min_blocks: int, max_blocks: int, block_size: int, randomness) -> int:
+    return randomness.randint(min_blocks, max_blocks) * block_size
 
 
-def _create_file_fragments(files, block_size):
+def _create_file_fragments(files, block_size, randomness, corpus):
     fragments = {}
     for file_num in files:
         num_frags = files[file_num]['frags']
         file_path = files[file_num]['path']
         sizes = files[file_num]['sizes']
+        file_type = files[file_num]['type']
+        if file_type is not None and file_path is not None and not corpus.resolve(file_path).is_dir():
+            raise ImageConfigError(f'"type file{file_num}" cannot be combined with the file "{file_path}".')
         if sizes is not None:
-            frags = _fragment_with_explicit_sizes(file_num, file_path, sizes, num_frags, block_size)
+            frags = _fragment_with_explicit_sizes(
+                file_num, file_path, sizes, num_frags, block_size, randomness, corpus, file_type
+            )
         elif file_path is not None:
-            if (woodblock.file.get_corpus() / file_path).is_dir():
+            if corpus.resolve(file_path).is_dir():
                 frags = woodblock.file.draw_fragmented_files(
                     file_path,
                     number_of_files=1,
                     block_size=block_size,
                     min_fragments=num_frags,
                     max_fragments=num_frags,
+                    randomness=randomness,
+                    corpus=corpus,
+                    file_type=file_type,
                 )[0]
             else:
-                frags = woodblock.file.File(file_path).fragment_randomly(num_fragments=num_frags, block_size=block_size)
+                frags = woodblock.file.File(file_path, corpus).fragment_randomly(
+                    num_fragments=num_frags, block_size=block_size, randomness=randomness
+                )
         else:
             frags = woodblock.file.draw_fragmented_files(
-                number_of_files=1, block_size=block_size, min_fragments=num_frags, max_fragments=num_frags
+                number_of_files=1,
+                block_size=block_size,
+                min_fragments=num_frags,
+                max_fragments=num_frags,
+                randomness=randomness,
+                corpus=corpus,
+                file_type=file_type,
             )[0]
         fragments[file_num] = {i + 1: f for i, f in enumerate(frags)}
     return fragments
 
 
-def _fragment_with_explicit_sizes(file_num, file_path, sizes, num_frags, block_size):
+def _fragment_with_explicit_sizes(file_num, file_path, sizes, num_frags, block_size, randomness, corpus, file_type):
     if any(not isinstance(size, int) or size < 1 for size in sizes):
         raise ImageConfigError(f'All values of "sizes file{file_num}" have to be integers >= 1.')
     if num_frags is not None and num_frags != len(sizes):
         raise ImageConfigError(
             f'"frags file{file_num}" ({num_frags}) does not match the number of "sizes file{file_num}" ({len(sizes)}).'
         )
-    file = _select_file_for_explicit_sizes(file_path, sizes, block_size)
+    file = _select_file_for_explicit_sizes(file_path, sizes, block_size, randomness, corpus, file_type)
     points = list(itertools.accumulate(sizes[:-1]))
     file_tail = file.max_fragments(block_size) - (points[-1] if points else 0)
     if sizes[-1] != file_tail:
@@ -462,13 +739,13 @@ def _fragment_with_explicit_sizes(file_num, file_path, sizes, num_frags, block_s
         raise ImageConfigError(f'Invalid "sizes file{file_num}": {err}') from err
 
 
-def _select_file_for_explicit_sizes(file_path, sizes, block_size):
+def _select_file_for_explicit_sizes(file_path, sizes, block_size, randomness, corpus, file_type):
     min_size = sum(sizes) * block_size
-    if file_path is None:
-        return woodblock.file.draw_files(number_of_files=1, min_size=min_size)[0]
-    if (woodblock.file.get_corpus() / file_path).is_dir():
-        return woodblock.file.draw_files(file_path, number_of_files=1, min_size=min_size)[0]
-    return woodblock.file.File(file_path)
+    if file_path is None or corpus.resolve(file_path).is_dir():
+        return woodblock.file.draw_files(
+            file_path, number_of_files=1, min_size=min_size, randomness=randomness, corpus=corpus, file_type=file_type
+        )[0]
+    return woodblock.file.File(file_path, corpus)
 
 
 def _assert_each_file_has_a_defined_num_of_frags(files, section):
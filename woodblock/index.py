@@ -0,0 +1,291 @@
+"""This module contains the persistent corpus index.
+
+The corpus index lists all files of a corpus together with their sizes, modification times and (once computed) their
+hashes and types, so that the corpus does not have to be walked for every image. The index is an SQLite file with the
+following tables:
+
+``meta``
+    Key/value pairs describing the index (``version``).
+``directories``
+    All directories of the corpus (``path`` relative to the corpus, ``''`` for the corpus itself) and their
+    modification times (``mtime_ns``) at the time they were listed.
+``files``
+    One row per file with its ``path`` relative to the corpus, its ``directory``, ``size``, ``mtime_ns``, ``sha256``
+    and ``type`` (see :mod:`woodblock.filetypes`). The hash and the type are ``NULL`` until the file is hashed.
+
+The index is refreshed incrementally: only directories whose modification time changed are listed again. Adding,
+removing or renaming a file changes the modification time of its directory, modifying a file in place does not. Call
+:meth:`CorpusIndex.rebuild` after files have been modified in place.
+"""
+
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from stat import S_ISDIR
+
+import woodblock.filetypes
+import woodblock.utils
+
+_VERSION = 2
+
+_HASH_CHUNK_SIZE = 1048576
+_COMMIT_INTERVAL = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT,
+    type TEXT
+);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+"""
+
+
+class CorpusIndex:
+    """A persistent index of the files of a corpus.
+
+    An existing index at ``path`` is reused. It is created if it does not exist or was written by an incompatible
+    version. An index can be used by several threads.
+
+    Args:
+        path: The path of the index file.
+        corpus_path: The path of the corpus directory.
+    """
+
+    def __init__(self, path, corpus_path):
+        self._path = pathlib.Path(path)
+        self._root = pathlib.Path(corpus_path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        version = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        outdated = version is None or version[0] != str(_VERSION)
+        if outdated:
+            # The tables of other versions may have different columns.
+            self._db.execute('DROP TABLE IF EXISTS files')
+            self._db.execute('DROP TABLE IF EXISTS directories')
+        self._db.executescript(_SCHEMA)
+        if outdated:
+            self._clear()
+
+    @property
+    def path(self) -> pathlib.Path:
+        """Return the path of the index file."""
+        return self._path
+
+    def refresh(self, workers: int | None = None) -> int:
+        """Update the index to the current state of the corpus directory.
+
+        The directories are checked and listed concurrently (see :func:`woodblock.utils.scan_files`).
+
+        Args:
+            workers: The number of threads checking and listing directories.
+
+        Returns:
+            The number of directories which were listed again.
+        """
+        with self._lock:
+            known = dict(self._db.execute('SELECT path, mtime_ns FROM directories'))
+            subdirectories = {}
+            for directory in known:
+                if directory:
+                    subdirectories.setdefault(directory.rpartition('/')[0], []).append(directory)
+            seen = set()
+            listed = 0
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = {executor.submit(self._check_directory, '', known)}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        directory, mtime_ns, listing = future.result()
+                        if directory is None:
+                            continue
+                        seen.add(directory)
+                        if listing is None:
+                            children = subdirectories.get(directory, ())
+                        else:
+                            children, files = listing
+                            self._replace_files(directory, mtime_ns, files)
+                            listed += 1
+                        pending.update(executor.submit(self._check_directory, child, known) for child in children)
+            removed = [(directory,) for directory in known.keys() - seen]
+            self._db.executemany('DELETE FROM files WHERE directory = ?', removed)
+            self._db.executemany('DELETE FROM directories WHERE path = ?', removed)
+            self._db.commit()
+        return listed
+
+    def rebuild(self):
+        """List the whole corpus again."""
+        with self._lock:
+            self._clear()
+        self.refresh()
+
+    def files(self) -> list:
+        """Return ``(path, size)`` of all files of the corpus, with ``path`` relative to the corpus.
+
+        The files are sorted like ``pathlib`` paths, i.e. by their path components.
+        """
+        with self._lock:
+            files = self._db.execute('SELECT path, size FROM files').fetchall()
+        files.sort(key=lambda file: file[0].split('/'))
+        return files
+
+    def get_hash(self, path: str, size: int, mtime_ns: int) -> str | None:
+        """Return the recorded SHA-256 hash of the file at ``path`` or ``None`` if it is unknown or outdated.
+
+        Args:
+            path: The path of the file relative to the corpus.
+            size: The current size of the file.
+            mtime_ns: The current modification time of the file.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT sha256 FROM files WHERE path = ? AND size = ? AND mtime_ns = ?', (path, size, mtime_ns)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def set_hash(self, path: str, size: int, mtime_ns: int, sha256: str):
+        """Record the SHA-256 hash of the file at ``path`` if the index lists it with ``size`` and ``mtime_ns``."""
+        with self._lock:
+            self._db.execute(
+                'UPDATE files SET sha256 = ? WHERE path = ? AND size = ? AND mtime_ns = ?',
+                (sha256, path, size, mtime_ns),
+            )
+            self._db.commit()
+
+    def unhashed(self) -> list:
+        """Return ``(path, size)`` of all files whose hash or type is not recorded yet."""
+        with self._lock:
+            return self._db.execute('SELECT path, size FROM files WHERE sha256 IS NULL OR type IS NULL').fetchall()
+
+    def hash_files(self, workers: int | None = None, hash_cache=None, progress=None) -> int:
+        """Hash all files whose hash or type is not recorded yet and record their hashes and types.
+
+        The files are hashed concurrently. ``hashlib`` releases the GIL while hashing large buffers, so the threads
+        run in parallel. Files modified since the index was refreshed are skipped.
+
+        Args:
+            workers: The number of hashing threads.
+            hash_cache: A :class:`woodblock.hashcache.HashCache` to take known hashes from and to record new ones in.
+            progress: A callable which is called with the path and the size of each file after it is hashed.
+
+        Returns:
+            The number of files hashed.
+        """
+        with self._lock:
+            pending = self._db.execute(
+                'SELECT path, size, mtime_ns FROM files WHERE sha256 IS NULL OR type IS NULL'
+            ).fetchall()
+        hashed = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda entry: self._hash_file(entry, hash_cache), pending)
+            for (path, size, mtime_ns), result in zip(pending, results, strict=True):
+                if result is not None:
+                    with self._lock:
+                        self._db.execute(
+                            'UPDATE files SET sha256 = ?, type = ? WHERE path = ? AND size = ? AND mtime_ns = ?',
+                            (*result, path, size, mtime_ns),
+                        )
+                        hashed += 1
+                        if hashed % _COMMIT_INTERVAL == 0:
+                            self._db.commit()
+                if progress is not None:
+                    progress(path, size)
+        with self._lock:
+            self._db.commit()
+        return hashed
+
+    def types(self) -> dict:
+        """Return a dictionary mapping the paths (relative to the corpus) of all files to their recorded types.
+
+        Files whose type is not recorded yet are missing.
+        """
+        with self._lock:
+            return dict(self._db.execute('SELECT path, type FROM files WHERE type IS NOT NULL'))
+
+    def get_type(self, path: str) -> str | None:
+        """Return the recorded type of the file at ``path`` or ``None`` if it is unknown.
+
+        Args:
+            path: The path of the file relative to the corpus.
+        """
+        with self._lock:
+            row = self._db.execute('SELECT type FROM files WHERE path = ?', (path,)).fetchone()
+        return None if row is None else row[0]
+
+    def close(self):
+        """Close the index."""
+        self._db.close()
+
+    def _clear(self):
+        self._db.execute('DELETE FROM files')
+        self._db.execute('DELETE FROM directories')
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(_VERSION),))
+        self._db.commit()
+
+    def _check_directory(self, directory: str, known: dict) -> tuple:
+        """Return the directory, its modification time and its listing if it changed (``None`` otherwise).
+
+        The directory is ``None`` if it does not exist (anymore).
+        """
+        try:
+            info = os.stat(self._root / directory)
+        except OSError:
+            return None, None, None
+        if not S_ISDIR(info.st_mode):
+            return None, None, None
+        if known.get(directory) == info.st_mtime_ns:
+            return directory, info.st_mtime_ns, None
+        return directory, info.st_mtime_ns, woodblock.utils.list_directory(self._root, directory)
+
+    def _hash_file(self, entry: tuple, hash_cache):
+        """Return the hash and the type of a file or ``None`` if it was modified since the index was refreshed."""
+        path, size, mtime_ns = entry
+        full_path = self._root / path
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return None
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            return None
+        key = woodblock.utils.file_key(stat)
+        sha256 = None if hash_cache is None else hash_cache.get_file(key)
+        if sha256 is not None:
+            return sha256, woodblock.filetypes.get_file_type(full_path)
+        hasher = hashlib.sha256()
+        with open(full_path, 'rb') as file_handle:
+            chunk = file_handle.read(_HASH_CHUNK_SIZE)
+            file_type = woodblock.filetypes.detect_file_type(chunk[: woodblock.filetypes.HEADER_SIZE])
+            while chunk:
+                hasher.update(chunk)
+                chunk = file_handle.read(_HASH_CHUNK_SIZE)
+        sha256 = hasher.hexdigest()
+        if hash_cache is not None:
+            hash_cache.set_file(key, sha256)
+        return sha256, file_type
+
+    def _replace_files(self, directory: str, mtime_ns: int, files: list):
+        """Replace the entries of the files in ``directory``."""
+        known = {
+            path: (size, file_mtime_ns, sha256, file_type)
+            for path, size, file_mtime_ns, sha256, file_type in self._db.execute(
+                'SELECT path, size, mtime_ns, sha256, type FROM files WHERE directory = ?', (directory,)
+            )
+        }
+        rows = []
+        for path, size, file_mtime_ns in files:
+            entry = known.get(path)
+            # The hash and type of a file stay valid as long as its size and modification time do not change.
+            sha256, file_type = entry[2:] if entry is not None and entry[:2] == (size, file_mtime_ns) else (None, None)
+            rows.append((path, directory, size, file_mtime_ns, sha256, file_type))
+        self._db.execute('DELETE FROM files WHERE directory = ?', (directory,))
+        self._db.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)', rows)
+        self._db.execute('INSERT OR REPLACE INTO directories VALUES (?, ?)', (directory, mtime_ns))
@@ -0,0 +1,133 @@
+"""This module contains the write journal used to resume the generation of an image.
+
+The journal is a JSON lines file stored next to the image. Its first line describes the image layout, every following
+line is a checkpoint recording the number of bytes durably written to the image and the hashes of the fragments
+completed since the previous checkpoint.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+
+from woodblock.errors import WoodblockError
+
+#: Default number of bytes written to the image between two checkpoints.
+DEFAULT_CHECKPOINT_INTERVAL = 256 * 1024 * 1024
+
+_VERSION = 1
+
+
+class Journal:
+    """The write journal of an image.
+
+    Args:
+        path: The path of the journal file.
+        fingerprint: A digest of the image layout. A journal can only be used to resume an image with the same
+            fingerprint.
+    """
+
+    def __init__(self, path: pathlib.Path, fingerprint: str):
+        self._path = pathlib.Path(path)
+        self._fingerprint = fingerprint
+        self._handle = None
+
+    @property
+    def path(self) -> pathlib.Path:
+        """Return the path of the journal file."""
+        return self._path
+
+    def checkpoints(self) -> list:
+        """Return the checkpoints recorded in the journal file.
+
+        Each checkpoint is a ``dict`` with the keys ``offset`` (the number of image bytes written) and ``fragments``
+        (a list of ``[region index, sha256]`` pairs of the fragments completed since the previous checkpoint). An
+        incomplete last line, e.g. caused by a crash while writing the checkpoint, is ignored.
+
+        Raises:
+            WoodblockError: If the journal belongs to an image with a different layout.
+        """
+        if not self._path.exists():
+            return []
+        with self._path.open('r') as handle:
+            lines = handle.read().splitlines()
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+        if not records:
+            return []
+        header = records[0]
+        if header.get('version') != _VERSION or header.get('fingerprint') != self._fingerprint:
+            raise WoodblockError(
+                f'The journal "{self._path}" belongs to a different image. '
+                'Remove it in order to generate the image from scratch.'
+            )
+        return records[1:]
+
+    def open(self, append: bool):
+        """Open the journal file for writing.
+
+        An incomplete last line of an existing journal is removed before appending, so that the new checkpoints start
+        on a line of their own.
+
+        Args:
+            append: Append to the existing journal instead of starting a new one.
+        """
+        if append:
+            self._truncate_incomplete_line()
+            self._handle = self._path.open('a')
+            return
+        self._handle = self._path.open('w')
+        self._append({'version': _VERSION, 'fingerprint': self._fingerprint})
+
+    def checkpoint(self, offset: int, fragments: list):
+        """Durably record a checkpoint.
+
+        The image data up to ``offset`` has to be durable before calling this method.
+
+        Args:
+            offset: The number of image bytes written.
+            fragments: The ``(region index, sha256)`` pairs of the fragments completed since the last checkpoint.
+        """
+        self._append({'offset': offset, 'fragments': [list(fragment) for fragment in fragments]})
+
+    def close(self):
+        """Close the journal file."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def remove(self):
+        """Close and delete the journal file."""
+        self.close()
+        self._path.unlink(missing_ok=True)
+
+    def _truncate_incomplete_line(self):
+        """Truncate the journal file after its last complete record, i.e. the records read by :meth:`checkpoints`."""
+        with self._path.open('r+b') as handle:
+            data = handle.read()
+            end = 0
+            for line in data.splitlines(keepends=True):
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                end += len(line)
+            handle.truncate(end)
+            if end and not data[:end].endswith(b'\n'):
+                # The last record is complete, but the crash happened before its line break was written.
+                handle.seek(end)
+                handle.write(b'\n')
+
+    def _append(self, record: dict):
+        self._handle.write(json.dumps(record) + '\n')
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+
+def fingerprint(layout) -> str:
+    """Return the SHA-256 digest of the JSON-serializable image ``layout``."""
+    return hashlib.sha256(json.dumps(layout, sort_keys=True).encode()).hexdigest()
@@ -0,0 +1,398 @@
+"""This module contains the output layer used to write images.
+
+The output classes hide how the image data actually gets to the target, e.g. whether data is coalesced and written with
+scatter-gather I/O, whether zero regions are written or skipped, and whether fragments of corpus files are copied in
+kernel space.
+"""
+
+import collections
+import itertools
+import mmap
+import os
+import pathlib
+import stat
+
+import woodblock.datagen
+
+#: Default size (in bytes) of the batches in which image data is written.
+DEFAULT_BUFFER_SIZE = 4 * 1024 * 1024
+
+_ZEROES = bytes(1024 * 1024)
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, OSError, ValueError):
+    _IOV_MAX = 1024
+
+
+class Output:
+    """Sequential output of image data to a file-like object.
+
+    ``Output`` coalesces the written data into batches of ``buffer_size`` bytes. If the target has a file descriptor,
+    each batch is written with a single ``os.writev`` call, bypassing the buffer of the file object. Otherwise, the
+    batch is joined and passed to ``target.write``.
+
+    Call :meth:`close` when all data has been written. This does not close ``target``.
+
+    Args:
+        target: A ``.write()``-supporting file-like object.
+        buffer_size: The batch size in bytes. With a size of 0, every write is passed to the target immediately.
+        sparse: If set and ``target`` is a seekable regular file, zero regions are skipped instead of being written.
+        hashers: ``hashlib`` hash objects which are updated with all data written (including skipped zero regions).
+        observers: Objects whose ``update(offset, data, fragment)`` method is called with every chunk of fragment data
+            and its image offset (see :class:`woodblock.hashdb.HashDatabase`).
+        offset: The image offset of the first byte written to this output.
+    """
+
+    def __init__(
+        self,
+        target,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        sparse: bool = False,
+        hashers=(),
+        observers=(),
+        offset: int = 0,
+    ):
+        self._target = target
+        self._buffer_size = buffer_size
+        self._buffer = []
+        self._buffered = 0
+        self._hashers = tuple(hashers)
+        self._observers = tuple(observers)
+        self._offset = offset
+        self._fd = file_descriptor(target)
+        self._seekable = self._fd is not None and regular_file_descriptor(target) is not None
+        self._sparse = sparse and self._seekable
+        if self._fd is not None:
+            # Data is written to the file descriptor directly, so nothing may remain in the buffer of the file object.
+            target.flush()
+
+    def write(self, data):
+        """Write ``data``."""
+        if not data:
+            return
+        for hasher in self._hashers:
+            hasher.update(data)
+        self._offset += len(data)
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self._buffer_size:
+            self.flush()
+
+    def write_zeroes(self, size: int):
+        """Write ``size`` zero bytes, or skip them if this is a sparse output."""
+        if not self._sparse:
+            zeroes = memoryview(_ZEROES)
+            while size > 0:
+                self.write(zeroes[: min(size, len(zeroes))])
+                size -= len(zeroes)
+            return
+        self.flush()
+        os.lseek(self._fd, size, os.SEEK_CUR)
+        self._offset += size
+        for hasher in self._hashers:
+            _update_with_zeroes(hasher, size)
+
+    def write_fragment(self, fragment):
+        """Write the data of ``fragment``.
+
+        Fragments supporting it are copied in kernel space (see :meth:`woodblock.fragments.FileFragment.copy_to`) if
+        the target has a file descriptor and neither digests are computed nor observers are registered. All other
+        fragments are iterated and their chunks are written.
+        """
+        if self._fd is not None and not self._hashers and not self._observers and hasattr(fragment, 'copy_to'):
+            self.flush()
+            fragment.copy_to(self._fd)
+            self._offset += fragment.size
+            return
+        for chunk in fragment:
+            for observer in self._observers:
+                observer.update(self._offset, chunk, fragment)
+            self.write(chunk)
+
+    def flush(self):
+        """Write all buffered data to the target."""
+        if not self._buffer:
+            return
+        if self._fd is None:
+            self._target.write(b''.join(self._buffer))
+        else:
+            write_vectored(self._fd, self._buffer)
+        self._buffer = []
+        self._buffered = 0
+
+    def sync(self):
+        """Flush the buffered data and make everything written so far durable.
+
+        This requires ``target`` to be a regular file.
+        """
+        self.flush()
+        if self._sparse:
+            extend_file(self._fd, os.lseek(self._fd, 0, os.SEEK_CUR))
+        os.fsync(self._fd)
+
+    def close(self):
+        """Flush the buffered data and synchronize the position of the target."""
+        self.flush()
+        if self._seekable:
+            position = os.lseek(self._fd, 0, os.SEEK_CUR)
+            if self._sparse:
+                # Skipping a trailing zero region does not extend the file, so set its final size explicitly.
+                extend_file(self._fd, position)
+            self._target.seek(position)
+
+
+class PositionalOutput:
+    """Output writing image data to given offsets of a regular file.
+
+    All offsets are relative to the position of ``target`` when the output is created. The image file is preallocated
+    and data can be written to it from several threads concurrently. Call :meth:`close` when all data has been written
+    in order to move the position of ``target`` to the end of the image. This does not close ``target``.
+
+    Args:
+        target: A seekable regular file object.
+        size: The size of the image in bytes.
+        buffer_size: The size of the batches in which fragment chunks are written with ``os.pwritev``.
+        sparse: If set, the image file is not preallocated so that unwritten regions remain holes.
+    """
+
+    def __init__(self, target, size: int, buffer_size: int = DEFAULT_BUFFER_SIZE, sparse: bool = False):
+        target.flush()
+        self._target = target
+        self._fd = target.fileno()
+        self._base = target.tell()
+        self._size = size
+        self._buffer_size = buffer_size
+        if sparse:
+            # Allocating the blocks would defeat the purpose of a sparse image. Setting the size creates a single hole
+            # which is then filled with the non-zero regions.
+            extend_file(self._fd, self._base + size)
+        else:
+            preallocate(self._fd, self._base, size)
+
+    def write_at(self, offset: int, data):
+        """Write ``data`` at ``offset``."""
+        write_vectored(self._fd, [data], self._base + offset)
+
+    def generate_at(self, offset: int, size: int, generator):
+        """Write ``size`` bytes produced by the data generator ``generator`` at ``offset``.
+
+        The data is generated in chunks (see :func:`woodblock.datagen.chunk_sizes`).
+        """
+        for chunk_size in woodblock.datagen.chunk_sizes(size, woodblock.datagen.PADDING_CHUNK_SIZE):
+            self.write_at(offset, generator(chunk_size))
+            offset += chunk_size
+
+    def write_fragment_at(self, offset: int, fragment):
+        """Write the data of ``fragment`` at ``offset``."""
+        batch = []
+        batch_size = 0
+        for chunk in fragment:
+            batch.append(chunk)
+            batch_size += len(chunk)
+            if batch_size >= self._buffer_size:
+                write_vectored(self._fd, batch, self._base + offset)
+                offset += batch_size
+                batch = []
+                batch_size = 0
+        write_vectored(self._fd, batch, self._base + offset)
+
+    def close(self):
+        """Move the position of the target to the end of the image."""
+        self._target.seek(self._base + self._size)
+
+
+class MappedOutput:
+    """Output filling a memory map of a regular file with image data.
+
+    The image file is preallocated (or extended if ``sparse`` is set) and mapped into memory. Fragments supporting it
+    (see :meth:`woodblock.fragments.FileFragment.readinto`) read or generate their data directly into the map, so the
+    data is not copied from Python to the kernel chunk by chunk. Like :class:`PositionalOutput`, all offsets are
+    relative to the position of ``target`` when the output is created, and distinct regions can be written from
+    several threads concurrently. Call :meth:`close` when all data has been written in order to unmap the file and
+    move the position of ``target`` to the end of the image. This does not close ``target``.
+
+    Args:
+        target: A seekable regular file object opened for reading and writing.
+        size: The size of the image in bytes.
+        buffer_size: Unused. It exists so that ``MappedOutput`` can be used in place of :class:`PositionalOutput`.
+        sparse: If set, the image file is not preallocated so that unwritten regions remain holes.
+    """
+
+    def __init__(self, target, size: int, buffer_size: int = DEFAULT_BUFFER_SIZE, sparse: bool = False):
+        target.flush()
+        self._target = target
+        fd = target.fileno()
+        self._base = target.tell()
+        self._size = size
+        if sparse:
+            extend_file(fd, self._base + size)
+        else:
+            preallocate(fd, self._base, size)
+        self._map = None
+        self._view = memoryview(b'')
+        if size > 0:
+            # The offset of a mapping has to be a multiple of the allocation granularity.
+            map_offset = self._base - self._base % mmap.ALLOCATIONGRANULARITY
+            self._map = mmap.mmap(fd, self._base + size - map_offset, offset=map_offset)
+            self._view = memoryview(self._map)[self._base - map_offset :]
+
+    def write_at(self, offset: int, data):
+        """Write ``data`` at ``offset``."""
+        self._view[offset : offset + len(data)] = data
+
+    def generate_at(self, offset: int, size: int, generator):
+        """Let the data generator ``generator`` fill ``size`` bytes at ``offset``.
+
+        Generators having a ``fill`` method (e.g. :class:`woodblock.datagen.Random`) write to the map in place. The
+        data is generated in chunks (see :func:`woodblock.datagen.chunk_sizes`).
+        """
+        for chunk_size in woodblock.datagen.chunk_sizes(size, woodblock.datagen.PADDING_CHUNK_SIZE):
+            if hasattr(generator, 'fill'):
+                generator.fill(self._view[offset : offset + chunk_size])
+            else:
+                self.write_at(offset, generator(chunk_size))
+            offset += chunk_size
+
+    def write_fragment_at(self, offset: int, fragment):
+        """Write the data of ``fragment`` at ``offset``."""
+        region = self._view[offset : offset + fragment.size]
+        if hasattr(fragment, 'readinto'):
+            fragment.readinto(region)
+            return
+        for chunk in fragment:
+            region[: len(chunk)] = chunk
+            region = region[len(chunk) :]
+
+    def close(self):
+        """Unmap the image file and move the position of the target to the end of the image."""
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+        self._target.seek(self._base + self._size)
+
+
+class SegmentedFile:
+    """A write-only file-like object splitting the written data into numbered segment files.
+
+    The segment files are named like ``path`` with ".001", ".002" and so on appended. Every segment but the last one
+    is ``segment_size`` bytes large. A segment file is only created when data is written to it, but at least one
+    segment is created. Call :meth:`close` when all data has been written.
+
+    Args:
+        path: The base path of the segment files.
+        segment_size: The (maximal) size of each segment in bytes.
+    """
+
+    def __init__(self, path, segment_size: int):
+        self._path = pathlib.Path(path)
+        self._segment_size = segment_size
+        self._paths = []
+        self._handle = None
+        self._remaining = 0
+
+    @property
+    def paths(self) -> list:
+        """Return the paths of the segment files created so far."""
+        return list(self._paths)
+
+    def writable(self):
+        """Return ``True``."""
+        return True
+
+    def write(self, data):
+        """Write ``data`` and return the number of bytes written."""
+        view = memoryview(data)
+        while len(view) > 0:
+            if self._remaining == 0:
+                self._next_segment()
+            written = self._handle.write(view[: self._remaining])
+            self._remaining -= written
+            view = view[written:]
+        return len(data)
+
+    def flush(self):
+        """Flush the current segment file."""
+        if self._handle is not None:
+            self._handle.flush()
+
+    def close(self):
+        """Close the current segment file."""
+        if not self._paths:
+            self._next_segment()
+        self._handle.close()
+
+    def _next_segment(self):
+        if self._handle is not None:
+            self._handle.close()
+        path = self._path.with_name(f'{self._path.name}.{len(self._paths) + 1:03d}')
+        self._handle = path.open('wb')
+        self._paths.append(path)
+        self._remaining = self._segment_size
+
+
+def file_descriptor(target):
+    """Return the file descriptor of ``target`` or ``None`` if it has none."""
+    try:
+        return target.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def regular_file_descriptor(target):
+    """Return the file descriptor of ``target`` if it is a seekable regular file and ``None`` otherwise."""
+    fd = file_descriptor(target)
+    if fd is None or not stat.S_ISREG(os.fstat(fd).st_mode) or not target.seekable():
+        return None
+    return fd
+
+
+def write_vectored(fd: int, buffers, offset: int | None = None):
+    """Write all ``buffers`` to ``fd`` using as few system calls as possible.
+
+    The buffers are written with ``os.writev`` (or ``os.pwritev`` at ``offset`` if ``offset`` is given). Partial
+    writes are continued until all data has been written.
+
+    Args:
+        fd: The file descriptor to write to.
+        buffers: A sequence of bytes-like objects.
+        offset: If set, the data is written to this offset instead of the current position of ``fd``.
+    """
+    pending = collections.deque(b for b in buffers if len(b) > 0)
+    while pending:
+        batch = list(itertools.islice(pending, _IOV_MAX))
+        if offset is None:
+            written = os.writev(fd, batch)
+        else:
+            written = os.pwritev(fd, batch, offset)
+            offset += written
+        while written > 0:
+            if written >= len(pending[0]):
+                written -= len(pending.popleft())
+            else:
+                pending[0] = memoryview(pending[0])[written:]
+                written = 0
+
+
+def _update_with_zeroes(hasher, size: int):
+    zeroes = memoryview(_ZEROES)
+    while size > 0:
+        hasher.update(zeroes[: min(size, len(zeroes))])
+        size -= len(zeroes)
+
+
+def preallocate(fd: int, offset: int, size: int):
+    """Allocate ``size`` bytes starting at ``offset`` of the file ``fd``."""
+    if size < 1:
+        return
+    try:
+        os.posix_fallocate(fd, offset, size)
+    except (AttributeError, OSError):
+        # Not every platform and file system supports preallocation. Setting the file size is sufficient for
+        # writing the regions at their offsets.
+        extend_file(fd, offset + size)
+
+
+def extend_file(fd: int, size: int):
+    """Extend the file ``fd`` to ``size`` bytes if it is smaller. The new area will be a hole (on most file systems)."""
+    if os.fstat(fd).st_size < size:
+        os.ftruncate(fd, size)
@@ -4,22 +4,56 @@ import random
 
 import numpy as np
 
+#: The RNG backends producing the random bytes. ``mt19937`` is the legacy NumPy ``RandomState`` (Mersenne Twister).
+#: ``pcg64``, ``sfc64`` and ``philox`` are the respective NumPy bit generators.
+BACKENDS = ('mt19937', 'pcg64', 'sfc64', 'philox')
+
+#: The default RNG backend. Images generated with the default backend are identical to those of earlier versions.
+DEFAULT_BACKEND = 'mt19937'
+
+#: The version of the derivation of the random bytes from the seed. It changes whenever a seed would produce different
+#: bytes using the same backend.
+RNG_VERSION = 1
+
+
+#: The ways random decisions are derived from the seed. With ``sequential`` seeding, all random decisions of an image
+#: are drawn one after another from a single stream, so every decision depends on all decisions made before it. With
+#: ``hierarchical`` seeding, every scenario (and the padding) draws from its own context whose seed is derived from the
+#: seed of the image using NumPy's ``SeedSequence``.
+SEEDINGS = ('sequential', 'hierarchical')
+
 
 class Randomness:
-    """This class acts as the main random number generator.
+    """A context for random decisions and the seeds of random data.
 
-    ``Randomness`` seeds Python's core ``random`` module so that the user doesn't have to do this. Every
-    :class:`RandomBytes` / :class:`woodblock.datagen.Random` generator derives its own seed from this seeded
-    ``random`` module and keeps it in a private NumPy ``RandomState``; reproducibility therefore flows entirely
-    through Python's ``random``. NumPy's *global* RNG is intentionally **not** seeded, because no data-generation
-    path uses it (the only NumPy call outside per-instance ``RandomState``s is the deterministic ``np.array_split``).
+    All random decisions (e.g. drawing files, fragmentation points or filler sizes) are drawn from the Python
+    ``random.Random`` generator of a context, and every :class:`woodblock.datagen.Random` generator draws its own seed
+    from it. Hence, everything random is reproducible from the seed of the context. NumPy's *global* RNG is
+    intentionally **not** seeded, because no data-generation path uses it (the only NumPy call outside per-instance
+    RNGs is the deterministic ``np.array_split``).
 
-    If no seed is set by the user, the seed will be randomly generated.
+    The functions of this module (e.g. :func:`seed`) operate on the global context, which draws from Python's core
+    ``random`` module and is used by all functions and classes not given a context explicitly. Independent contexts
+    can be created and passed as ``randomness`` argument, so that images generated concurrently do not interfere.
+
+    Args:
+        random_seed: The seed. If it is not set, the seed will be randomly generated.
+        backend: The RNG backend of the random data (see :data:`BACKENDS`).
+        seeding: How the contexts of scenarios are derived (see :data:`SEEDINGS` and :meth:`spawn`).
+        generator: The ``random.Random`` instance (or the ``random`` module) to draw from. Defaults to a new instance.
     """
 
-    def __init__(self):
-        self._seed = random.randint(0, 2**32 - 1)  # nosec
-        self.seed(self._seed)
+    def __init__(
+        self,
+        random_seed: int | None = None,
+        backend: str = DEFAULT_BACKEND,
+        seeding: str = 'sequential',
+        generator=None,
+    ):
+        self._random = random.Random() if generator is None else generator  # nosec
+        self.set_backend(backend)
+        self.set_seeding(seeding)
+        self.seed(self._random.randint(0, 2**32 - 1) if random_seed is None else random_seed)  # nosec
 
     def seed(self, random_seed: int):
         """Set the seed.
@@ -36,28 +70,135 @@ class Randomness:
         if not 0 <= random_seed < 2**32:
             raise ValueError(f'Seed must be an integer in [0, 2**32), got {random_seed}.')
         self._seed = random_seed
-        # Only Python's global ``random`` is seeded. Each RandomBytes/Random generator draws its own seed from it
-        # and keeps a private NumPy RandomState, so seeding NumPy's global RNG would change nothing. (np.array_split,
-        # the only other NumPy use, is deterministic.)
-        random.seed(self._seed)
+        # Only the Python generator of the context is seeded. Each RandomBytes/Random generator draws its own seed
+        # from it and keeps a private NumPy RNG, so seeding NumPy's global RNG would change nothing.
+        self._random.seed(self._seed)
 
     def get_seed(self) -> int:
         """Return the random seed."""
         return self._seed
 
+    def set_backend(self, backend: str):
+        """Set the RNG backend used by :class:`RandomBytes` generators created from now on.
+
+        Args:
+            backend: The name of the backend, i.e. one of :data:`BACKENDS`.
+
+        Raises:
+            ValueError: If ``backend`` is not a supported backend.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f'Unsupported RNG backend: {backend!r}. Use one of {", ".join(BACKENDS)}.')
+        self._backend = backend
+
+    def get_backend(self) -> str:
+        """Return the name of the RNG backend."""
+        return self._backend
+
+    def set_seeding(self, seeding: str):
+        """Set how the contexts of scenarios are derived from this context.
+
+        Args:
+            seeding: One of :data:`SEEDINGS`.
+
+        Raises:
+            ValueError: If ``seeding`` is not supported.
+        """
+        if seeding not in SEEDINGS:
+            raise ValueError(f'Unsupported seeding: {seeding!r}. Use one of {", ".join(SEEDINGS)}.')
+        self._seeding = seeding
+
+    def get_seeding(self) -> str:
+        """Return how the contexts of scenarios are derived from this context."""
+        return self._seeding
 
-_RANDOM = Randomness()
+    def get_info(self) -> dict:
+        """Return a description of the RNG backend and the seeding suitable for the image metadata."""
+        return {'backend': self._backend, 'version': RNG_VERSION, 'numpy': np.__version__, 'seeding': self._seeding}
+
+    def spawn(self, key: int):
+        """Return the context for the part ``key`` (e.g. a scenario) of whatever this context generates.
+
+        With ``sequential`` seeding, this is the context itself, i.e. all parts draw from the same stream in the order
+        they are created. With ``hierarchical`` seeding, this is an independent context whose seed is derived from the
+        seed of this context and ``key`` using NumPy's ``SeedSequence``. Its draws neither depend on nor affect the
+        draws of other contexts, so the parts can be created in any order and concurrently.
+
+        Args:
+            key: A non-negative integer identifying the part.
+        """
+        if self._seeding == 'sequential':
+            return self
+        sequence = np.random.SeedSequence(self._seed, spawn_key=(key,))
+        return Randomness(int(sequence.generate_state(1)[0]), self._backend, self._seeding)
+
+    def randint(self, a: int, b: int) -> int:
+        """Return a random integer ``n`` with ``a <= n <= b``."""
+        return self._random.randint(a, b)  # nosec
+
+    def random(self) -> float:
+        """Return a random float ``x`` with ``0 <= x < 1``."""
+        return self._random.random()  # nosec
+
+    def sample(self, population, k: int) -> list:
+        """Return ``k`` unique elements chosen from ``population``."""
+        return self._random.sample(population, k=k)  # nosec
+
+    def choices(self, population, k: int) -> list:
+        """Return ``k`` elements chosen from ``population`` with replacement."""
+        return self._random.choices(population, k=k)  # nosec
+
+    def draw_seed(self) -> int:
+        """Return a random seed for a data generator."""
+        return self._random.randint(0, 2**32 - 1)  # nosec
+
+
+# The global context draws from Python's ``random`` module, like all earlier versions did.
+_RANDOM = Randomness(generator=random)
 
 seed = _RANDOM.seed
 
 get_seed = _RANDOM.get_seed
 
+set_backend = _RANDOM.set_backend
+
+get_backend = _RANDOM.get_backend
+
+get_info = _RANDOM.get_info
+
+
+def get_randomness() -> Randomness:
+    """Return the global :class:`Randomness` context."""
+    return _RANDOM
+
 
 class RandomBytes:
-    """This class can be used to generate random bytes."""
+    """This class can be used to generate random bytes.
 
-    def __init__(self):
-        self._rng = np.random.RandomState()
+    The bytes are produced by one of the RNG :data:`BACKENDS`. The legacy ``mt19937`` backend is the default, since
+    it reproduces the images of earlier versions. It continues its stream seamlessly only after calls requesting a
+    multiple of 4 bytes, all other backends form a continuous stream regardless of the call sizes. The ``pcg64`` and
+    ``sfc64`` backends are considerably faster. The ``philox`` backend produces the stream of
+    :class:`SeekableRandomBytes`.
+
+    Args:
+        backend: The name of the backend. Defaults to the backend set using :func:`set_backend`.
+    """
+
+    def __init__(self, backend: str | None = None):
+        self._backend = backend or get_backend()
+        if self._backend not in BACKENDS:
+            raise ValueError(f'Unsupported RNG backend: {self._backend!r}. Use one of {", ".join(BACKENDS)}.')
+        if self._backend == 'mt19937':
+            self._rng = np.random.RandomState()
+        else:
+            # Like an unseeded RandomState, the other backends start from OS entropy until they are seeded.
+            self.seed(int(np.random.SeedSequence().entropy % 2**32))
+
+    @property
+    def backend(self) -> str:
+        """Return the name of the RNG backend."""
+        return self._backend
 
     def bytes(self, size: int):
         """Return ``size`` random bytes.
@@ -67,10 +208,102 @@ class RandomBytes:
         """
         return self._rng.bytes(size)
 
+    def fill(self, view):
+        """Fill the writable buffer ``view`` with random bytes.
+
+        The bytes are the same as the ones returned by ``bytes(len(view))``.
+
+        Args:
+            view: A writable bytes-like object, e.g. a ``memoryview`` of a memory-mapped file.
+        """
+        memoryview(view)[:] = self._rng.bytes(len(view))
+
     def seed(self, random_seed: int):
         """Set the seed for the RNG.
 
         Args:
             random_seed: The seed to use.
         """
+        if self._backend == 'mt19937':
+            self._rng.seed(random_seed)
+        elif self._backend == 'philox':
+            self._rng = _PhiloxStream(random_seed)
+        else:
+            self._rng = _RawStream(_BIT_GENERATORS[self._backend](random_seed))
+
+
+class SeekableRandomBytes:
+    """This class can be used to generate random bytes at arbitrary positions of a random byte stream.
+
+    The stream is produced by NumPy's counter-based ``Philox`` bit generator. Every 32 bytes of the stream are computed
+    directly from the key, i.e. the seed and the stream ID, and their position. Hence, the bytes at any position can be
+    generated without generating the bytes before them.
+    """
+
+    _BLOCK_SIZE = 32  # Philox4x64 produces four 64-bit words per counter value.
+
+    def __init__(self):
+        self._key = (0, 0)
+
+    def bytes_at(self, offset: int, size: int):
+        """Return the ``size`` bytes at position ``offset`` of the stream.
+
+        Args:
+            offset: The position in the stream.
+            size: The number of bytes to return.
+        """
+        if size <= 0:
+            return b''
+        block, skip = divmod(offset, self._BLOCK_SIZE)
+        words = -(-(skip + size) // 8)
+        bit_generator = np.random.Philox(counter=block, key=self._key)
+        return bit_generator.random_raw(words).astype('<u8', copy=False).tobytes()[skip : skip + size]
+
+    def seed(self, random_seed: int, stream: int = 0):
+        """Set the seed and the stream ID, which select the stream.
+
+        Args:
+            random_seed: The seed to use.
+            stream: The ID of the stream. Generators with the same seed but different stream IDs produce independent
+                streams.
+        """
+        self._key = (random_seed, stream)
+
+
+_BIT_GENERATORS = {'pcg64': np.random.PCG64, 'sfc64': np.random.SFC64}
+
+
+class _RawStream:
+    """The 64-bit outputs of a NumPy bit generator as a stream of little-endian bytes.
+
+    Reading the raw outputs is about twice as fast as ``numpy.random.Generator.bytes``. The bytes of a partially used
+    output are kept for the next call.
+    """
+
+    def __init__(self, bit_generator):
+        self._bit_generator = bit_generator
+        self._pending = b''
+
+    def bytes(self, size: int):
+        if size <= len(self._pending):
+            data, self._pending = self._pending[:size], self._pending[size:]
+            return data
+        needed = size - len(self._pending)
+        words = self._bit_generator.random_raw(-(-needed // 8)).astype('<u8', copy=False).tobytes()
+        data = self._pending + words[:needed] if self._pending or needed < len(words) else words
+        self._pending = words[needed:]
+        return data
+
+
+class _PhiloxStream:
+    """The stream of a :class:`SeekableRandomBytes` generator read from its start."""
+
+    def __init__(self, random_seed: int):
+        self._rng = SeekableRandomBytes()
         self._rng.seed(random_seed)
+        self._position = 0
+
+    def bytes(self, size: int):
+        data = self._rng.bytes_at(self._position, size)
+        self._position += size
+        return data
@@ -0,0 +1,219 @@
+"""This module contains the data structures for drawing corpus files efficiently.
+
+:class:`SizeIndex` finds the files within a size range in ``O(log n)`` and draws files from it without listing them.
+:class:`AliasTable` draws weighted samples in ``O(1)`` per draw using the alias method.
+"""
+
+import collections
+
+import numpy as np
+
+#: The number of size ranges for which a :class:`SizeIndex` keeps the data needed for drawing. The least recently used
+#: range is dropped first.
+MAX_CACHED_RANGES = 32
+
+
+class SizeIndex:
+    """The sizes of a list of files sorted for range queries.
+
+    The files keep their order, while their sizes are kept sorted, so that the files within a size range are found by
+    binary search (``np.searchsorted``) instead of by scanning all files.
+
+    Files are drawn from a size range without listing its files: the indices are drawn within the bounds of the range
+    and only the files drawn are looked up. The data needed for drawing from a range (see :meth:`draw` and
+    :meth:`draw_weighted`) is kept for the last ``max_cached_ranges`` ranges.
+
+    Args:
+        files: A sequence of ``(path, size)`` tuples.
+        max_cached_ranges: The number of size ranges whose drawing data is kept.
+    """
+
+    def __init__(self, files, max_cached_ranges: int = MAX_CACHED_RANGES):
+        self._paths = tuple(path for path, _ in files)
+        self._sizes = np.fromiter((size for _, size in files), dtype=np.int64, count=len(files))
+        # A stable sort keeps files of the same size in their original order.
+        self._order = np.argsort(self._sizes, kind='stable')
+        self._sorted_sizes = self._sizes[self._order]
+        self._max_cached_ranges = max_cached_ranges
+        self._cache = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._paths)
+
+    def count(self, min_size: int = 0, max_size: int | None = None) -> int:
+        """Return the number of files having at least ``min_size`` and at most ``max_size`` bytes.
+
+        Args:
+            min_size: Minimal file size.
+            max_size: Maximal file size. Defaults to no limit.
+        """
+        start, end = self._bounds(min_size, max_size)
+        return max(0, end - start)
+
+    def select(self, min_size: int = 0, max_size: int | None = None) -> tuple:
+        """Return the paths and sizes of the files having at least ``min_size`` and at most ``max_size`` bytes.
+
+        The files are returned in their original order.
+
+        Args:
+            min_size: Minimal file size.
+            max_size: Maximal file size. Defaults to no limit.
+
+        Returns:
+            A tuple of the paths and a NumPy array of the respective sizes.
+        """
+        start, end = self._bounds(min_size, max_size)
+        positions = np.sort(self._order[start:end]) if start < end else np.empty(0, dtype=np.int64)
+        return tuple(self._paths[position] for position in positions.tolist()), self._sizes[positions]
+
+    def draw(
+        self, randomness, k: int = 1, min_size: int = 0, max_size: int | None = None, unique: bool = False
+    ) -> list:
+        """Return the paths of ``k`` files having ``min_size`` to ``max_size`` bytes drawn uniformly.
+
+        The indices drawn refer to the files in their original order, so that a draw returns the same files as drawing
+        from the paths :meth:`select` returns. This keeps the files drawn for a seed the same as in earlier versions. If
+        the range does not contain all files, the positions of its files are sorted once (``O(m log m)`` for ``m``
+        files in the range, in NumPy) and kept. Every draw then takes ``O(1)``.
+
+        Args:
+            randomness: The :class:`woodblock.random.Randomness` context to draw from.
+            k: The number of files to draw.
+            min_size: Minimal file size.
+            max_size: Maximal file size. Defaults to no limit.
+            unique: If set to True, the files drawn are distinct.
+
+        Raises:
+            ValueError: If the range contains no files or, if ``unique`` is set, less than ``k`` files.
+        """
+        start, end = self._bounds(min_size, max_size)
+        count = max(0, end - start)
+        if count == 0 or (unique and count < k):
+            raise ValueError('Not enough files within the size range to choose from.')
+        # Drawing from a range draws the same indices as drawing from a list of the same length.
+        indices = randomness.sample(range(count), k) if unique else randomness.choices(range(count), k)
+        if count == len(self._paths):
+            return [self._paths[index] for index in indices]
+        positions = self._cached('positions', start, end, lambda: np.sort(self._order[start:end]))
+        return [self._paths[position] for position in positions[indices].tolist()]
+
+    def draw_weighted(
+        self, randomness, k: int = 1, min_size: int = 0, max_size: int | None = None, unique: bool = False
+    ) -> list:
+        """Return the paths of ``k`` files having ``min_size`` to ``max_size`` bytes drawn proportionally to the sizes.
+
+        The :class:`AliasTable` of a range is built from the sorted sizes of its files (``O(m)`` for ``m`` files in the
+        range) and kept. Every draw then takes ``O(1)``.
+
+        Args:
+            randomness: The :class:`woodblock.random.Randomness` context to draw from.
+            k: The number of files to draw.
+            min_size: Minimal file size.
+            max_size: Maximal file size. Defaults to no limit.
+            unique: If set to True, the files drawn are distinct.
+
+        Raises:
+            ValueError: If the range contains no non-empty files or, if ``unique`` is set, less than ``k`` of them.
+        """
+        start, end = self._bounds(min_size, max_size)
+        if end <= start or self._sorted_sizes[end - 1] == 0:
+            raise ValueError('Not enough files within the size range to choose from.')
+        table = self._cached('aliases', start, end, lambda: AliasTable(self._sorted_sizes[start:end]))
+        indices = np.asarray(table.draw(randomness, k, unique), dtype=np.int64)
+        return [self._paths[position] for position in self._order[start + indices].tolist()]
+
+    def _bounds(self, min_size, max_size):
+        start = int(np.searchsorted(self._sorted_sizes, min_size, side='left'))
+        if max_size is None:
+            return start, len(self._paths)
+        return start, int(np.searchsorted(self._sorted_sizes, max_size, side='right'))
+
+    def _cached(self, kind, start, end, build):
+        """Return the ``kind`` of drawing data of the range ``[start, end)`` of the sorted sizes (built if needed)."""
+        key = kind, start, end
+        if key in self._cache:
+            self._cache.move_to_end(key)
+        else:
+            self._cache[key] = build()
+            if len(self._cache) > self._max_cached_ranges:
+                self._cache.popitem(last=False)
+        return self._cache[key]
+
+
+class AliasTable:
+    """A table for drawing indices with probabilities proportional to given weights (Vose's alias method).
+
+    Building the table takes ``O(n)``. Afterwards, every draw takes ``O(1)``: an index is chosen uniformly and then
+    either kept or replaced by its alias. Drawing distinct indices takes ``O(n)`` (see :meth:`draw`).
+
+    Args:
+        weights: The non-negative weights of the indices. At least one weight has to be positive.
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.ndim != 1 or len(weights) == 0 or np.any(weights < 0) or weights.sum() <= 0:
+            raise ValueError('The weights have to be non-negative and at least one weight has to be positive.')
+        n = len(weights)
+        scaled = (weights * (n / weights.sum())).tolist()
+        self._probabilities = [1.0] * n
+        self._aliases = list(range(n))
+        small = [index for index, weight in enumerate(scaled) if weight < 1.0]
+        large = [index for index, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._probabilities[less] = scaled[less]
+            self._aliases[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Rounding errors may leave entries whose probability is almost 1. They keep their defaults, unless their weight
+        # is zero, which must never be drawn.
+        fallback = int(np.flatnonzero(weights)[0])
+        for index in small:
+            if weights[index] == 0:
+                self._probabilities[index] = 0.0
+                self._aliases[index] = fallback
+        self._positive = int(np.count_nonzero(weights))
+        self._weights = weights
+
+    def __len__(self):
+        return len(self._aliases)
+
+    @property
+    def positive(self) -> int:
+        """Return the number of indices having a positive weight."""
+        return self._positive
+
+    def draw(self, randomness, k: int = 1, unique: bool = False) -> list:
+        """Return ``k`` indices drawn with replacement or, if ``unique`` is set, ``k`` distinct indices.
+
+        Distinct indices are drawn without replacement by the method of Efraimidis and Spirakis: every index with a
+        positive weight ``w`` gets the key ``log(u) / w`` for a uniform random ``u`` in (0, 1], and the ``k`` indices
+        having the largest keys are drawn in the order of their keys. Unlike rejecting indices drawn before, this takes
+        ``O(n)`` regardless of how skewed the weights are.
+
+        Args:
+            randomness: The :class:`woodblock.random.Randomness` context to draw from.
+            k: The number of indices to draw.
+            unique: If set to True, the indices drawn are distinct.
+
+        Raises:
+            ValueError: If ``unique`` is set and less than ``k`` indices have a positive weight.
+        """
+        if not unique:
+            return [self._draw_one(randomness) for _ in range(k)]
+        if self._positive < k:
+            raise ValueError('Not enough indices with a positive weight to choose from.')
+        if k < 1:
+            return []
+        # Zero weights are left out, as tiny weights may get the same key (-inf) as zero weights would.
+        candidates = np.flatnonzero(self._weights)
+        generator = np.random.default_rng(randomness.draw_seed())
+        keys = np.log1p(-generator.random(len(candidates))) / self._weights[candidates]
+        top = np.argpartition(-keys, k - 1)[:k]
+        top = top[np.argsort(-keys[top], kind='stable')]
+        return candidates[top].tolist()
+
+    def _draw_one(self, randomness):
+        index = randomness.randint(0, len(self._aliases) - 1)
+        return index if randomness.random() < self._probabilities[index] else self._aliases[index]
@@ -1,19 +1,45 @@
 """Utility functions."""
 
+import errno
 import hashlib
+import os
 import pathlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from functools import lru_cache
 
+# Errors raised by ``copy_file_range``/``sendfile`` when the kernel, the file system or the file types involved do not
+# support the system call. They make ``copy_file_data`` fall back to the next (slower) copy method.
+_COPY_UNSUPPORTED_ERRNOS = frozenset(
+    {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTSOCK, errno.EBADF, errno.EPERM}
+)
+_MAX_COPY_SIZE = 1 << 30
+_READ_WRITE_CHUNK_SIZE = 1048576
+
 
-@lru_cache(maxsize=1024)
 def hash_file(path: pathlib.Path) -> str:
     """Return the SHA-256 hash of a file as hexadecimal string.
 
-    The results of this functions are cached in order to avoid multiple computations for the same file.
+    The results of this functions are cached in order to avoid multiple computations for the same file. The cache is
+    keyed by :func:`file_key`, so a file modified in the meantime is hashed again.
 
     Args:
         path: The path of the file to hash
     """
+    path = pathlib.Path(path)
+    return _hash_file(path, file_key(os.stat(path)))
+
+
+def file_key(stat: os.stat_result) -> tuple:
+    """Return the ``(device, inode, size, mtime_ns)`` tuple identifying a version of a file.
+
+    Args:
+        stat: The result of ``os.stat`` for the file.
+    """
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+@lru_cache(maxsize=1024)
+def _hash_file(path: pathlib.Path, key: tuple) -> str:
     sha256 = hashlib.sha256()
     with path.open('rb') as file_handle:
         for chunk in iter(lambda: file_handle.read(1048576), b''):
@@ -21,6 +47,66 @@ def hash_file(path: pathlib.Path) -> str:
     return sha256.hexdigest()
 
 
+def copy_file_data(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    """Copy ``count`` bytes starting at ``offset`` of ``src_fd`` to the current position of ``dst_fd``.
+
+    The data is copied in kernel space using ``os.copy_file_range`` if possible. If this is not supported (e.g. by the
+    platform or the file systems involved), ``os.sendfile`` is tried next, and finally the data is copied with a plain
+    read/write loop. The position of ``dst_fd`` is advanced by the number of bytes copied, the position of ``src_fd`` is
+    unspecified afterwards.
+
+    Args:
+        src_fd: The file descriptor to copy from.
+        dst_fd: The file descriptor to copy to.
+        offset: The offset in ``src_fd`` to start copying from.
+        count: The number of bytes to copy.
+
+    Returns:
+        The number of bytes copied. This is less than ``count`` only if the end of ``src_fd`` was reached.
+    """
+    methods = [m for m in (_copy_file_range, _sendfile) if m is not None]
+    methods.append(_read_write)
+    copied = 0
+    while copied < count:
+        try:
+            num_bytes = methods[0](src_fd, dst_fd, offset + copied, min(count - copied, _MAX_COPY_SIZE))
+        except OSError as err:
+            if len(methods) == 1 or err.errno not in _COPY_UNSUPPORTED_ERRNOS:
+                raise
+            methods.pop(0)
+            continue
+        if num_bytes == 0:
+            # Some file systems report 0 bytes for copy_file_range/sendfile instead of an error. Only the read/write
+            # loop is trusted to detect the actual end of the file.
+            if len(methods) == 1:
+                break
+            methods.pop(0)
+            continue
+        copied += num_bytes
+    return copied
+
+
+def _copy_file_range_impl(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset_src=offset)
+
+
+def _sendfile_impl(src_fd, dst_fd, offset, count):
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+def _read_write(src_fd, dst_fd, offset, count):
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    data = os.read(src_fd, min(count, _READ_WRITE_CHUNK_SIZE))
+    view = memoryview(data)
+    while view:
+        view = view[os.write(dst_fd, view) :]
+    return len(data)
+
+
+_copy_file_range = _copy_file_range_impl if hasattr(os, 'copy_file_range') else None
+_sendfile = _sendfile_impl if hasattr(os, 'sendfile') else None
+
+
 def get_file_list(path: pathlib.Path, min_size: int = 0) -> tuple:
     """Return all files from the given `path`.
 
@@ -35,10 +121,76 @@ def get_file_list(path: pathlib.Path, min_size: int = 0) -> tuple:
     """
     basedir = pathlib.Path(path)
     return tuple(
-        sorted(f for f in basedir.glob('**/*') if f.is_file() and not _is_readme(f) and f.stat().st_size >= min_size)
+        basedir / file
+        for file, size in scan_files(basedir)
+        if size >= min_size and not is_readme(file.rpartition('/')[2])
     )
 
 
-def _is_readme(path) -> bool:
-    name = path.name.lower()
-    return name.startswith('readme')
+def scan_files(path, workers: int | None = None) -> list:
+    """Return the relative path and the size of every file below ``path``.
+
+    The directories are listed concurrently by ``workers`` threads using ``os.scandir``, which provides the file types
+    without additional system calls. This makes a difference for large corpora, especially on network file systems.
+    Like ``pathlib.Path.glob('**/*')``, symbolic links to files are included and symbolic links to directories are
+    not followed.
+
+    Args:
+        path: The directory to scan.
+        workers: The number of threads listing directories. Defaults to the default of ``ThreadPoolExecutor``.
+
+    Returns:
+        A list of ``(path, size)`` tuples, where ``path`` is the POSIX path of the file relative to ``path``. The list
+        is sorted like ``pathlib`` paths, i.e. by the path components, so the order only depends on the directory tree.
+    """
+    root = os.fspath(path)
+    files = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(list_directory, root, '')}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirectories, directory_files = future.result()
+                files.extend((file, size) for file, size, _ in directory_files)
+                pending.update(executor.submit(list_directory, root, subdirectory) for subdirectory in subdirectories)
+    files.sort(key=lambda file: file[0].split('/'))
+    return files
+
+
+def list_directory(root, directory: str = '') -> tuple:
+    """List the directory ``directory`` relative to ``root``.
+
+    Symbolic links to directories are not followed. Directories which cannot be read are treated as empty.
+
+    Args:
+        root: The root directory.
+        directory: The POSIX path of the directory relative to ``root`` or ``''`` for ``root`` itself.
+
+    Returns:
+        A tuple of the list of the subdirectories and the list of ``(path, size, mtime_ns)`` tuples of the files. All
+        paths are relative to ``root``.
+    """
+    prefix = f'{directory}/' if directory else ''
+    subdirectories = []
+    files = []
+    try:
+        entries = os.scandir(os.path.join(root, directory))
+    except (PermissionError, FileNotFoundError, NotADirectoryError):
+        return subdirectories, files
+    with entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(prefix + entry.name)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files.append((prefix + entry.name, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                # E.g. a dangling symbolic link or a file removed while listing the directory.
+                continue
+    return subdirectories, files
+
+
+def is_readme(name: str) -> bool:
+    """Return ``True`` if ``name`` is the name of a README file (e.g. README.md or ReadMe), which is no corpus file."""
+    return name.lower().startswith('readme')
@@ -0,0 +1,207 @@
+"""This module contains the VirtualImage class."""
+
+import bisect
+import collections
+import io
+import os
+
+import woodblock.datagen
+import woodblock.fragments
+
+_MAX_OPEN_FILES = 16
+_MAX_CURSORS = 8
+
+
+class VirtualImage(io.RawIOBase):
+    """A read-only, seekable file object providing the data of an image without writing it.
+
+    Reading a range of the virtual image only produces the data of the fragments, padding and gaps covering the range:
+    file fragments are read from the corpus files and synthetic data is produced by the data generators. Hence, the
+    bytes are identical to the ones :meth:`woodblock.image.Image.write` writes, but the image is never materialized.
+
+    Data generators having a ``bytes_at(offset, size)`` method, which returns the ``size`` bytes at position ``offset``
+    of the stream produced by consecutive calls after a reset (e.g. :class:`woodblock.datagen.Zeroes`), are accessed
+    randomly. All other data has to be generated from the start of the fragment (or of the padding stream) up to the
+    requested position. The position reached is kept, so that reading sequentially is efficient.
+
+    The virtual image shares the fragments and data generators with the image. Do not write or iterate the image (or
+    its fragments) while reading the virtual image. The layout of the image is fixed when the virtual image is created.
+
+    Args:
+        image: The :class:`woodblock.image.Image` to provide the data of.
+    """
+
+    def __init__(self, image):
+        super().__init__()
+        image._check_target_size()
+        self._padding_generator = image._generate_padding
+        self._regions = []
+        padding_sizes = []
+        padding_offset = 0
+        for offset, size, fragment in image._regions():
+            # Padding regions are located in the stream of all padding generated for the image.
+            self._regions.append((offset, size, fragment, padding_offset))
+            if fragment is None:
+                padding_sizes.append(size)
+                padding_offset += size
+        self._starts = [region[0] for region in self._regions]
+        self._size = self._regions[-1][0] + self._regions[-1][1] if self._regions else 0
+        self._padding_sizes = padding_sizes
+        self._position = 0
+        self._files = collections.OrderedDict()
+        self._cursors = collections.OrderedDict()
+
+    @property
+    def size(self) -> int:
+        """Return the size of the image in bytes."""
+        return self._size
+
+    def readable(self):
+        """Return ``True``."""
+        return True
+
+    def seekable(self):
+        """Return ``True``."""
+        return True
+
+    def tell(self):
+        """Return the current position."""
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """Change the position to ``offset`` relative to ``whence`` and return the new position."""
+        if whence == os.SEEK_SET:
+            position = offset
+        elif whence == os.SEEK_CUR:
+            position = self._position + offset
+        elif whence == os.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError(f'Invalid whence: {whence}.')
+        if position < 0:
+            raise ValueError(f'Negative seek position {position}.')
+        self._position = position
+        return position
+
+    def readinto(self, buffer):
+        """Read up to ``len(buffer)`` bytes at the current position into ``buffer`` and return the number of bytes."""
+        data = self.read_at(self._position, len(buffer))
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def read_at(self, offset: int, size: int) -> bytes:
+        """Return up to ``size`` bytes starting at ``offset`` without changing the position.
+
+        Args:
+            offset: The image offset to read from. It must not be negative.
+            size: The number of bytes to read. Fewer bytes are returned at the end of the image.
+        """
+        if self.closed:
+            raise ValueError('I/O operation on closed virtual image.')
+        if offset < 0:
+            raise ValueError(f'Negative read offset {offset}.')
+        size = max(0, min(size, self._size - offset))
+        parts = []
+        index = bisect.bisect_right(self._starts, offset) - 1
+        while size > 0:
+            region_offset, region_size, fragment, padding_offset = self._regions[index]
+            start = offset - region_offset
+            count = min(size, region_size - start)
+            if fragment is None:
+                parts.append(self._read_padding(padding_offset + start, count))
+            else:
+                parts.append(self._read_fragment(index, fragment, start, count))
+            offset += count
+            size -= count
+            index += 1
+        return b''.join(parts)
+
+    def close(self):
+        """Close the virtual image and all corpus files opened for reading."""
+        for handle in self._files.values():
+            handle.close()
+        self._files.clear()
+        self._cursors.clear()
+        super().close()
+
+    def _read_padding(self, offset, size):
+        if hasattr(self._padding_generator, 'bytes_at'):
+            return self._padding_generator.bytes_at(offset, size)
+        return self._cursor('padding', self._generate_padding).read(offset, size)
+
+    def _generate_padding(self):
+        if hasattr(self._padding_generator, 'reset'):
+            self._padding_generator.reset()
+        for size in self._padding_sizes:
+            for chunk_size in woodblock.datagen.chunk_sizes(size, woodblock.datagen.PADDING_CHUNK_SIZE):
+                yield self._padding_generator(chunk_size)
+
+    def _read_fragment(self, index, fragment, offset, size):
+        if isinstance(fragment, woodblock.fragments.FileFragment):
+            handle = self._file(fragment.file.path)
+            handle.seek(fragment.start_offset + offset)
+            return handle.read(size)
+        generator = getattr(fragment, 'data_generator', None)
+        if hasattr(generator, 'bytes_at'):
+            return generator.bytes_at(offset, size)
+        return self._cursor(index, lambda: iter(fragment)).read(offset, size)
+
+    def _file(self, path):
+        if path in self._files:
+            self._files.move_to_end(path)
+        else:
+            self._files[path] = open(path, 'rb')
+            if len(self._files) > _MAX_OPEN_FILES:
+                self._files.popitem(last=False)[1].close()
+        return self._files[path]
+
+    def _cursor(self, key, chunks):
+        if key in self._cursors:
+            self._cursors.move_to_end(key)
+        else:
+            self._cursors[key] = _StreamCursor(chunks)
+            if len(self._cursors) > _MAX_CURSORS:
+                self._cursors.popitem(last=False)
+        return self._cursors[key]
+
+
+class _StreamCursor:
+    """Random access to a stream of chunks which can only be produced from its beginning.
+
+    The chunk reached is kept, so that reading the stream sequentially never produces a chunk twice. Reading before
+    the current chunk restarts the stream.
+
+    Args:
+        chunks: A callable returning a new iterator over the chunks of the stream.
+    """
+
+    def __init__(self, chunks):
+        self._new_iterator = chunks
+        self._restart()
+
+    def read(self, offset: int, size: int) -> bytes:
+        """Return ``size`` bytes starting at ``offset`` of the stream."""
+        if offset < self._chunk_start:
+            self._restart()
+        parts = []
+        while size > 0:
+            chunk_end = self._chunk_start + len(self._chunk)
+            if offset >= chunk_end:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._chunk_start = chunk_end
+                self._chunk = chunk
+                continue
+            start = offset - self._chunk_start
+            part = self._chunk[start : start + size]
+            parts.append(part)
+            offset += len(part)
+            size -= len(part)
+        return b''.join(parts)
+
+    def _restart(self):
+        self._chunks = iter(self._new_iterator())
+        self._chunk = b''
+        self._chunk_start = 0
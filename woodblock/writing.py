@@ -0,0 +1,488 @@
+"""This module contains the writing of images to disk.
+
+:class:`WriteOptions` holds the options of :meth:`woodblock.image.Image.write`. The image is written to its target, i.e.
+a path or a file-like object, by a writer, which :meth:`WriteOptions.writer` picks for the options:
+
+* :class:`SequentialWriter` writes the image in image order,
+* :class:`PositionalWriter` writes the fragments concurrently,
+* :class:`MappedWriter` writes the fragments through a memory map,
+* :class:`JournaledWriter` records the progress in a journal and resumes an interrupted run,
+* :class:`CompressedWriter` compresses the image while it is written and
+* :class:`SegmentedWriter` splits the image into segment files.
+
+The writers only decide how the image data gets to the target. The image data itself, i.e. its regions and padding, is
+taken from the image.
+"""
+
+import copy
+import hashlib
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+
+import woodblock.compression
+import woodblock.datagen
+import woodblock.hashdb
+import woodblock.journal
+import woodblock.output
+from woodblock.errors import WoodblockError
+
+
+class WriteOptions:
+    """The options of writing an image (see :meth:`woodblock.image.Image.write`).
+
+    If ``sparse`` is ``True`` and the image is written to a regular file, regions consisting of zero bytes, i.e.
+    ``ZeroesFragment`` instances and padding generated by a :class:`woodblock.datagen.Zeroes` generator, are not written
+    but skipped, so that they become holes in the image file. Like ``dd conv=sparse``, this keeps any data already
+    present in the skipped regions of a file object, so use it with new or empty files only.
+
+    Args:
+        workers: The number of threads writing fragments concurrently (see :class:`PositionalWriter`) or, if the image
+            is compressed, the number of compression threads (see :class:`CompressedWriter`).
+        sparse: Skip zero regions instead of writing them.
+        metadata_path: The output path of the metadata. Defaults to the image path with ".json" appended.
+        buffer_size: The size of the write batches in bytes.
+        memory_map: Write the image through a memory map of the output file (see :class:`MappedWriter`).
+        resume: Journal the written data and resume an interrupted run (see :class:`JournaledWriter`).
+        digests: Names of the ``hashlib`` algorithms (e.g. "sha256", "md5" or "sha1") of the image digests.
+        checksum_path: The output path of a checksum file in the format of ``sha256sum``. Not supported for compressed
+            images.
+        hashdb_path: The output path of a sector hash database (see :class:`woodblock.hashdb.HashDatabase`).
+        compression: The compression format ("gz", "bz2" or "xz"). Inferred from the suffix of a target path (see
+            :class:`CompressedWriter`).
+        segment_size: The maximal size of the image segment files in bytes (see :class:`SegmentedWriter`).
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        sparse: bool = False,
+        metadata_path=None,
+        buffer_size: int = woodblock.output.DEFAULT_BUFFER_SIZE,
+        memory_map: bool = False,
+        resume: bool = False,
+        digests=(),
+        checksum_path=None,
+        hashdb_path=None,
+        compression: str | None = None,
+        segment_size: int | None = None,
+    ):
+        self.workers = workers
+        self.sparse = sparse
+        self.metadata_path = metadata_path
+        self.buffer_size = buffer_size
+        self.memory_map = memory_map
+        self.resume = resume
+        self.digests = tuple(digests)
+        self.checksum_path = checksum_path
+        self.hashdb_path = hashdb_path
+        self.compression = compression
+        self.segment_size = segment_size
+
+    @property
+    def positional(self) -> bool:
+        """Return ``True`` if the fragments are written to their offsets, i.e. concurrently or through a memory map."""
+        if self.compression is not None or self.segment_size is not None:
+            return False
+        return (self.workers is not None and self.workers > 1) or self.memory_map
+
+    def validate(self, target, block_size: int) -> 'WriteOptions':
+        """Check the options and return them with the compression inferred from the target path.
+
+        The options are not changed. Segmented images are never compressed, so their compression is not inferred.
+        Options which cannot be combined are rejected here, before the target or any other output file is touched.
+
+        Args:
+            target: The output path or file-like object of the image. Only whether it is a path matters.
+            block_size: The block size of the image.
+
+        Raises:
+            WoodblockError: If the options cannot be combined or do not fit the target.
+        """
+        options = copy.copy(self)
+        to_path = isinstance(target, (str, pathlib.Path))
+        options.create_hashers()
+        if options.segment_size is not None:
+            if not to_path:
+                raise WoodblockError('Only images written to a path can be split into segments.')
+            if options.segment_size < 1 or options.segment_size % block_size != 0:
+                raise WoodblockError(
+                    f'The segment size ({options.segment_size} bytes) has to be a multiple of the block size '
+                    f'({block_size}).'
+                )
+            if options.compression is not None or options.resume or options.checksum_path is not None:
+                raise WoodblockError('Segmented images cannot be compressed, resumed or have a checksum file.')
+            if (options.workers is not None and options.workers > 1) or options.memory_map:
+                raise WoodblockError('Segmented images are written sequentially, i.e. without workers or memory map.')
+        elif options.compression is None and to_path:
+            options.compression = woodblock.compression.compression_from_path(target)
+        # Compressed images are written sequentially, too, but workers then sets the number of compression threads.
+        if options.compression is not None and options.memory_map:
+            raise WoodblockError('Compressed images cannot be written through a memory map.')
+        if options.compression is not None and options.checksum_path is not None:
+            # The checksum file would name the compressed file, but the digests refer to the uncompressed image.
+            raise WoodblockError('Compressed images cannot have a checksum file. Use digests instead.')
+        if options.resume:
+            if not to_path:
+                raise WoodblockError('Only images written to a path can be resumed.')
+            if options.compression is not None:
+                raise WoodblockError('Compressed images cannot be resumed.')
+            if options.positional:
+                raise WoodblockError('Resumable images are written sequentially, i.e. without workers or memory map.')
+        if (options.digests or options.checksum_path is not None or options.hashdb_path is not None) and (
+            options.positional
+        ):
+            raise WoodblockError(
+                'Image digests and hash databases are computed while writing the image sequentially. '
+                'They cannot be combined with workers or a memory map.'
+            )
+        return options
+
+    def create_hashers(self) -> list:
+        """Return the ``hashlib`` objects computing the image digests (including SHA-256 for the checksum file).
+
+        Raises:
+            WoodblockError: If a digest algorithm is not supported.
+        """
+        names = [name.lower() for name in self.digests]
+        if self.checksum_path is not None and 'sha256' not in names:
+            names.append('sha256')
+        hashers = []
+        for name in dict.fromkeys(names):
+            try:
+                hashers.append(hashlib.new(name))
+            except ValueError as err:
+                raise WoodblockError(f'Unsupported digest algorithm: "{name}".') from err
+        return hashers
+
+    def create_observers(self, block_size: int, seed: int) -> list:
+        """Return the observers of the image data, i.e. the sector hash database (if requested).
+
+        Args:
+            block_size: The block size of the image.
+            seed: The seed of the image.
+        """
+        if self.hashdb_path is None:
+            return []
+        return [woodblock.hashdb.HashDatabase(self.hashdb_path, block_size, seed=seed)]
+
+    def writer(self):
+        """Return the writer for these options."""
+        if self.resume:
+            return JournaledWriter(self)
+        if self.segment_size is not None:
+            return SegmentedWriter(self)
+        if self.compression is not None:
+            return CompressedWriter(self)
+        if self.memory_map and self.positional:
+            return MappedWriter(self)
+        if self.positional:
+            return PositionalWriter(self)
+        return SequentialWriter(self)
+
+
+class SequentialWriter:
+    """A writer writing the image in image order.
+
+    The image data is collected into batches of ``buffer_size`` bytes, which are written with a single scatter-gather
+    system call each (see :class:`woodblock.output.Output`). If the target has a file descriptor, the file fragments are
+    copied in kernel space (see :meth:`woodblock.fragments.FileFragment.copy_to`) instead of being passed through
+    Python chunk by chunk.
+
+    A target path is opened (and closed) by the writer. File-like objects are flushed once the image has been written.
+
+    Args:
+        options: The :class:`WriteOptions` of the image.
+    """
+
+    #: The mode in which a target path is opened.
+    open_mode = 'wb'
+
+    def __init__(self, options: WriteOptions):
+        self._options = options
+        #: The segments of the image written (see :class:`woodblock.output.SegmentedFile`) or ``None``.
+        self.segments = None
+
+    def write(self, image, target, hashers, observers):
+        """Write ``image`` to ``target`` and return the path written to or ``None`` for a file-like object.
+
+        Args:
+            image: The :class:`woodblock.image.Image` to write.
+            target: The output path or a ``.write()``-supporting file-like object.
+            hashers: The ``hashlib`` objects computing the image digests.
+            observers: The observers of the image data (see :class:`woodblock.output.Output`).
+        """
+        if isinstance(target, (str, pathlib.Path)):
+            path = pathlib.Path(target)
+            with path.open(self.open_mode) as file_handle:
+                self.write_to(image, file_handle, hashers, observers)
+            return path
+        self.write_to(image, target, hashers, observers)
+        if hasattr(target, 'flush'):
+            target.flush()
+        return None
+
+    def write_to(self, image, target, hashers, observers):
+        """Write ``image`` to the file-like object ``target``."""
+        image._prepare_writing()
+        output = woodblock.output.Output(
+            target,
+            buffer_size=self._options.buffer_size,
+            sparse=self._options.sparse,
+            hashers=hashers,
+            observers=observers,
+        )
+        for _, size, fragment in image._regions():
+            if image._is_zero_region(fragment):
+                output.write_zeroes(size)
+            elif fragment is None:
+                for chunk in image._padding_chunks(size):
+                    output.write(chunk)
+            else:
+                output.write_fragment(fragment)
+        output.close()
+
+    def finish(self):
+        """Clean up once the image and its metadata have been written."""
+
+
+class PositionalWriter(SequentialWriter):
+    """A writer writing the fragments of the image concurrently.
+
+    The output is preallocated and the fragments are written to their precomputed offsets using a pool of ``workers``
+    threads (see :class:`woodblock.output.PositionalOutput`). The padding is still generated in image order, so the
+    output is byte-identical to a sequential write. Only a seekable padding generator (e.g.
+    :class:`woodblock.datagen.SeekableRandom`) generates the padding concurrently as well. As the fragments are written
+    concurrently, fragments must not share a data generator.
+
+    Targets which are not regular files are written sequentially.
+    """
+
+    def write_to(self, image, target, hashers, observers):
+        if woodblock.output.regular_file_descriptor(target) is None:
+            super().write_to(image, target, hashers, observers)
+            return
+        image._prepare_writing()
+        regions = list(image._regions())
+        image_size = regions[-1][0] + regions[-1][1] if regions else 0
+        sparse = self._options.sparse
+        output = self._create_output(target, image_size)
+        try:
+            with ThreadPoolExecutor(max_workers=self._options.workers or 1) as executor:
+                futures = []
+                padding_position = 0
+                generate_padding = image._generate_padding
+                seekable_padding = hasattr(generate_padding, 'bytes_at')
+                for offset, size, fragment in regions:
+                    if fragment is None:
+                        position = padding_position
+                        padding_position += size
+                    if sparse and image._is_zero_region(fragment):
+                        continue
+                    if fragment is None and seekable_padding:
+                        futures.append(executor.submit(_generate_at, output, offset, size, generate_padding, position))
+                    elif fragment is None:
+                        # The padding generator is a single stream for the whole image, so the padding is generated
+                        # here in image order. Only the fragments are written concurrently.
+                        output.generate_at(offset, size, generate_padding)
+                    else:
+                        futures.append(executor.submit(output.write_fragment_at, offset, fragment))
+                for future in futures:
+                    future.result()
+        finally:
+            output.close()
+
+    def _create_output(self, target, image_size):
+        return woodblock.output.PositionalOutput(
+            target, image_size, buffer_size=self._options.buffer_size, sparse=self._options.sparse
+        )
+
+
+class MappedWriter(PositionalWriter):
+    """A writer writing the image through a memory map of the output file (see :class:`woodblock.output.MappedOutput`).
+
+    The output is preallocated and mapped. File fragments are then read directly into the map and data generators fill
+    it in place. Like with :class:`PositionalWriter`, ``workers`` threads write the fragments concurrently. File objects
+    have to be opened for reading and writing (e.g. with mode ``'w+b'``) in order to be mapped, other file objects are
+    written using positional writes instead.
+    """
+
+    # A shared memory map of the image file requires the file to be opened for reading, too.
+    open_mode = 'w+b'
+
+    def _create_output(self, target, image_size):
+        if not target.readable():
+            return super()._create_output(target, image_size)
+        return woodblock.output.MappedOutput(
+            target, image_size, buffer_size=self._options.buffer_size, sparse=self._options.sparse
+        )
+
+
+class CompressedWriter(SequentialWriter):
+    """A writer compressing the image while it is written (see :class:`woodblock.compression.ParallelCompressor`).
+
+    ``workers`` is the number of compression threads and defaults to the number of CPUs. The image offsets and digests
+    in the metadata refer to the uncompressed image.
+    """
+
+    def write_to(self, image, target, hashers, observers):
+        # The compressor has no file descriptor, so the image is written to it sequentially.
+        compressor = woodblock.compression.ParallelCompressor(
+            target, self._options.compression, workers=self._options.workers
+        )
+        try:
+            super().write_to(image, compressor, hashers, observers)
+        finally:
+            compressor.close()
+
+
+class SegmentedWriter(SequentialWriter):
+    """A writer splitting the image into segment files of (at most) ``segment_size`` bytes.
+
+    The segment files are named like the target path with ".001", ".002" and so on appended (see
+    :class:`woodblock.output.SegmentedFile`). The segment size has to be a multiple of the block size. The metadata
+    records the segment files in its ``segments`` entry and the segment and segment offset of the start and end of
+    every fragment in its ``segment_offsets``.
+    """
+
+    def write(self, image, target, hashers, observers):
+        path = pathlib.Path(target)
+        segments = woodblock.output.SegmentedFile(path, self._options.segment_size)
+        try:
+            self.write_to(image, segments, hashers, observers)
+        finally:
+            segments.close()
+        self.segments = {'size': self._options.segment_size, 'files': [segment.name for segment in segments.paths]}
+        return path
+
+
+class JournaledWriter(SequentialWriter):
+    """A writer recording the progress in a journal, so that an interrupted run can be resumed.
+
+    The image is written sequentially and a journal (the target path with ".journal" appended) records checkpoints of
+    the data durably written so far (see :class:`woodblock.journal.Journal`). If a journal of an interrupted run exists,
+    the already written part of the image is verified against the journal and writing continues at the last
+    checkpoint. As all data is derived from the seed, the resumed image is byte-identical to an image written in one
+    go. The journal is removed by :meth:`finish`, i.e. once the image and its metadata have been written completely.
+    """
+
+    def __init__(self, options: WriteOptions):
+        super().__init__(options)
+        self._journal = None
+
+    def write(self, image, target, hashers, observers):
+        """Write ``image`` to the path ``target``, continuing at the last checkpoint of an interrupted run.
+
+        The padding generator is a single stream, so the padding of the skipped regions is generated (and discarded) to
+        bring it to the state it had at the checkpoint. The digests of the image cannot be stored in the journal, so the
+        verified part of the image is read once to bring the ``hashers`` up to date, and the fragments of the skipped
+        regions are passed to the ``observers``.
+        """
+        path = pathlib.Path(target)
+        image._prepare_writing()
+        regions = list(image._regions())
+        journal = woodblock.journal.Journal(path.with_name(path.name + '.journal'), image._fingerprint(regions))
+        checkpoints = journal.checkpoints()
+        resume_offset = checkpoints[-1]['offset'] if checkpoints and path.exists() else 0
+        with path.open('r+b' if resume_offset else 'wb') as handle:
+            if resume_offset:
+                _verify_written_image(handle, regions, checkpoints)
+                handle.truncate(resume_offset)
+                if hashers:
+                    _hash_file(handle, 0, resume_offset, hashers)
+                handle.seek(resume_offset)
+            journal.open(append=resume_offset > 0)
+            output = woodblock.output.Output(
+                handle,
+                buffer_size=self._options.buffer_size,
+                sparse=self._options.sparse,
+                hashers=hashers,
+                observers=observers,
+                offset=resume_offset,
+            )
+            completed = []
+            last_checkpoint = resume_offset
+            for index, (offset, size, fragment) in enumerate(regions):
+                if offset < resume_offset:
+                    if fragment is None and hasattr(image._generate_padding, 'skip'):
+                        image._generate_padding.skip(size)
+                    elif fragment is None and not image._is_zero_region(None):
+                        for _ in image._padding_chunks(size):
+                            pass
+                    elif fragment is not None:
+                        for observer in observers:
+                            observer.add_fragment(offset, fragment)
+                    continue
+                if image._is_zero_region(fragment):
+                    output.write_zeroes(size)
+                elif fragment is None:
+                    for chunk in image._padding_chunks(size):
+                        output.write(chunk)
+                else:
+                    output.write_fragment(fragment)
+                    completed.append(index)
+                end = offset + size
+                if end - last_checkpoint >= woodblock.journal.DEFAULT_CHECKPOINT_INTERVAL or index == len(regions) - 1:
+                    output.sync()
+                    journal.checkpoint(end, [(i, regions[i][2].hash) for i in completed])
+                    completed = []
+                    last_checkpoint = end
+            output.close()
+        journal.close()
+        self._journal = journal
+        return path
+
+    def finish(self):
+        """Remove the journal."""
+        self._journal.remove()
+
+
+def _verify_written_image(handle, regions, checkpoints):
+    """Check that the image written so far matches the journal and the image to be written.
+
+    The image has to be at least as large as recorded by the last checkpoint, and the fragments completed most recently,
+    i.e. those of the last checkpoint recording any fragments, have to match their recorded hashes. Moreover, the
+    recorded hashes of all written fragments have to match the hashes of the fragments of the image to be written, so
+    that an image is not continued with, e.g., a corpus file changed in the meantime.
+    """
+    handle.seek(0, 2)
+    if handle.tell() < checkpoints[-1]['offset']:
+        raise WoodblockError(
+            f'The image is shorter ({handle.tell()} bytes) than recorded in the journal '
+            f'({checkpoints[-1]["offset"]} bytes) and cannot be resumed.'
+        )
+    recent_fragments = next((c['fragments'] for c in reversed(checkpoints) if c['fragments']), [])
+    for index, expected_hash in recent_fragments:
+        offset, size, _ = regions[index]
+        hasher = hashlib.sha256()
+        _hash_file(handle, offset, size, [hasher])
+        if hasher.hexdigest() != expected_hash:
+            raise WoodblockError(
+                f'The image data at offset {offset} does not match the journal. The image cannot be resumed.'
+            )
+    for checkpoint in checkpoints:
+        for index, recorded_hash in checkpoint['fragments']:
+            offset, _, fragment = regions[index]
+            if fragment.hash != recorded_hash:
+                raise WoodblockError(
+                    f'The fragment at offset {offset} differs from the one written before, e.g. because its file has '
+                    'changed. The image cannot be resumed.'
+                )
+
+
+def _generate_at(output, offset, size, generator, position):
+    """Write the ``size`` bytes at ``position`` of the stream of the seekable ``generator`` at ``offset``."""
+    for chunk_size in woodblock.datagen.chunk_sizes(size, woodblock.datagen.PADDING_CHUNK_SIZE):
+        output.write_at(offset, generator.bytes_at(position, chunk_size))
+        offset += chunk_size
+        position += chunk_size
+
+
+def _hash_file(handle, offset: int, size: int, hashers):
+    handle.seek(offset)
+    while size > 0:
+        chunk = handle.read(min(size, woodblock.output.DEFAULT_BUFFER_SIZE))
+        if not chunk:
+            break
+        for hasher in hashers:
+            hasher.update(chunk)
+        size -= len(chunk)